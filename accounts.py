@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+accounts.py
+Οικονομική καρτέλα (patient_accounts) ανά ασθενή για το Dr. PLATI
+Τα σύνολα (χρεώσεις, πληρωμές, ασφαλιστική κάλυψη, υπόλοιπο) ξαναϋπολογίζονται
+για τους ασθενείς που άλλαξαν, στο ίδιο DB transaction με το flush των
+transactions, ώστε λίστες και dashboard να διαβάζουν ένα row ανά ασθενή.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import event, inspect, func, case
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Transaction, PatientAccount
+
+
+BATCH_SIZE = 500
+
+# Οι ακυρωμένες συναλλαγές δεν μετράνε στο υπόλοιπο
+_active = Transaction.payment_status != 'cancelled'
+
+
+def _sum(column):
+    return func.coalesce(func.sum(case((_active, func.coalesce(column, 0)), else_=0)), 0)
+
+
+def account_totals_select(patient_ids=None):
+    """SELECT συνόλων ανά patient_id από τον πίνακα transactions (idx_transaction_patient)"""
+    query = db.select(
+        Transaction.patient_id,
+        _sum(Transaction.total_amount).label('total_billed'),
+        _sum(Transaction.paid_amount).label('total_paid'),
+        _sum(Transaction.insurance_coverage).label('total_insurance'),
+        func.count(case((_active, 1))).label('transaction_count'),
+        func.count(case((Transaction.payment_status.in_(['pending', 'partial']), 1))).label('pending_count'),
+        func.max(case((_active, Transaction.transaction_date))).label('last_transaction_date'),
+        func.max(Transaction.payment_date).label('last_payment_date')
+    ).group_by(Transaction.patient_id)
+    if patient_ids is not None:
+        query = query.where(Transaction.patient_id.in_(patient_ids))
+    return query
+
+
+def _account_row(patient_id, totals=None):
+    zero = Decimal('0.00')
+    values = dict(totals._mapping) if totals is not None else {}
+    billed = Decimal(str(values.get('total_billed') or zero))
+    paid = Decimal(str(values.get('total_paid') or zero))
+    insurance = Decimal(str(values.get('total_insurance') or zero))
+    return {
+        'patient_id': patient_id,
+        'total_billed': billed,
+        'total_paid': paid,
+        'total_insurance': insurance,
+        'balance': billed - paid - insurance,
+        'transaction_count': values.get('transaction_count') or 0,
+        'pending_count': values.get('pending_count') or 0,
+        'last_transaction_date': values.get('last_transaction_date'),
+        'last_payment_date': values.get('last_payment_date'),
+        'updated_at': datetime.utcnow()
+    }
+
+
+def _upsert_accounts(connection, rows):
+    """INSERT ή UPDATE των rows (native upsert σε MySQL/SQLite/PostgreSQL)"""
+    table = PatientAccount.__table__
+    dialect = connection.dialect.name
+    columns = [column for column in rows[0] if column != 'patient_id']
+
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update({column: statement.inserted[column] for column in columns})
+        connection.execute(statement, rows)
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.patient_id],
+            set_={column: statement.excluded[column] for column in columns}
+        )
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            result = connection.execute(
+                table.update().where(table.c.patient_id == row['patient_id'])
+                .values({column: row[column] for column in columns})
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert(), [row])
+
+
+def refresh_accounts(connection, patient_ids):
+    """
+    Επαναϋπολογισμός των accounts για τους δοσμένους ασθενείς
+    Καλείται αυτόματα στο flush - και από set-based UPDATEs που παρακάμπτουν το ORM.
+    """
+    patient_ids = sorted({pid for pid in patient_ids if pid is not None})
+    for start in range(0, len(patient_ids), BATCH_SIZE):
+        batch = patient_ids[start:start + BATCH_SIZE]
+        totals = {row.patient_id: row for row in connection.execute(account_totals_select(batch))}
+        _upsert_accounts(connection, [_account_row(pid, totals.get(pid)) for pid in batch])
+
+
+# ==================== FLUSH HOOK ====================
+
+def _changed_patient_ids(session):
+    patient_ids = set()
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            if not isinstance(obj, Transaction):
+                continue
+            patient_ids.add(obj.patient_id)
+            # Μεταφορά συναλλαγής σε άλλον ασθενή: ενημέρωση και του παλιού
+            history = inspect(obj).attrs.patient_id.history
+            patient_ids.update(history.deleted or ())
+    return patient_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_changed_accounts(session, flush_context):
+    patient_ids = _changed_patient_ids(session)
+    if patient_ids:
+        refresh_accounts(session.connection(), patient_ids)
+
+
+# ==================== QUERIES ====================
+
+def get_account(patient_id):
+    """Account του ασθενούς (μηδενικό, μη αποθηκευμένο, αν δεν υπάρχει ακόμα)"""
+    account = db.session.get(PatientAccount, patient_id)
+    if account is None:
+        account = PatientAccount(**_account_row(patient_id))
+    return account
+
+
+def outstanding_balance_select():
+    """SELECT συνολικού ανεξόφλητου υπολοίπου (μόνο θετικά υπόλοιπα)"""
+    return db.select(func.coalesce(func.sum(PatientAccount.balance), 0)).where(PatientAccount.balance > 0)
+
+
+def rebuild_accounts():
+    """
+    Rebuild όλων των accounts από τα transactions (χρησιμοποιείται από το migration)
+    """
+    connection = db.session.connection()
+    rows = [_account_row(row.patient_id, row) for row in connection.execute(account_totals_select())]
+
+    connection.execute(PatientAccount.__table__.delete())
+    for start in range(0, len(rows), BATCH_SIZE):
+        _upsert_accounts(connection, rows[start:start + BATCH_SIZE])
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+billing_actions.py
+Μαζικές ενέργειες σε συναλλαγές για το Dr. PLATI
+Κάθε ενέργεια (εξόφληση, ακύρωση, αλλαγή τρόπου πληρωμής, ασφαλιστική
+κάλυψη) είναι ένα set-based UPDATE για όλη την επιλογή, σε ένα transaction.
+Επειδή τα UPDATE παρακάμπτουν τα mapper events, οι daily counters, τα
+patient_accounts και το cache των καρτελών ενημερώνονται εδώ ρητά.
+"""
+
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import case, func
+from extensions import db
+from models import Transaction
+from counters import COUNTED_MODELS, increment_counters
+from accounts import refresh_accounts
+from patient_cards import touch_patients, evict_patient_cards
+
+
+MAX_BULK_TRANSACTIONS = 1000
+
+PAYMENT_METHODS = ('cash', 'card', 'transfer', 'insurance')
+OPEN_STATUSES = ('pending', 'partial')
+
+CENT = Decimal('0.01')
+
+
+class BulkActionError(ValueError):
+    """Μη έγκυρη ενέργεια ή παράμετροι"""
+    pass
+
+
+def _amount(value):
+    return Decimal(str(value or 0))
+
+
+# ==================== ACTIONS ====================
+# Κάθε action: (eligible(row) -> None ή λόγος παράλειψης, values για το UPDATE,
+#               νέο payment_status(row) για τους counters)
+
+def _open_only(row):
+    if row.payment_status == 'paid':
+        return 'Η συναλλαγή είναι ήδη εξοφλημένη'
+    if row.payment_status == 'cancelled':
+        return 'Η συναλλαγή είναι ακυρωμένη'
+    return None
+
+
+def _mark_paid(params, now):
+    values = {
+        'payment_status': 'paid',
+        'paid_amount': Transaction.total_amount - func.coalesce(Transaction.insurance_coverage, 0),
+        'payment_date': now
+    }
+    return _open_only, values, lambda row: 'paid'
+
+
+def _cancel(params, now):
+    return _open_only, {'payment_status': 'cancelled'}, lambda row: 'cancelled'
+
+
+def _set_payment_method(params, now):
+    method = params.get('payment_method')
+    if method not in PAYMENT_METHODS:
+        raise BulkActionError('Μη έγκυρος τρόπος πληρωμής.')
+
+    def _eligible(row):
+        if row.payment_status == 'cancelled':
+            return 'Η συναλλαγή είναι ακυρωμένη'
+        if row.payment_method == method:
+            return 'Ο τρόπος πληρωμής είναι ήδη ο ίδιος'
+        return None
+
+    return _eligible, {'payment_method': method}, lambda row: row.payment_status
+
+
+def _apply_insurance(params, now):
+    """Κάλυψη ως ποσοστό (coverage_percent) ή ποσό (amount, έως το σύνολο)"""
+    try:
+        if params.get('coverage_percent') not in (None, ''):
+            percent = Decimal(str(params['coverage_percent']))
+            if not 0 <= percent <= 100:
+                raise BulkActionError('Το ποσοστό κάλυψης πρέπει να είναι από 0 έως 100.')
+            coverage = func.round(Transaction.total_amount * percent / 100, 2)
+            expected = lambda row: (_amount(row.total_amount) * percent / 100).quantize(CENT, ROUND_HALF_UP)
+        elif params.get('amount') not in (None, ''):
+            amount = Decimal(str(params['amount'])).quantize(CENT)
+            if amount < 0:
+                raise BulkActionError('Μη έγκυρο ποσό κάλυψης.')
+            coverage = case((Transaction.total_amount < amount, Transaction.total_amount), else_=amount)
+            expected = lambda row: min(_amount(row.total_amount), amount)
+        else:
+            raise BulkActionError('Ορίστε ποσοστό ή ποσό κάλυψης.')
+    except ArithmeticError:
+        raise BulkActionError('Μη έγκυρη τιμή κάλυψης.')
+
+    # Εξόφληση όταν πληρωμή + κάλυψη καλύπτουν το σύνολο
+    settled = func.coalesce(Transaction.paid_amount, 0) + coverage >= Transaction.total_amount
+    values = {
+        'insurance_coverage': coverage,
+        'payment_status': case((settled, 'paid'), else_=Transaction.payment_status),
+        'payment_date': case((settled, now), else_=Transaction.payment_date)
+    }
+    if params.get('claim_number'):
+        values['insurance_claim_number'] = str(params['claim_number'])[:50]
+
+    def _new_status(row):
+        if _amount(row.paid_amount) + expected(row) >= _amount(row.total_amount):
+            return 'paid'
+        return row.payment_status
+
+    return _open_only, values, _new_status
+
+
+BULK_ACTIONS = {
+    'mark_paid': _mark_paid,
+    'cancel': _cancel,
+    'set_payment_method': _set_payment_method,
+    'apply_insurance': _apply_insurance,
+}
+
+
+# ==================== EXECUTION ====================
+
+def _parse_ids(transaction_ids):
+    ids = []
+    for value in transaction_ids or []:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            raise BulkActionError('Μη έγκυρο id συναλλαγής.')
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise BulkActionError('Δεν επιλέχθηκαν συναλλαγές.')
+    if len(ids) > MAX_BULK_TRANSACTIONS:
+        raise BulkActionError(f'Έως {MAX_BULK_TRANSACTIONS} συναλλαγές ανά ενέργεια.')
+    return ids
+
+
+def bulk_update(action, transaction_ids, params=None):
+    """
+    Εκτέλεση action σε όλες τις συναλλαγές με ένα UPDATE
+    Return summary dict με 'updated', 'skipped' και 'results' ανά συναλλαγή
+    (status, reason και not_found όταν το id δεν υπάρχει)
+    Raises BulkActionError για άγνωστη ενέργεια ή μη έγκυρες παραμέτρους
+    """
+    if action not in BULK_ACTIONS:
+        raise BulkActionError('Άγνωστη ενέργεια.')
+    ids = _parse_ids(transaction_ids)
+    now = datetime.utcnow()
+    eligible, values, new_status = BULK_ACTIONS[action](params or {}, now)
+
+    # Κλείδωμα των rows (MySQL) ώστε ο έλεγχος και το UPDATE να βλέπουν την ίδια κατάσταση
+    rows = {row.id: row for row in db.session.execute(
+        db.select(Transaction.id, Transaction.patient_id, Transaction.invoice_number,
+                  Transaction.transaction_date, Transaction.payment_status, Transaction.payment_method,
+                  Transaction.total_amount, Transaction.paid_amount)
+        .where(Transaction.id.in_(ids)).with_for_update()
+    )}
+
+    results = []
+    selected = []
+    for transaction_id in ids:
+        row = rows.get(transaction_id)
+        reason = 'Η συναλλαγή δεν βρέθηκε' if row is None else eligible(row)
+        results.append({
+            'id': transaction_id,
+            'invoice_number': row.invoice_number if row is not None else None,
+            'status': 'skipped' if reason else 'updated',
+            'reason': reason,
+            'not_found': row is None
+        })
+        if not reason:
+            selected.append(row)
+
+    if selected:
+        connection = db.session.connection()
+        db.session.execute(
+            db.update(Transaction).where(Transaction.id.in_([row.id for row in selected])).values(values)
+            .execution_options(synchronize_session=False)
+        )
+
+        # Ό,τι θα έκαναν τα mapper events: counters, accounts, patient cards
+        key_function = COUNTED_MODELS[Transaction][1]
+        deltas = Counter()
+        for row in selected:
+            deltas.update(key_function({'transaction_date': row.transaction_date,
+                                        'payment_status': new_status(row)}))
+            deltas.subtract(key_function({'transaction_date': row.transaction_date,
+                                          'payment_status': row.payment_status}))
+        increment_counters(connection, deltas)
+
+        patient_ids = {row.patient_id for row in selected}
+        refresh_accounts(connection, patient_ids)
+        touch_patients(connection, patient_ids)
+        db.session.commit()
+        evict_patient_cards(patient_ids)
+
+    updated = len(selected)
+    return {
+        'action': action,
+        'updated': updated,
+        'skipped': len(results) - updated,
+        'results': results
+    }
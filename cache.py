@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+cache.py
+In-process caching utilities για Dr. PLATI
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded LRU cache με TTL ανά entry (per-process, thread-safe)
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Return cached value ή υπολογισμός με factory() και αποθήκευση"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Delete entries για τα οποία predicate(key, value) είναι True"""
+        with self._lock:
+            stale = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SearchResultCache:
+    """
+    Cache αποτελεσμάτων αναζήτησης ασθενών, keyed σε (endpoint, normalized term)
+    - Local backend: TTLCache με ακριβές invalidation ανά entry
+    - Shared backend (Flask-Caching, π.χ. Redis): entries ανά generation,
+      το invalidation αυξάνει το generation
+    """
+
+    GENERATION_KEY = 'patient_search:generation'
+
+    def __init__(self, maxsize=512, ttl=60):
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._shared = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize=None, ttl=None, shared_backend=None):
+        if ttl:
+            self.ttl = ttl
+        self._local = TTLCache(maxsize=maxsize or self._local.maxsize, ttl=self.ttl)
+        self._shared = shared_backend
+
+    def _count(self, attribute):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _shared_key(self, endpoint, term):
+        generation = self._shared.get(self.GENERATION_KEY) or 0
+        return f'patient_search:{generation}:{endpoint}:{term}'
+
+    def get(self, endpoint, term):
+        """Return cached results ή None"""
+        if self._shared is not None:
+            entry = self._shared.get(self._shared_key(endpoint, term))
+        else:
+            entry = self._local.get((endpoint, term))
+
+        if entry is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry['results']
+
+    def set(self, endpoint, term, results, patient_ids):
+        entry = {'results': results, 'ids': list(patient_ids), 'term': term}
+        if self._shared is not None:
+            self._shared.set(self._shared_key(endpoint, term), entry, timeout=self.ttl)
+        else:
+            self._local.set((endpoint, term), entry)
+
+    def invalidate(self, patient_ids, term_matches):
+        """
+        Invalidate entries που επηρεάζονται από αλλαγές ασθενών
+        patient_ids: ασθενείς που άλλαξαν
+        term_matches: callable(term) -> True αν οι νέες τιμές ταιριάζουν στον όρο
+        """
+        self._count('invalidations')
+
+        if self._shared is not None:
+            if hasattr(self._shared, 'inc'):
+                self._shared.inc(self.GENERATION_KEY)
+            else:
+                self._shared.set(self.GENERATION_KEY, (self._shared.get(self.GENERATION_KEY) or 0) + 1,
+                                 timeout=0)
+            return
+
+        patient_ids = set(patient_ids)
+        self._local.delete_where(
+            lambda key, entry: bool(patient_ids.intersection(entry['ids'])) or term_matches(entry['term'])
+        )
+
+    def clear(self):
+        self._local.clear()
+        if self._shared is not None:
+            self.invalidate([], lambda term: True)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': 'shared' if self._shared is not None else 'local',
+            'entries': len(self._local) if self._shared is None else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+            'invalidations': self.invalidations
+        }
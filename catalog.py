@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+catalog.py
+Κατάλογος υπηρεσιών (services) για το Dr. PLATI
+Ο κατάλογος αλλάζει λίγες φορές τον χρόνο, οπότε κρατιέται στη μνήμη κάθε
+worker μαζί με ένα version stamp (MAX(updated_at), COUNT(*)) του πίνακα.
+Το stamp ελέγχεται το πολύ κάθε CATALOG_VERSION_TTL δευτερόλεπτα και το
+ETag του /api/services προκύπτει από αυτό, ώστε οι browsers να παίρνουν 304.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import func
+from extensions import db
+from models import Service
+from cache import TTLCache
+from events import on_commit
+
+
+CatalogService = namedtuple('CatalogService', ['id', 'name', 'description', 'price', 'category'])
+
+
+class ServiceCatalog:
+    """Immutable snapshot του καταλόγου για ένα version"""
+
+    def __init__(self, version, services):
+        self.version = version
+        self.services = tuple(services)
+        self.payload = json.dumps([{
+            'id': s.id,
+            'name': s.name,
+            'description': s.description,
+            'price': float(s.price),
+            'category': s.category
+        } for s in self.services], ensure_ascii=False)
+        self.etag = hashlib.sha1(f'{version}:{self.payload}'.encode('utf-8')).hexdigest()[:20]
+
+    def __iter__(self):
+        return iter(self.services)
+
+    def __len__(self):
+        return len(self.services)
+
+    def get(self, service_id):
+        for service in self.services:
+            if service.id == service_id:
+                return service
+        return None
+
+
+_version_cache = TTLCache(maxsize=1, ttl=10)
+_catalog = None
+
+
+def _load_version():
+    """Version stamp του πίνακα services (ένα μικρό aggregate query)"""
+    row = db.session.execute(db.select(func.max(Service.updated_at), func.count(Service.id))).one()
+    updated_at, count = row
+    return f"{updated_at.isoformat() if updated_at else '-'}/{count}"
+
+
+def _load_services():
+    return [CatalogService(row.id, row.name, row.description, row.price, row.category)
+            for row in db.session.execute(
+                db.select(Service.id, Service.name, Service.description, Service.price, Service.category)
+                .where(Service.is_active == True).order_by(Service.name)
+            )]
+
+
+def get_catalog():
+    """Ενεργές υπηρεσίες (cached ανά version stamp)"""
+    global _catalog
+
+    ttl = current_app.config.get('CATALOG_VERSION_TTL', 10) if has_app_context() else None
+    version = _version_cache.get_or_set('version', _load_version, ttl)
+
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        catalog = _catalog = ServiceCatalog(version, _load_services())
+    return catalog
+
+
+def clear_catalog_cache():
+    global _catalog
+    _version_cache.clear()
+    _catalog = None
+
+
+@on_commit(Service)
+def _invalidate_catalog(changes):
+    """Τοπική ανανέωση αμέσως - οι άλλοι workers τη βλέπουν από το version stamp"""
+    clear_catalog_cache()
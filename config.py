@@ -55,6 +55,56 @@ class Config:
     ENABLE_EMAIL_NOTIFICATIONS = os.environ.get('ENABLE_EMAIL_NOTIFICATIONS', 'false').lower() in ['true', 'on', '1']
     ENABLE_SMS_NOTIFICATIONS = os.environ.get('ENABLE_SMS_NOTIFICATIONS', 'false').lower() in ['true', 'on', '1']
     
+    # Full-text search engine: 'mysql', 'sqlite', 'like' (κενό = αυτόματα από τη βάση)
+    FULLTEXT_ENGINE = os.environ.get('FULLTEXT_ENGINE')
+    
+    # Total στις μεγάλες λίστες: 'exact', 'cached', 'approximate', 'none'
+    LIST_TOTAL_COUNT = os.environ.get('LIST_TOTAL_COUNT', 'cached')
+    
+    # Patient search result cache: 'local' (per-process) ή 'flask-caching' (CACHE_TYPE)
+    SEARCH_CACHE_BACKEND = os.environ.get('SEARCH_CACHE_BACKEND', 'local')
+    SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE') or 512)
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL') or 60)
+    
+    # Patient search index: κάθε πόσα seconds ελέγχεται το version stamp των ασθενών (αλλαγές άλλων workers)
+    PATIENT_INDEX_VERSION_TTL = int(os.environ.get('PATIENT_INDEX_VERSION_TTL') or 10)
+    
+    # Dashboard counters από τον πίνακα daily_counters (False = απευθείας COUNT με date ranges)
+    USE_DAILY_COUNTERS = os.environ.get('USE_DAILY_COUNTERS', 'true').lower() in ['true', 'on', '1']
+    
+    # Dashboard/admin statistics cache (seconds, κοινό για όλους τους χρήστες)
+    STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL') or 30)
+    
+    # Patient card cache (seconds, key: patient id + cards_version)
+    PATIENT_CARD_CACHE_TTL = int(os.environ.get('PATIENT_CARD_CACHE_TTL') or 300)
+    
+    # Κατάλογος υπηρεσιών: κάθε πόσα seconds ελέγχεται το version stamp του πίνακα services
+    CATALOG_VERSION_TTL = int(os.environ.get('CATALOG_VERSION_TTL') or 10)
+    
+    # Αναφορές: κάθε πόσα seconds γίνεται incremental refresh των rollups (ανά worker)
+    REPORTS_REFRESH_INTERVAL = int(os.environ.get('REPORTS_REFRESH_INTERVAL') or 60)
+    
+    # Χρονοδιάγραμμα εμβολιασμών για την κάλυψη: {vaccine_type: [ηλικία σε μήνες ανά δόση]} (None = vaccination.DEFAULT_SCHEDULE)
+    VACCINATION_SCHEDULE = None
+    
+    # Όριο SQL queries ανά request (None = χωρίς έλεγχο, βλ. query_guard.py)
+    MAX_QUERIES_PER_REQUEST = int(os.environ.get('MAX_QUERIES_PER_REQUEST') or 0) or None
+    QUERY_GUARD_RAISE = False
+    
+    # Live updates (SSE): Redis pub/sub για να φτάνουν τα events σε όλους τους workers
+    EVENT_BUS_REDIS_URL = os.environ.get('EVENT_BUS_REDIS_URL')
+    
+    # Αρίθμηση τιμολογίων/βεβαιώσεων: πόσοι αριθμοί δεσμεύονται ανά worker (1 = αυστηρά διαδοχικοί)
+    SEQUENCE_BLOCK_SIZE = int(os.environ.get('SEQUENCE_BLOCK_SIZE') or 20)
+    
+    # Background jobs (PDF): threads ανά worker, φάκελος αρχείων (default: instance/generated)
+    # και διάρκεια διατήρησης τους
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_OUTPUT_DIR = os.environ.get('JOB_OUTPUT_DIR')
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL') or 24 * 3600)
+    JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT') or 600)
+    JOBS_EAGER = False  # True = εκτέλεση μέσα στο request (tests, χωρίς threads)
+    
     # Backup settings
     BACKUP_DIR = os.environ.get('BACKUP_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups')
     AUTO_BACKUP = os.environ.get('AUTO_BACKUP', 'false').lower() in ['true', 'on', '1']
@@ -92,6 +142,9 @@ class DevelopmentConfig(Config):
     MAIL_SUPPRESS_SEND = True
     MAIL_DEBUG = True
     
+    # Warning στο log για requests με πολλά queries (πιθανό N+1)
+    MAX_QUERIES_PER_REQUEST = 40
+    
     @staticmethod
     def init_app(app):
         Config.init_app(app)
@@ -113,8 +166,9 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = False
     
-    # In-memory database για testing
+    # In-memory database για testing (χωρίς τα pool options του MySQL)
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
     
     # Disable CSRF για easier testing
     WTF_CSRF_ENABLED = False
@@ -125,6 +179,13 @@ class TestingConfig(Config):
     # Disable email sending
     MAIL_SUPPRESS_SEND = True
     
+    # N+1 detection: αποτυχία αν ένα request ξεπεράσει το όριο queries
+    MAX_QUERIES_PER_REQUEST = 25
+    QUERY_GUARD_RAISE = True
+    
+    # Background jobs εκτελούνται συγχρονικά
+    JOBS_EAGER = True
+    
     # Disable features που δεν χρειάζονται στα tests
     ENABLE_STEALTH_FEATURES = False
     ENABLE_EMAIL_NOTIFICATIONS = False
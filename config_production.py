@@ -56,6 +56,13 @@ class ProductionConfig:
     CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     CACHE_DEFAULT_TIMEOUT = 300
     
+    # Patient search result cache μέσω Flask-Caching (κοινό για όλους τους workers)
+    SEARCH_CACHE_BACKEND = os.environ.get('SEARCH_CACHE_BACKEND', 'flask-caching')
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', '60'))
+    
+    # Live updates (SSE) μέσω Redis pub/sub για όλους τους gunicorn workers
+    EVENT_BUS_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    
     # Rate limiting
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/1')
     RATELIMIT_DEFAULT = "100 per hour"
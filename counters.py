@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+counters.py
+Ημερήσιοι μετρητές (daily_counters) για το dashboard του Dr. PLATI
+Ενημερώνονται στο ίδιο transaction με τα INSERT/UPDATE/DELETE των
+visits, patients και transactions, ώστε το dashboard να διαβάζει
+λίγα rows αντί να κάνει aggregate σε όλο το ιστορικό.
+"""
+
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import event, inspect, func
+from extensions import db
+from models import Visit, Patient, Transaction, DailyCounter
+
+
+# ==================== COUNTER KEYS ====================
+
+def _as_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _visit_keys(values):
+    day = _as_day(values.get('visit_date'))
+    if day is None:
+        return []
+    return [
+        (day, 'visits', ''),
+        (day, 'visits', f"type:{values.get('visit_type') or 'checkup'}"),
+        (day, 'visits', f"doctor:{values.get('doctor_id')}")
+    ]
+
+
+def _patient_keys(values):
+    day = _as_day(values.get('created_at'))
+    return [(day, 'new_patients', '')] if day else []
+
+
+def _transaction_keys(values):
+    day = _as_day(values.get('transaction_date'))
+    if day is None or values.get('payment_status', 'pending') != 'pending':
+        return []
+    return [(day, 'pending_transactions', '')]
+
+
+# model -> (columns που επηρεάζουν τα keys, key function)
+COUNTED_MODELS = {
+    Visit: (['visit_date', 'visit_type', 'doctor_id'], _visit_keys),
+    Patient: (['created_at'], _patient_keys),
+    Transaction: (['transaction_date', 'payment_status'], _transaction_keys),
+}
+
+
+# ==================== UPSERT ====================
+
+def increment_counters(connection, deltas):
+    """
+    Atomic increment των counters (deltas: dict (day, metric, dimension) -> delta)
+    Χρησιμοποιεί native upsert (MySQL ON DUPLICATE KEY / SQLite ON CONFLICT)
+    """
+    rows = [{'day': day, 'metric': metric, 'dimension': dimension, 'value': delta}
+            for (day, metric, dimension), delta in deltas.items() if delta]
+    if not rows:
+        return
+
+    table = DailyCounter.__table__
+    dialect = connection.dialect.name
+
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update(value=table.c.value + statement.inserted.value)
+        connection.execute(statement, rows)
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.metric, table.c.dimension],
+            set_={'value': table.c.value + statement.excluded.value}
+        )
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            result = connection.execute(
+                table.update().where(table.c.day == row['day'], table.c.metric == row['metric'],
+                                     table.c.dimension == row['dimension'])
+                .values(value=table.c.value + row['value'])
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert(), [row])
+
+
+# ==================== MAPPER EVENTS ====================
+
+def _current_values(target, columns):
+    return {column: getattr(target, column) for column in columns}
+
+
+def _previous_values(target, columns):
+    """Τιμές πριν το UPDATE (από το attribute history)"""
+    state = inspect(target)
+    values = {}
+    for column in columns:
+        history = state.attrs[column].history
+        if history.deleted:
+            values[column] = history.deleted[0]
+        else:
+            values[column] = getattr(target, column)
+    return values
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    """No-op set listener (υπάρχει μόνο για το active_history)"""
+    pass
+
+
+def _register(model, columns, key_function):
+    def _after_insert(mapper, connection, target):
+        increment_counters(connection, Counter(key_function(_current_values(target, columns))))
+
+    def _after_update(mapper, connection, target):
+        state = inspect(target)
+        if not any(state.attrs[column].history.has_changes() for column in columns):
+            return
+        deltas = Counter(key_function(_current_values(target, columns)))
+        deltas.subtract(key_function(_previous_values(target, columns)))
+        increment_counters(connection, deltas)
+
+    def _after_delete(mapper, connection, target):
+        deltas = Counter()
+        deltas.subtract(key_function(_current_values(target, columns)))
+        increment_counters(connection, deltas)
+
+    event.listen(model, 'after_insert', _after_insert)
+    event.listen(model, 'after_update', _after_update)
+    event.listen(model, 'after_delete', _after_delete)
+
+    # active_history: η παλιά τιμή φορτώνεται στο set, ώστε να αφαιρεθεί από τον σωστό counter
+    for column in columns:
+        event.listen(getattr(model, column), 'set', _keep_history, active_history=True)
+
+
+for _model, (_columns, _key_function) in COUNTED_MODELS.items():
+    _register(_model, _columns, _key_function)
+
+
+# ==================== QUERIES ====================
+
+def counter_sum_select(metric, dimension='', start=None, end=None):
+    """SELECT SUM των counters για metric/dimension στο [start, end) (dates, προαιρετικά)"""
+    query = db.select(func.coalesce(func.sum(DailyCounter.value), 0)).where(
+        DailyCounter.metric == metric, DailyCounter.dimension == dimension
+    )
+    if start is not None:
+        query = query.where(DailyCounter.day >= start)
+    if end is not None:
+        query = query.where(DailyCounter.day < end)
+    return query
+
+
+def counter_sum(metric, dimension='', start=None, end=None):
+    """
+    SUM των counters για metric/dimension στο [start, end) (dates, προαιρετικά)
+    """
+    return int(db.session.execute(counter_sum_select(metric, dimension, start, end)).scalar())
+
+
+def rebuild_counters():
+    """
+    Rebuild όλων των counters από τα raw δεδομένα (χρησιμοποιείται από το migration)
+    """
+    deltas = Counter()
+    for model, (columns, key_function) in COUNTED_MODELS.items():
+        rows = db.session.execute(
+            db.select(*[getattr(model, column) for column in columns]).execution_options(yield_per=5000)
+        )
+        for row in rows:
+            deltas.update(key_function(dict(row._mapping)))
+
+    connection = db.session.connection()
+    connection.execute(DailyCounter.__table__.delete())
+    increment_counters(connection, deltas)
+    db.session.commit()
+    return len(deltas)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+diagnoses.py
+Κωδικοποιημένες διαγνώσεις επισκέψεων (ICD-10) για το Dr. PLATI
+Κάθε κωδικός μιας επίσκεψης αποθηκεύεται ως row στο visit_diagnoses με
+αντίγραφο του visit_date, ώστε οι "συχνότερες διαγνώσεις" μιας περιόδου να
+είναι ένα GROUP BY code στο idx_visit_diagnosis_code αντί για GROUP BY στο
+ελεύθερο κείμενο του assessment.
+"""
+
+import re
+from datetime import datetime, date
+from sqlalchemy import event, inspect, func, desc
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import Visit, VisitDiagnosis
+
+
+# ICD-10: κεφαλαίο γράμμα, δύο ψηφία (ή ψηφίο και A/B) και προαιρετικά υποκατηγορία, π.χ. J06.9, H66.90
+ICD10_PATTERN = re.compile(r'(?<![A-Za-z0-9.])([A-TV-Z])([0-9][0-9AB])(?:\.?([0-9A-TV-Z]{1,4}))?(?![A-Za-z0-9])')
+
+
+def normalize_code(code):
+    """'j069' / 'J06.9' -> 'J06.9', None αν δεν είναι έγκυρος κωδικός"""
+    match = ICD10_PATTERN.fullmatch((code or '').strip().upper())
+    if match is None:
+        return None
+    letter, category, subcategory = match.groups()
+    return f'{letter}{category}.{subcategory}' if subcategory else f'{letter}{category}'
+
+
+def parse_icd10_codes(text):
+    """Μοναδικοί κωδικοί ICD-10 με τη σειρά εμφάνισης τους σε ελεύθερο κείμενο"""
+    codes = []
+    for match in ICD10_PATTERN.finditer(text or ''):
+        code = normalize_code(match.group(0))
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def _description(text):
+    """Κείμενο διάγνωσης χωρίς τους κωδικούς (π.χ. 'Οξεία μέση ωτίτιδα (H66.9)')"""
+    text = ICD10_PATTERN.sub('', text or '')
+    text = re.sub(r'\(\s*[,;]?\s*\)|\[\s*\]', '', text)
+    text = re.sub(r'\s+([,;.])', r'\1', ' '.join(text.split()))
+    return text.strip(' -:;,')[:200] or None
+
+
+def diagnosis_values(codes, description=None):
+    """
+    Dicts τιμών για VisitDiagnosis: ο πρώτος κωδικός είναι ο κύριος και παίρνει
+    το κείμενο της διάγνωσης. codes: λίστα ή κείμενο (π.χ. "J06.9, H66.9")
+    """
+    if isinstance(codes, str):
+        codes = re.split(r'[\s,;]+', codes)
+    codes = dict.fromkeys(filter(None, (normalize_code(code) for code in codes or [])))
+    description = _description(description)
+    values = []
+    for position, code in enumerate(codes):
+        values.append({
+            'code': code,
+            'description': description if position == 0 else None,
+            'is_primary': position == 0,
+            'position': position
+        })
+    return values
+
+
+def build_diagnoses(codes, description, visit_date):
+    """VisitDiagnosis objects από τα πεδία icd10_codes/diagnosis της φόρμας επίσκεψης"""
+    return [VisitDiagnosis(visit_date=visit_date, **values) for values in diagnosis_values(codes, description)]
+
+
+# ==================== SYNC ====================
+
+@event.listens_for(Visit, 'after_update')
+def _sync_diagnosis_dates(mapper, connection, target):
+    """Αλλαγή ημερομηνίας επίσκεψης: ενημέρωση του αντιγράφου στις διαγνώσεις"""
+    if not inspect(target).attrs.visit_date.history.has_changes():
+        return
+    table = VisitDiagnosis.__table__
+    connection.execute(table.update().where(table.c.visit_id == target.id).values(visit_date=target.visit_date))
+
+
+# ==================== QUERIES ====================
+
+def _bound(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, datetime.min.time())
+    return value
+
+
+def top_diagnoses_select(start=None, end=None, limit=5, primary_only=False):
+    """
+    Top-N κωδικοί στο [start, end): GROUP BY code στο (code, visit_date) index,
+    και για τους N κωδικούς μόνο η πιο πρόσφατη περιγραφή τους
+    """
+    counts = db.select(VisitDiagnosis.code, func.count().label('count'))
+    if start is not None:
+        counts = counts.where(VisitDiagnosis.visit_date >= _bound(start))
+    if end is not None:
+        counts = counts.where(VisitDiagnosis.visit_date < _bound(end))
+    if primary_only:
+        counts = counts.where(VisitDiagnosis.is_primary == True)
+    top = counts.group_by(VisitDiagnosis.code).order_by(desc('count'), VisitDiagnosis.code).limit(limit).subquery()
+
+    latest = aliased(VisitDiagnosis)
+    description = db.select(latest.description).where(
+        latest.code == top.c.code, latest.description.isnot(None)
+    ).order_by(latest.visit_date.desc()).limit(1).scalar_subquery()
+
+    return db.select(top.c.code, top.c.count, description.label('description')).order_by(
+        top.c.count.desc(), top.c.code
+    )
+
+
+def top_diagnoses(start=None, end=None, limit=5, primary_only=False):
+    """Συχνότερες διαγνώσεις ως list of dicts (code, name, count)"""
+    return [{
+        'code': row.code,
+        'name': row.description or row.code,
+        'count': row.count
+    } for row in db.session.execute(top_diagnoses_select(start, end, limit, primary_only))]
+
+
+# ==================== BACKFILL ====================
+
+def backfill_diagnoses(rows):
+    """
+    Insert διαγνώσεις για rows (id, visit_date, assessment) από τους κωδικούς
+    ICD-10 του κειμένου. Return πλήθος rows που προστέθηκαν
+    """
+    values = []
+    for row in rows:
+        for item in diagnosis_values(parse_icd10_codes(row.assessment), row.assessment):
+            values.append(dict(item, visit_id=row.id, visit_date=row.visit_date))
+
+    if values:
+        db.session.execute(VisitDiagnosis.__table__.insert(), values)
+    return len(values)
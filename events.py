@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+events.py
+Commit hooks για Dr. PLATI
+Συλλέγει τις αλλαγές των models σε κάθε flush και τις παραδίδει
+στους registered listeners μόνο όταν το transaction γίνει commit.
+"""
+
+import logging
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+_PENDING_KEY = 'drplati_pending_changes'
+
+# model class -> list of callbacks(changes)
+_commit_listeners = {}
+
+
+def on_commit(*models):
+    """
+    Decorator: register callback για committed αλλαγές στα δοσμένα models
+    Το callback καλείται με list of (operation, model, snapshot), όπου
+    operation είναι 'insert', 'update' ή 'delete' και snapshot dict με
+    τις τιμές των columns τη στιγμή του flush.
+    """
+    def decorator(callback):
+        for model in models:
+            _commit_listeners.setdefault(model, []).append(callback)
+        return callback
+    return decorator
+
+
+def _snapshot(obj):
+    """Column values του object (χωρίς lazy loads)"""
+    state = inspect(obj)
+    return {
+        attr.key: state.dict.get(attr.key)
+        for attr in state.mapper.column_attrs
+    }
+
+
+def _tracked_model(obj):
+    """Return registered model class για object ή None"""
+    for model in _commit_listeners:
+        if isinstance(obj, model):
+            return model
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    if not _commit_listeners:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for operation, objects in (('insert', session.new),
+                               ('update', session.dirty),
+                               ('delete', session.deleted)):
+        for obj in objects:
+            model = _tracked_model(obj)
+            if model is None:
+                continue
+            if operation == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            pending.append((operation, model, _snapshot(obj)))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    callbacks = []
+    for _, model, _ in pending:
+        for callback in _commit_listeners.get(model, []):
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    for callback in callbacks:
+        changes = [change for change in pending
+                   if callback in _commit_listeners.get(change[1], [])]
+        try:
+            callback(changes)
+        except Exception as e:
+            # Commit έχει ήδη γίνει - ένας listener δεν πρέπει να σπάσει το request
+            logging.getLogger(__name__).error(f'Commit listener {callback.__name__} failed: {e}')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
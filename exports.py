@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+exports.py
+Εξαγωγές Excel (αναφορές, ασθενείς, επισκέψεις, συναλλαγές) για το Dr. PLATI
+Τα rows διαβάζονται με server-side cursor (yield_per) και γράφονται σε
+openpyxl write-only workbook, που κρατά τα φύλλα σε temp files και όχι στη
+μνήμη. Το έτοιμο .xlsx στέλνεται σε chunks και το temp file σβήνεται στο τέλος,
+οπότε η μνήμη του worker μένει σταθερή ανεξάρτητα από το πλήθος των rows.
+"""
+
+import os
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from flask import Response
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import User, Patient, Visit, Transaction, ReportRollup
+from search import patient_search_filter
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+except ImportError:  # Το export απαιτεί openpyxl (requirements.txt)
+    Workbook = None
+
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+
+# title: όνομα φύλλου, headers: στήλες, rows: iterable ή callable που δίνει iterable
+ExportSheet = namedtuple('ExportSheet', ['title', 'headers', 'rows'])
+
+
+class ExportUnavailable(RuntimeError):
+    """Λείπει το openpyxl"""
+    pass
+
+
+# ==================== WORKBOOK ====================
+
+def stream_rows(query, formatter=None):
+    """Rows ενός SELECT με server-side cursor (σταθερή μνήμη)"""
+    result = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+    for row in result:
+        yield formatter(row) if formatter else list(row)
+
+
+def write_workbook(sheets, fileobj):
+    """Γράψιμο των sheets σε write-only workbook"""
+    if Workbook is None:
+        raise ExportUnavailable('openpyxl is not installed')
+
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+    for sheet in sheets:
+        worksheet = workbook.create_sheet(title=sheet.title[:31])
+        header = []
+        for title in sheet.headers:
+            cell = WriteOnlyCell(worksheet, value=title)
+            cell.font = bold
+            header.append(cell)
+        worksheet.append(header)
+
+        rows = sheet.rows() if callable(sheet.rows) else sheet.rows
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(fileobj)
+
+
+def _file_chunks(path):
+    try:
+        with open(path, 'rb') as stream:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def xlsx_response(filename, sheets):
+    """Response που στέλνει το workbook σε chunks από temp file"""
+    handle, path = tempfile.mkstemp(suffix='.xlsx', prefix='drplati-export-')
+    try:
+        with os.fdopen(handle, 'wb') as fileobj:
+            write_workbook(sheets, fileobj)
+    except Exception:
+        os.unlink(path)
+        raise
+
+    return Response(_file_chunks(path), mimetype=XLSX_MIMETYPE, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Content-Length': str(os.path.getsize(path))
+    })
+
+
+def export_filename(name, start=None, end=None, extension='xlsx'):
+    if start or end:
+        period = f"{start.isoformat() if start else ''}_{end.isoformat() if end else ''}"
+    else:
+        period = date.today().isoformat()
+    return f'{name}_{period}.{extension}'
+
+
+def _date_conditions(column, start, end):
+    """[start, end] σε dates (end inclusive), sargable και για DateTime columns"""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        conditions.append(column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+
+# ==================== LISTINGS ====================
+
+def patients_sheet(search_filter=None):
+    query = db.select(
+        Patient.amka, Patient.last_name, Patient.first_name, Patient.date_of_birth, Patient.gender,
+        Patient.phone, Patient.mobile, Patient.email, Patient.city, Patient.insurance, Patient.created_at
+    ).where(Patient.is_active == True).order_by(Patient.last_name, Patient.first_name, Patient.id)
+    if search_filter is not None:
+        query = query.where(search_filter)
+
+    return ExportSheet('Ασθενείς', [
+        'ΑΜΚΑ', 'Επώνυμο', 'Όνομα', 'Ημ. Γέννησης', 'Φύλο', 'Τηλέφωνο', 'Κινητό', 'Email',
+        'Πόλη', 'Ασφάλιση', 'Εγγραφή'
+    ], lambda: stream_rows(query))
+
+
+def visits_sheet(start=None, end=None, doctor_id=None, patient_id=None, clinical=True):
+    doctor = aliased(User)
+    columns = [
+        Visit.visit_date, Patient.amka, Patient.last_name, Patient.first_name, Visit.visit_type,
+        doctor.last_name + ' ' + doctor.first_name
+    ]
+    headers = ['Ημερομηνία', 'ΑΜΚΑ', 'Επώνυμο', 'Όνομα', 'Τύπος', 'Γιατρός']
+    if clinical:
+        columns += [Visit.chief_complaint, Visit.assessment, Visit.plan]
+        headers += ['Αιτία Προσέλευσης', 'Διάγνωση', 'Θεραπευτικό Πλάνο']
+
+    query = db.select(*columns).join(Patient, Patient.id == Visit.patient_id).outerjoin(
+        doctor, doctor.id == Visit.doctor_id
+    ).where(*_date_conditions(Visit.visit_date, start, end)).order_by(Visit.visit_date, Visit.id)
+    if doctor_id:
+        query = query.where(Visit.doctor_id == doctor_id)
+    if patient_id:
+        query = query.where(Visit.patient_id == patient_id)
+
+    return ExportSheet('Επισκέψεις', headers, lambda: stream_rows(query))
+
+
+def transactions_sheet(start=None, end=None, payment_status=None, payment_method=None,
+                       patient_id=None, search=None):
+    query = db.select(
+        Transaction.invoice_number, Transaction.transaction_date, Patient.amka, Patient.last_name,
+        Patient.first_name, Transaction.subtotal, Transaction.discount, Transaction.tax_amount,
+        Transaction.total_amount, Transaction.paid_amount, Transaction.insurance_coverage,
+        Transaction.total_amount - func.coalesce(Transaction.paid_amount, 0)
+        - func.coalesce(Transaction.insurance_coverage, 0),
+        Transaction.payment_method, Transaction.payment_status, Transaction.payment_date
+    ).join(Patient, Patient.id == Transaction.patient_id).order_by(Transaction.transaction_date, Transaction.id)
+
+    if start is not None:
+        query = query.where(Transaction.transaction_date >= start)
+    if end is not None:
+        query = query.where(Transaction.transaction_date <= end)
+    if payment_status:
+        query = query.where(Transaction.payment_status == payment_status)
+    if payment_method:
+        query = query.where(Transaction.payment_method == payment_method)
+    if patient_id:
+        query = query.where(Transaction.patient_id == patient_id)
+    if search:
+        patient_filter = patient_search_filter(search, include_phones=False)
+        invoice_filter = Transaction.invoice_number.like(f'{search}%')
+        query = query.where(or_(invoice_filter, patient_filter) if patient_filter is not None else invoice_filter)
+
+    return ExportSheet('Συναλλαγές', [
+        'Τιμολόγιο', 'Ημερομηνία', 'ΑΜΚΑ', 'Επώνυμο', 'Όνομα', 'Υποσύνολο', 'Έκπτωση', 'ΦΠΑ',
+        'Σύνολο', 'Πληρωμένο', 'Ασφάλεια', 'Υπόλοιπο', 'Τρόπος Πληρωμής', 'Κατάσταση', 'Ημ. Πληρωμής'
+    ], lambda: stream_rows(query))
+
+
+# ==================== REPORTS ====================
+
+def report_sheets(stats, start, end):
+    """Φύλλα της αναφοράς: σύνοψη, ημερήσια rollups και οι επισκέψεις της περιόδου"""
+    summary = [
+        ('Επισκέψεις', stats.get('total_visits')),
+        ('Μεταβολή επισκέψεων (%)', stats.get('visits_change')),
+        ('Ενεργοί ασθενείς', stats.get('total_patients')),
+        ('Νέοι ασθενείς', stats.get('new_patients')),
+        ('Εμβόλια', stats.get('total_vaccines')),
+        ('Εμβολιαστική κάλυψη (%)', stats.get('vaccination_coverage')),
+        ('Έσοδα (€)', stats.get('total_revenue')),
+        ('Εκκρεμή (€)', stats.get('pending_amount')),
+    ]
+    summary += [(f'Έσοδα - {method} (€)', amount) for method, amount in stats.get('revenue_by_method', {}).items()]
+    summary += [(f"Διάγνωση: {diagnosis['name']}", diagnosis['count']) for diagnosis in stats.get('top_diagnoses', [])]
+
+    rollups = db.select(
+        ReportRollup.day, ReportRollup.metric, ReportRollup.dimension, ReportRollup.count, ReportRollup.amount
+    ).order_by(ReportRollup.day, ReportRollup.metric, ReportRollup.dimension)
+    if start is not None:
+        rollups = rollups.where(ReportRollup.day >= start)
+    if end is not None:
+        rollups = rollups.where(ReportRollup.day <= end)
+
+    return [
+        ExportSheet('Σύνοψη', ['Μέτρηση', 'Τιμή'], [list(item) for item in summary]),
+        ExportSheet('Ημερήσια', ['Ημέρα', 'Μέτρηση', 'Διάσταση', 'Πλήθος', 'Ποσό'], lambda: stream_rows(rollups)),
+        visits_sheet(start, end, clinical=False),
+    ]
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+fulltext.py
+Full-text search engines για Dr. PLATI
+- MySQL: FULLTEXT indexes στους πίνακες patients/visits (MATCH ... AGAINST)
+- SQLite: FTS5 shadow tables με normalized κείμενο (testing / single-clinic)
+- LIKE: fallback χωρίς index για άλλες βάσεις
+"""
+
+import re
+from abc import ABC, abstractmethod
+from flask import current_app
+from sqlalchemy import event, inspect, text
+from extensions import db
+from models import Patient, Visit
+from utils import normalize_search_term
+
+
+# Searchable text columns ανά scope
+SEARCH_SCOPES = {
+    'patients': {
+        'model': Patient,
+        'table': 'patients',
+        'fts_table': 'patients_fts',
+        'columns': ['first_name', 'last_name', 'father_name', 'father_surname',
+                    'mother_name', 'mother_surname', 'city', 'notes', 'allergies'],
+        'where': 'patients.is_active = 1'
+    },
+    'visits': {
+        'model': Visit,
+        'table': 'visits',
+        'fts_table': 'visits_fts',
+        'columns': ['chief_complaint', 'assessment', 'plan', 'medications'],
+        'where': 'visits.patient_id IN (SELECT id FROM patients WHERE patients.is_active = 1)'
+    }
+}
+
+
+def _query_words(query):
+    """Normalized λέξεις του query χωρίς search operators"""
+    term = normalize_search_term(query)
+    term = re.sub(r'[+\-<>()~*"@:^]', ' ', term)
+    return term.split()
+
+
+class FullTextEngine(ABC):
+    """Base class - κάθε engine επιστρέφει (list of (id, score), total)"""
+    name = None
+
+    def create_schema(self, connection):
+        """Create engine-specific structures (αν χρειάζονται)"""
+        pass
+
+    def rebuild(self, connection):
+        """Rebuild index από τους βασικούς πίνακες (αν χρειάζεται)"""
+        pass
+
+    @abstractmethod
+    def search(self, scope, query, page=1, per_page=20):
+        """Ranked σελίδα αποτελεσμάτων του scope, return (list of (id, score), total)"""
+
+
+class MySQLFullTextEngine(FullTextEngine):
+    """MATCH ... AGAINST σε BOOLEAN MODE πάνω στα FULLTEXT indexes (βλ. models.py)"""
+    name = 'mysql'
+
+    def search(self, scope, query, page=1, per_page=20):
+        config = SEARCH_SCOPES[scope]
+        words = _query_words(query)
+        if not words:
+            return [], 0
+
+        table = config['table']
+        match = f"MATCH({', '.join(f'{table}.{c}' for c in config['columns'])}) AGAINST (:q IN BOOLEAN MODE)"
+        params = {
+            'q': ' '.join(f'+{word}*' for word in words),
+            'limit': per_page,
+            'offset': (page - 1) * per_page
+        }
+
+        rows = db.session.execute(text(
+            f"SELECT {table}.id, {match} AS score FROM {table} "
+            f"WHERE {match} AND {config['where']} "
+            f"ORDER BY score DESC, {table}.id DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+        total = db.session.execute(text(
+            f"SELECT COUNT(*) FROM {table} WHERE {match} AND {config['where']}"
+        ), params).scalar()
+
+        return [(row.id, float(row.score)) for row in rows], total
+
+
+class SQLiteFTS5Engine(FullTextEngine):
+    """
+    FTS5 shadow tables (rowid = id του βασικού πίνακα)
+    Το κείμενο αποθηκεύεται normalized (lowercase, χωρίς τόνους) γιατί ο
+    unicode61 tokenizer δεν αφαιρεί τους ελληνικούς τόνους.
+    """
+    name = 'sqlite'
+
+    def create_schema(self, connection):
+        for config in SEARCH_SCOPES.values():
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {config['fts_table']} "
+                f"USING fts5({', '.join(config['columns'])}, tokenize='unicode61')"
+            ))
+
+    def rebuild(self, connection):
+        for scope, config in SEARCH_SCOPES.items():
+            connection.execute(text(f"DELETE FROM {config['fts_table']}"))
+            rows = connection.execute(text(
+                f"SELECT id, {', '.join(config['columns'])} FROM {config['table']}"
+            )).mappings().all()
+            for row in rows:
+                sync_row(connection, scope, row['id'], row)
+
+    def search(self, scope, query, page=1, per_page=20):
+        config = SEARCH_SCOPES[scope]
+        words = _query_words(query)
+        if not words:
+            return [], 0
+
+        fts, table = config['fts_table'], config['table']
+        params = {
+            'q': ' '.join(f'"{word}"*' for word in words),
+            'limit': per_page,
+            'offset': (page - 1) * per_page
+        }
+        base = (f"FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid "
+                f"WHERE {fts} MATCH :q AND {config['where']}")
+
+        rows = db.session.execute(text(
+            f"SELECT {fts}.rowid AS id, -bm25({fts}) AS score {base} "
+            f"ORDER BY bm25({fts}) LIMIT :limit OFFSET :offset"
+        ), params).all()
+        total = db.session.execute(text(f"SELECT COUNT(*) {base}"), params).scalar()
+
+        return [(row.id, float(row.score)) for row in rows], total
+
+
+# Τόνοι που αφαιρεί το normalize_search_term, μαζί με τα κεφαλαία γιατί το LOWER()
+# κάποιων βάσεων (π.χ. SQLite) μετατρέπει μόνο ASCII
+_ACCENTS = {
+    'ά': 'α', 'έ': 'ε', 'ή': 'η', 'ί': 'ι', 'ό': 'ο', 'ύ': 'υ', 'ώ': 'ω', 'ΐ': 'ι', 'ΰ': 'υ',
+    'Ά': 'α', 'Έ': 'ε', 'Ή': 'η', 'Ί': 'ι', 'Ό': 'ο', 'Ύ': 'υ', 'Ώ': 'ω'
+}
+
+
+def _normalized_column(model, name):
+    """
+    Column σε μορφή normalize_search_term: το indexed *_search column αν υπάρχει
+    (π.χ. Patient.last_name_search), αλλιώς LOWER και αφαίρεση τόνων στο SQL
+    """
+    search_column = getattr(model, f'{name}_search', None)
+    if search_column is not None:
+        return search_column
+    expression = db.func.lower(getattr(model, name))
+    for accented, plain in _ACCENTS.items():
+        expression = db.func.replace(expression, accented, plain)
+    return expression
+
+
+class LikeFullTextEngine(FullTextEngine):
+    """Fallback χωρίς full-text index (LIKE στα normalized columns)"""
+    name = 'like'
+
+    def search(self, scope, query, page=1, per_page=20):
+        config = SEARCH_SCOPES[scope]
+        words = _query_words(query)
+        if not words:
+            return [], 0
+
+        model = config['model']
+        columns = [_normalized_column(model, c) for c in config['columns']]
+        conditions = [
+            db.or_(*[column.contains(word, autoescape=True) for column in columns])
+            for word in words
+        ]
+        select = db.select(model.id).where(*conditions, text(config['where']))
+
+        total = db.session.execute(
+            db.select(db.func.count()).select_from(select.subquery())
+        ).scalar()
+        ids = db.session.execute(
+            select.order_by(model.id.desc()).limit(per_page).offset((page - 1) * per_page)
+        ).scalars().all()
+
+        return [(row_id, 0.0) for row_id in ids], total
+
+
+ENGINES = {
+    'mysql': MySQLFullTextEngine,
+    'sqlite': SQLiteFTS5Engine,
+    'like': LikeFullTextEngine
+}
+
+
+def get_engine():
+    """Select engine από config FULLTEXT_ENGINE ή από το database dialect"""
+    name = current_app.config.get('FULLTEXT_ENGINE') or db.engine.dialect.name
+    return ENGINES.get(name, LikeFullTextEngine)()
+
+
+def fulltext_search(scope, query, page=1, per_page=20):
+    """
+    Ranked, paginated full-text search
+    Returns (list of (id, score), total)
+    """
+    if scope not in SEARCH_SCOPES:
+        raise ValueError(f'Unknown search scope: {scope}')
+    return get_engine().search(scope, query, page=page, per_page=per_page)
+
+
+# ==================== SQLITE SHADOW TABLE SYNC ====================
+
+def sync_row(connection, scope, row_id, values):
+    """Replace row στο FTS5 shadow table με normalized κείμενο"""
+    config = SEARCH_SCOPES[scope]
+    fts = config['fts_table']
+    columns = config['columns']
+
+    connection.execute(text(f"DELETE FROM {fts} WHERE rowid = :id"), {'id': row_id})
+    params = {c: normalize_search_term(values.get(c) or '') for c in columns}
+    params['id'] = row_id
+    connection.execute(text(
+        f"INSERT INTO {fts} (rowid, {', '.join(columns)}) "
+        f"VALUES (:id, {', '.join(':' + c for c in columns)})"
+    ), params)
+
+
+def _register_sync(scope):
+    model = SEARCH_SCOPES[scope]['model']
+    columns = SEARCH_SCOPES[scope]['columns']
+
+    def _values(connection, target):
+        """Τιμές των columns χωρίς lazy load μέσα στο flush (deferred columns από τη βάση)"""
+        state = inspect(target)
+        values = {c: state.dict[c] for c in columns if c in state.dict}
+        missing = [c for c in columns if c not in values]
+        if missing:
+            table = model.__table__
+            row = connection.execute(
+                db.select(*[table.c[c] for c in missing]).where(table.c.id == target.id)
+            ).one()
+            values.update(row._mapping)
+        return values
+
+    def _after_insert(mapper, connection, target):
+        if connection.dialect.name == 'sqlite':
+            # Νέο row: ό,τι δεν έχει οριστεί είναι NULL
+            state = inspect(target)
+            sync_row(connection, scope, target.id, {c: state.dict.get(c) for c in columns})
+
+    def _after_update(mapper, connection, target):
+        if connection.dialect.name != 'sqlite':
+            return
+        # Μόνο αν άλλαξε κάποιο searchable column
+        state = inspect(target)
+        if any(state.attrs[c].history.has_changes() for c in columns):
+            sync_row(connection, scope, target.id, _values(connection, target))
+
+    def _after_delete(mapper, connection, target):
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text(f"DELETE FROM {SEARCH_SCOPES[scope]['fts_table']} WHERE rowid = :id"),
+                               {'id': target.id})
+
+    # Στο ίδιο transaction με το INSERT/UPDATE/DELETE του βασικού πίνακα
+    event.listen(model, 'after_insert', _after_insert)
+    event.listen(model, 'after_update', _after_update)
+    event.listen(model, 'after_delete', _after_delete)
+
+
+for _scope in SEARCH_SCOPES:
+    _register_sync(_scope)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_fts_tables(target, connection, **kw):
+    """db.create_all() σε SQLite δημιουργεί και τα FTS5 shadow tables"""
+    if connection.dialect.name == 'sqlite':
+        SQLiteFTS5Engine().create_schema(connection)
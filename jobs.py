@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+jobs.py
+Background εργασίες (PDF αναφορών και βεβαιώσεων) για το Dr. PLATI
+Κάθε εργασία είναι ένα row στον πίνακα jobs και εκτελείται από ένα μικρό
+thread pool του worker, ώστε το request να επιστρέφει αμέσως και ο browser
+να κάνει polling στο status. Ίδιες εργασίες σε εξέλιξη του ίδιου χρήστη
+(kind + params + user) επιστρέφουν το υπάρχον job. Με JOBS_EAGER (tests) εκτελούνται συγχρονικά.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from extensions import db
+from models import Job
+
+
+ACTIVE_STATUSES = ('queued', 'running')
+PURGE_INTERVAL = 3600
+
+# kind -> handler(params, path) που γράφει το αρχείο στο path και return (filename, mimetype)
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Decorator: καταχώρηση handler για ένα kind εργασίας"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def dedup_key(kind, params, user_id=None):
+    """Ανά χρήστη: το job_download επιτρέπει μόνο τον δημιουργό (ή topuser)"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(f'{kind}:{user_id}:{payload}'.encode('utf-8')).hexdigest()
+
+
+# ==================== RUNNER ====================
+
+class JobRunner:
+    """Per-process thread pool, δημιουργείται στο πρώτο submit (και ξανά μετά από fork)"""
+
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_purge = 0
+
+    def _get_executor(self, app):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=max(int(app.config.get('JOB_WORKERS', 2)), 1),
+                                                    thread_name_prefix='job-runner')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, app, job_id):
+        self._get_executor(app).submit(self._run, app, job_id)
+
+    def _run(self, app, job_id):
+        with app.app_context():
+            try:
+                run_job(job_id)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f'Job {job_id} crashed: {e}')
+
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = time.monotonic()
+                try:
+                    purge_expired_jobs()
+                except Exception as e:
+                    app.logger.error(f'Job purge failed: {e}')
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+runner = JobRunner()
+
+
+def _output_dir():
+    """JOB_OUTPUT_DIR ή instance/generated (εκτός του source tree)"""
+    path = current_app.config.get('JOB_OUTPUT_DIR') or os.path.join(current_app.instance_path, 'generated')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _remove_file(path):
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+# ==================== API ====================
+
+def enqueue(kind, params=None, user_id=None):
+    """
+    Νέα εργασία (ή η ίδια εργασία αν είναι ήδη σε εξέλιξη), return Job
+    Raises KeyError για άγνωστο kind
+    """
+    if kind not in JOB_HANDLERS:
+        raise KeyError(f'Unknown job kind: {kind}')
+    params = params or {}
+    key = dedup_key(kind, params, user_id)
+
+    # Εργασίες παλαιότερες από JOB_TIMEOUT θεωρούνται χαμένες (βλ. recover_jobs)
+    timeout = int(current_app.config.get('JOB_TIMEOUT', 600))
+    existing = db.session.execute(
+        db.select(Job).where(Job.dedup_key == key, Job.status.in_(ACTIVE_STATUSES),
+                             Job.created_at >= datetime.utcnow() - timedelta(seconds=timeout))
+        .order_by(Job.created_at.desc()).limit(1)
+    ).scalar()
+    if existing is not None:
+        return existing
+
+    job = Job(id=uuid.uuid4().hex, kind=kind, params=json.dumps(params, sort_keys=True, default=str),
+              dedup_key=key, status='queued', created_by=user_id, created_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if app.config.get('JOBS_EAGER'):
+        run_job(job.id)
+        db.session.refresh(job)
+    else:
+        runner.submit(app, job.id)
+    return job
+
+
+def run_job(job_id):
+    """Εκτέλεση μιας queued εργασίας, return True αν εκτελέστηκε από αυτόν τον caller"""
+    # Atomic claim: αν δύο workers πάρουν το ίδιο job, μόνο ο ένας το εκτελεί
+    claimed = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == 'queued')
+        .values(status='running', started_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return False
+
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    path = os.path.join(_output_dir(), job.id)
+    try:
+        filename, mimetype = JOB_HANDLERS[job.kind](json.loads(job.params or '{}'), path)
+    except Exception as e:
+        db.session.rollback()
+        _remove_file(path)
+        current_app.logger.error(f'Job {job.id} ({job.kind}) failed: {e}')
+        job = db.session.get(Job, job_id)
+        job.status = 'failed'
+        job.error = str(e)[:1000]
+    else:
+        job.status = 'done'
+        job.file_path = path
+        job.filename = filename
+        job.mimetype = mimetype
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def job_status(job):
+    """Dict για το polling endpoint"""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'filename': job.filename,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def job_result_path(job):
+    """Path του αρχείου αν η εργασία ολοκληρώθηκε και το αρχείο υπάρχει ακόμα"""
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        return None
+    return job.file_path
+
+
+# ==================== MAINTENANCE ====================
+
+def purge_expired_jobs():
+    """Διαγραφή ολοκληρωμένων εργασιών (και αρχείων) παλαιότερων από JOB_RESULT_TTL"""
+    ttl = int(current_app.config.get('JOB_RESULT_TTL', 24 * 3600))
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    expired = db.session.execute(
+        db.select(Job.id, Job.file_path).where(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff)
+    ).all()
+    for row in expired:
+        _remove_file(row.file_path)
+    if expired:
+        db.session.execute(db.delete(Job).where(Job.id.in_([row.id for row in expired])))
+        db.session.commit()
+    return len(expired)
+
+
+def recover_jobs():
+    """
+    Startup: εργασίες που έμειναν 'running' πέρα από JOB_TIMEOUT (ο worker τερματίστηκε)
+    γίνονται failed, και οι 'queued' ξαναμπαίνουν στο pool (το claim αποκλείει διπλή εκτέλεση)
+    """
+    timeout = int(current_app.config.get('JOB_TIMEOUT', 600))
+    db.session.execute(
+        update(Job).where(Job.status == 'running', Job.started_at < datetime.utcnow() - timedelta(seconds=timeout))
+        .values(status='failed', error='Η εργασία διακόπηκε.', finished_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    queued = db.session.execute(db.select(Job.id).where(Job.status == 'queued')).scalars().all()
+    app = current_app._get_current_object()
+    for job_id in queued:
+        runner.submit(app, job_id)
+    return len(queued)
+
+
+def init_jobs(app):
+    """Recovery και purge σε background thread κατά το startup του worker"""
+    if app.config.get('JOBS_EAGER'):
+        return
+
+    def _recover():
+        with app.app_context():
+            try:
+                purge_expired_jobs()
+                count = recover_jobs()
+                if count:
+                    app.logger.info(f'Resubmitted {count} queued jobs')
+            except Exception as e:
+                app.logger.error(f'Job recovery failed: {e}')
+
+    threading.Thread(target=_recover, name='job-recovery', daemon=True).start()
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+migrations.py
+Schema migrations και backfills για υπάρχουσες βάσεις Dr. PLATI
+Κάθε migration είναι idempotent - μπορεί να τρέξει ξανά με ασφάλεια.
+
+Usage: python migrations.py
+"""
+
+from sqlalchemy import inspect, text
+from extensions import db
+
+
+BATCH_SIZE = 1000
+
+
+# ==================== HELPERS ====================
+
+def _column_names(table_name):
+    """Return set of existing column names για table"""
+    inspector = inspect(db.engine)
+    return {column['name'] for column in inspector.get_columns(table_name)}
+
+
+def _add_column_if_missing(table_name, column_name, column_ddl):
+    """ALTER TABLE ... ADD COLUMN αν η στήλη δεν υπάρχει"""
+    if column_name in _column_names(table_name):
+        return False
+
+    with db.engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}'))
+    print(f"   ✓ Added column {table_name}.{column_name}")
+    return True
+
+
+def _create_indexes(table, names=None):
+    """
+    Create missing indexes declared στο model table (μόνο τα names αν δοθούν)
+    Indexes σε στήλες που δεν υπάρχουν ακόμα παραλείπονται: τα models δηλώνουν
+    ήδη τα indexes μεταγενέστερων migrations, που τα δημιουργούν μαζί με τις στήλες
+    """
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(table.name)}
+    columns = _column_names(table.name)
+    dialect = db.engine.dialect.name
+    for index in table.indexes:
+        if names is not None and index.name not in names:
+            continue
+        # FULLTEXT indexes υπάρχουν μόνο σε MySQL
+        if index.dialect_options['mysql'].get('prefix') == 'FULLTEXT' and dialect != 'mysql':
+            continue
+        if index.name in existing:
+            continue
+        missing = [column.name for column in index.columns if column.name not in columns]
+        if missing:
+            print(f"   ⚠️  Skipped index {index.name}: missing column {', '.join(missing)}")
+            continue
+        index.create(bind=db.engine)
+        print(f"   ✓ Created index {index.name}")
+
+
+def _batched_rows(query_factory):
+    """Iterate rows σε batches ανά id (keyset) ώστε να μη φορτώνεται όλος ο πίνακας"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(query_factory(last_id)).all()
+        if not rows:
+            break
+        yield rows
+        last_id = rows[-1].id
+
+
+# ==================== MIGRATIONS ====================
+
+def migrate_patient_search_columns():
+    """Add normalized search columns στους ασθενείς και backfill"""
+    from models import Patient
+    from utils import normalize_search_term
+
+    _add_column_if_missing('patients', 'first_name_search', 'VARCHAR(100)')
+    _add_column_if_missing('patients', 'last_name_search', 'VARCHAR(100)')
+    _create_indexes(Patient.__table__, ('idx_patient_last_name_search', 'idx_patient_first_name_search'))
+
+    updated = 0
+    for rows in _batched_rows(lambda last_id: db.select(
+            Patient.id, Patient.first_name, Patient.last_name
+        ).where(Patient.id > last_id).order_by(Patient.id).limit(BATCH_SIZE)):
+        db.session.execute(
+            db.update(Patient.__table__).where(Patient.__table__.c.id == db.bindparam('patient_id')),
+            [{
+                'patient_id': row.id,
+                'first_name_search': normalize_search_term(row.first_name),
+                'last_name_search': normalize_search_term(row.last_name)
+            } for row in rows]
+        )
+        db.session.commit()
+        updated += len(rows)
+
+    print(f"   ✓ Backfilled search columns για {updated} ασθενείς")
+
+
+def migrate_fulltext_indexes():
+    """Create full-text indexes (MySQL) ή FTS5 shadow tables (SQLite) και rebuild"""
+    from models import Patient, Visit
+    import fulltext
+
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        _create_indexes(Patient.__table__)
+        _create_indexes(Visit.__table__)
+    elif dialect == 'sqlite':
+        engine = fulltext.SQLiteFTS5Engine()
+        with db.engine.begin() as connection:
+            engine.create_schema(connection)
+            engine.rebuild(connection)
+        print("   ✓ Rebuilt FTS5 shadow tables")
+    else:
+        print(f"   ⚠️  No full-text index για {dialect}, χρησιμοποιείται LIKE fallback")
+
+
+def migrate_patient_phones():
+    """Backfill normalized patient_phones από τα phone columns των ασθενών"""
+    from models import Patient, PatientPhone
+    from search import PHONE_FIELDS, sync_patient_phones
+
+    _create_indexes(PatientPhone.__table__)
+
+    updated = 0
+    columns = [getattr(Patient, field) for field in PHONE_FIELDS]
+    for rows in _batched_rows(lambda last_id: db.select(Patient.id, *columns)
+                              .where(Patient.id > last_id).order_by(Patient.id).limit(BATCH_SIZE)):
+        connection = db.session.connection()
+        for row in rows:
+            sync_patient_phones(connection, row.id, row._mapping)
+        db.session.commit()
+        updated += len(rows)
+
+    print(f"   ✓ Backfilled phone index για {updated} ασθενείς")
+
+
+def migrate_patient_phonetic_columns():
+    """Add Greeklish/phonetic keys στους ασθενείς και backfill"""
+    from models import Patient
+    from utils import phonetic_key
+
+    _add_column_if_missing('patients', 'first_name_phonetic', 'VARCHAR(100)')
+    _add_column_if_missing('patients', 'last_name_phonetic', 'VARCHAR(100)')
+    _create_indexes(Patient.__table__, ('idx_patient_last_name_phonetic', 'idx_patient_first_name_phonetic'))
+
+    updated = 0
+    for rows in _batched_rows(lambda last_id: db.select(
+            Patient.id, Patient.first_name, Patient.last_name
+        ).where(Patient.id > last_id).order_by(Patient.id).limit(BATCH_SIZE)):
+        db.session.execute(
+            db.update(Patient.__table__).where(Patient.__table__.c.id == db.bindparam('patient_id')),
+            [{
+                'patient_id': row.id,
+                'first_name_phonetic': phonetic_key(row.first_name),
+                'last_name_phonetic': phonetic_key(row.last_name)
+            } for row in rows]
+        )
+        db.session.commit()
+        updated += len(rows)
+
+    print(f"   ✓ Backfilled phonetic keys για {updated} ασθενείς")
+
+
+def migrate_daily_counters():
+    """Rebuild daily_counters από visits, patients και transactions"""
+    from counters import rebuild_counters
+
+    count = rebuild_counters()
+    print(f"   ✓ Rebuilt {count} daily counters")
+
+
+def migrate_patient_card_indexes():
+    """Composite index (patient_id, transaction_date) για την καρτέλα ασθενούς"""
+    from models import Transaction
+
+    _create_indexes(Transaction.__table__, ('idx_transaction_patient_date',))
+
+
+def migrate_patient_accounts():
+    """Rebuild patient_accounts (σύνολα και υπόλοιπα ανά ασθενή) από τα transactions"""
+    from models import PatientAccount
+    from accounts import rebuild_accounts
+
+    _create_indexes(PatientAccount.__table__)
+    count = rebuild_accounts()
+    print(f"   ✓ Rebuilt accounts για {count} ασθενείς")
+
+
+def migrate_transaction_lines():
+    """Backfill transaction_lines από το services_json των υπαρχουσών συναλλαγών"""
+    from models import Transaction, TransactionLine
+    from transaction_lines import backfill_lines, service_name_index
+
+    _create_indexes(TransactionLine.__table__)
+    service_ids = service_name_index()
+
+    # Μόνο συναλλαγές χωρίς lines, ώστε το migration να ξανατρέχει με ασφάλεια
+    has_lines = db.select(TransactionLine.id).where(TransactionLine.transaction_id == Transaction.id).exists()
+
+    inserted = 0
+    for rows in _batched_rows(lambda last_id: db.select(
+            Transaction.id, Transaction.transaction_date, Transaction.services_json
+        ).where(Transaction.id > last_id, Transaction.services_json.isnot(None), ~has_lines)
+            .order_by(Transaction.id).limit(BATCH_SIZE)):
+        inserted += backfill_lines(rows, service_ids)
+        db.session.commit()
+
+    print(f"   ✓ Backfilled {inserted} transaction lines")
+
+
+def migrate_report_rollups():
+    """updated_at σε vaccines/transactions, indexes για το high-water mark και rebuild των rollups"""
+    from models import Patient, Visit, Vaccine, Transaction, ReportRollup
+    from reports import rebuild_rollups
+
+    for table_name in ('vaccines', 'transactions'):
+        if _add_column_if_missing(table_name, 'updated_at', 'DATETIME'):
+            with db.engine.begin() as connection:
+                connection.execute(text(f'UPDATE {table_name} SET updated_at = created_at WHERE updated_at IS NULL'))
+
+    for model, names in ((Patient, ('idx_patient_created',)),
+                         (Visit, ('idx_visit_updated',)),
+                         (Vaccine, ('idx_vaccine_date', 'idx_vaccine_updated')),
+                         (Transaction, ('idx_transaction_updated',)),
+                         (ReportRollup, None)):
+        _create_indexes(model.__table__, names)
+
+    count = rebuild_rollups()
+    print(f"   ✓ Rebuilt {count} report rollups")
+
+
+
+def migrate_jobs():
+    """Indexes του πίνακα jobs (ο πίνακας δημιουργείται από create_all)"""
+    from models import Job
+
+    _create_indexes(Job.__table__)
+
+
+def migrate_vaccination_coverage_index():
+    """Covering index για την εμβολιαστική κάλυψη (vaccination.py)"""
+    from models import Vaccine
+
+    _create_indexes(Vaccine.__table__)
+
+
+def migrate_visit_diagnoses():
+    """Backfill visit_diagnoses από τους κωδικούς ICD-10 στο assessment των υπαρχουσών επισκέψεων"""
+    from models import Visit, VisitDiagnosis
+    from diagnoses import backfill_diagnoses
+
+    _create_indexes(VisitDiagnosis.__table__)
+
+    # Μόνο επισκέψεις χωρίς διαγνώσεις, ώστε το migration να ξανατρέχει με ασφάλεια
+    has_diagnoses = db.select(VisitDiagnosis.id).where(VisitDiagnosis.visit_id == Visit.id).exists()
+
+    inserted = 0
+    for rows in _batched_rows(lambda last_id: db.select(
+            Visit.id, Visit.visit_date, Visit.assessment
+        ).where(Visit.id > last_id, Visit.assessment.isnot(None), ~has_diagnoses)
+            .order_by(Visit.id).limit(BATCH_SIZE)):
+        inserted += backfill_diagnoses(rows)
+        db.session.commit()
+
+    print(f"   ✓ Backfilled {inserted} visit diagnoses")
+
+
+def migrate_patient_index_version():
+    """Index στο patients.updated_at για το delta sync του patient search index"""
+    from models import Patient
+
+    _create_indexes(Patient.__table__)
+
+
+def migrate_patient_name_grams():
+    """Backfill patient_name_grams (trigrams των phonetic keys) για το fuzzy search"""
+    from models import Patient, PatientNameGram
+    from search import sync_patient_name_grams
+
+    _create_indexes(PatientNameGram.__table__)
+
+    updated = 0
+    for rows in _batched_rows(lambda last_id: db.select(Patient.id, Patient.first_name, Patient.last_name)
+                              .where(Patient.id > last_id).order_by(Patient.id).limit(BATCH_SIZE)):
+        connection = db.session.connection()
+        for row in rows:
+            sync_patient_name_grams(connection, row.id, row.first_name, row.last_name)
+        db.session.commit()
+        updated += len(rows)
+
+    print(f"   ✓ Backfilled name trigrams για {updated} ασθενείς")
+
+
+def migrate_patient_cards_version():
+    """patients.cards_version: cache key της καρτέλας χωρίς touch του updated_at"""
+    _add_column_if_missing('patients', 'cards_version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def migrate_rollup_dirty_days():
+    """Index του rollup_dirty_days (ο πίνακας δημιουργείται από create_all)"""
+    from models import RollupDirtyDay
+
+    _create_indexes(RollupDirtyDay.__table__)
+
+# Ordered list of all migrations
+MIGRATIONS = [
+    ('0001_patient_search_columns', migrate_patient_search_columns),
+    ('0002_fulltext_indexes', migrate_fulltext_indexes),
+    ('0003_patient_phones', migrate_patient_phones),
+    ('0004_patient_phonetic_columns', migrate_patient_phonetic_columns),
+    ('0005_daily_counters', migrate_daily_counters),
+    ('0006_patient_card_indexes', migrate_patient_card_indexes),
+    ('0007_patient_accounts', migrate_patient_accounts),
+    ('0008_transaction_lines', migrate_transaction_lines),
+    ('0009_report_rollups', migrate_report_rollups),
+    ('0010_jobs', migrate_jobs),
+    ('0011_vaccination_coverage_index', migrate_vaccination_coverage_index),
+    ('0012_visit_diagnoses', migrate_visit_diagnoses),
+    ('0013_patient_index_version', migrate_patient_index_version),
+    ('0014_patient_name_grams', migrate_patient_name_grams),
+    ('0015_patient_cards_version', migrate_patient_cards_version),
+    ('0016_rollup_dirty_days', migrate_rollup_dirty_days),
+]
+
+
+def run_migrations():
+    """Run all migrations in order"""
+    from app_original import create_app
+
+    app = create_app()
+    with app.app_context():
+        print("🔧 Running Dr. PLATI migrations...")
+
+        # Νέοι πίνακες δημιουργούνται από τα models
+        db.create_all()
+
+        for name, migration in MIGRATIONS:
+            print(f"📊 {name}")
+            migration()
+
+        print("✅ Migrations completed successfully!")
+
+
+if __name__ == '__main__':
+    run_migrations()
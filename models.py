@@ -8,9 +8,11 @@ Pediatric Practice Management System
 from extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Index
+from sqlalchemy import Index, event, and_
+from sqlalchemy.orm import deferred, column_property, load_only
 from datetime import datetime, date, timedelta
 import secrets
+import json
 
 
 class User(UserMixin, db.Model):
@@ -156,7 +158,11 @@ class User(UserMixin, db.Model):
 
 
 class Patient(db.Model):
-    """Patient model"""
+    """
+    Patient model
+    Τα μεγάλα Text columns είναι deferred σε groups ('contact', 'medical', 'notes')
+    και φορτώνονται μόνο όταν χρειαστούν - οι σελίδες λεπτομερειών κάνουν undefer('*')
+    """
     __tablename__ = 'patients'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -170,7 +176,7 @@ class Patient(db.Model):
     place_of_birth = db.Column(db.String(100))
     
     # Contact Information
-    address = db.Column(db.Text)
+    address = deferred(db.Column(db.Text), group='contact')
     city = db.Column(db.String(100))
     postal_code = db.Column(db.String(10))
     phone = db.Column(db.String(20))
@@ -197,9 +203,9 @@ class Patient(db.Model):
     # Medical Information
     insurance = db.Column(db.String(100))
     insurance_number = db.Column(db.String(50))
-    allergies = db.Column(db.Text)
-    chronic_conditions = db.Column(db.Text)
-    medications = db.Column(db.Text)
+    allergies = deferred(db.Column(db.Text), group='medical')
+    chronic_conditions = deferred(db.Column(db.Text), group='medical')
+    medications = deferred(db.Column(db.Text), group='medical')
     blood_type = db.Column(db.String(5))
     
     # Birth Information
@@ -216,8 +222,17 @@ class Patient(db.Model):
     head_circumference = db.Column(db.Float)
     
     # Notes
-    notes = db.Column(db.Text)
-    family_history = db.Column(db.Text)
+    notes = deferred(db.Column(db.Text), group='notes')
+    family_history = deferred(db.Column(db.Text), group='notes')
+    
+    # Search columns (normalized με normalize_search_term, συγχρονίζονται αυτόματα)
+    first_name_search = db.Column(db.String(100))
+    last_name_search = db.Column(db.String(100))
+    first_name_phonetic = db.Column(db.String(100))  # Greeklish/phonetic key (utils.phonetic_key)
+    last_name_phonetic = db.Column(db.String(100))
+    
+    # Αυξάνεται σε κάθε αλλαγή επισκέψεων/εμβολίων/συναλλαγών/βεβαιώσεων (cache key καρτέλας, βλ. patient_cards.py)
+    cards_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Status & Metadata
     is_active = db.Column(db.Boolean, default=True)
@@ -233,49 +248,65 @@ class Patient(db.Model):
     creator = db.relationship('User', backref='created_patients')
     
     def calculate_age(self):
-        """Calculate patient age in years, months, days"""
-        today = date.today()
-        born = self.date_of_birth
-        
-        years = today.year - born.year
-        months = today.month - born.month
-        days = today.day - born.day
-        
-        if days < 0:
-            months -= 1
-            days += 30  # Approximate
-        if months < 0:
-            years -= 1
-            months += 12
-            
-        return {
-            'years': years,
-            'months': months,
-            'days': days,
-            'total_days': (today - born).days
-        }
+        """Calculate patient age in years, months, days (memoized ανά request today)"""
+        from utils import calculate_age
+        return calculate_age(self.date_of_birth)
     
     @property
     def age_string(self):
         """Format age as string"""
-        age = self.calculate_age()
-        if age['years'] >= 2:
-            return f"{age['years']} ετών"
-        elif age['years'] == 1:
-            return f"1 έτους και {age['months']} μηνών"
-        else:
-            return f"{age['months']} μηνών"
+        from utils import format_age
+        return format_age(self.date_of_birth)
     
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
     
+    def refresh_search_columns(self):
+        """Update normalized και phonetic search columns από first_name/last_name"""
+        from utils import normalize_search_term, phonetic_key
+        self.first_name_search = normalize_search_term(self.first_name)
+        self.last_name_search = normalize_search_term(self.last_name)
+        self.first_name_phonetic = phonetic_key(self.first_name)
+        self.last_name_phonetic = phonetic_key(self.last_name)
+    
     def __repr__(self):
         return f'<Patient {self.full_name} ({self.amka})>'
 
 
+class PatientPhone(db.Model):
+    """Normalized phone numbers ασθενών για caller lookup (συντηρείται από search.py)"""
+    __tablename__ = 'patient_phones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False, index=True)
+    field = db.Column(db.String(20), nullable=False)  # phone, mobile, father_phone, etc.
+    
+    # E.164 (π.χ. +302101234567) και αντεστραμμένα ψηφία για suffix lookup με prefix index
+    e164 = db.Column(db.String(20), nullable=False)
+    digits_reversed = db.Column(db.String(20), nullable=False)
+    
+    def __repr__(self):
+        return f'<PatientPhone {self.e164} ({self.field}) for patient {self.patient_id}>'
+
+
+class PatientNameGram(db.Model):
+    """Trigrams των phonetic keys ονόματος/επωνύμου για typo-tolerant αναζήτηση (συντηρείται από search.py)"""
+    __tablename__ = 'patient_name_grams'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False, index=True)
+    gram = db.Column(db.String(3), nullable=False)
+    
+    def __repr__(self):
+        return f'<PatientNameGram {self.gram} for patient {self.patient_id}>'
+
+
 class Visit(db.Model):
-    """Visit/Appointment model"""
+    """
+    Visit/Appointment model
+    Τα Text columns είναι deferred σε groups ('history', 'exam', 'plan', 'notes')
+    """
     __tablename__ = 'visits'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -287,8 +318,8 @@ class Visit(db.Model):
                           nullable=False, default='checkup')
     
     # Chief Complaint & History
-    chief_complaint = db.Column(db.Text)
-    history_present_illness = db.Column(db.Text)
+    chief_complaint = deferred(db.Column(db.Text), group='history')
+    history_present_illness = deferred(db.Column(db.Text), group='history')
     
     # Vital Signs
     weight = db.Column(db.Float)  # kg
@@ -302,24 +333,24 @@ class Visit(db.Model):
     oxygen_saturation = db.Column(db.Float)  # percentage
     
     # Physical Examination
-    general_appearance = db.Column(db.Text)
-    skin = db.Column(db.Text)
-    head_neck = db.Column(db.Text)
-    cardiovascular = db.Column(db.Text)
-    respiratory = db.Column(db.Text)
-    abdomen = db.Column(db.Text)
-    neurological = db.Column(db.Text)
-    musculoskeletal = db.Column(db.Text)
+    general_appearance = deferred(db.Column(db.Text), group='exam')
+    skin = deferred(db.Column(db.Text), group='exam')
+    head_neck = deferred(db.Column(db.Text), group='exam')
+    cardiovascular = deferred(db.Column(db.Text), group='exam')
+    respiratory = deferred(db.Column(db.Text), group='exam')
+    abdomen = deferred(db.Column(db.Text), group='exam')
+    neurological = deferred(db.Column(db.Text), group='exam')
+    musculoskeletal = deferred(db.Column(db.Text), group='exam')
     
     # Assessment & Plan
-    assessment = db.Column(db.Text)
-    plan = db.Column(db.Text)
-    medications = db.Column(db.Text)
-    recommendations = db.Column(db.Text)
-    follow_up = db.Column(db.Text)
+    assessment = deferred(db.Column(db.Text), group='plan')
+    plan = deferred(db.Column(db.Text), group='plan')
+    medications = deferred(db.Column(db.Text), group='plan')
+    recommendations = deferred(db.Column(db.Text), group='plan')
+    follow_up = deferred(db.Column(db.Text), group='plan')
     
     # Administrative
-    notes = db.Column(db.Text)
+    notes = deferred(db.Column(db.Text), group='notes')
     next_visit_date = db.Column(db.Date)
     
     # Timestamps
@@ -328,9 +359,36 @@ class Visit(db.Model):
     
     # Relationships
     doctor = db.relationship('User', backref='visits')
+    diagnoses = db.relationship('VisitDiagnosis', backref='visit', order_by='VisitDiagnosis.position',
+                                cascade='all, delete-orphan')
+    
+    @property
+    def primary_diagnosis(self):
+        for diagnosis in self.diagnoses:
+            if diagnosis.is_primary:
+                return diagnosis
+        return self.diagnoses[0] if self.diagnoses else None
+    
+    def __repr__(self):
+        return f'<Visit {self.id} for patient {self.patient_id} on {self.visit_date}>'
+
+
+class VisitDiagnosis(db.Model):
+    """Κωδικοποιημένες διαγνώσεις επίσκεψης (ICD-10) - μία ανά κωδικό"""
+    __tablename__ = 'visit_diagnoses'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    visit_id = db.Column(db.Integer, db.ForeignKey('visits.id'), nullable=False)
+    code = db.Column(db.String(10), nullable=False)  # ICD-10, π.χ. J06.9
+    description = db.Column(db.String(200))
+    is_primary = db.Column(db.Boolean, nullable=False, default=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Αντίγραφο του visits.visit_date για το index (code, visit_date)
+    visit_date = db.Column(db.DateTime, nullable=False)
     
     def __repr__(self):
-        return f'<Visit {self.id} for {self.patient.full_name} on {self.visit_date}>'
+        return f'<VisitDiagnosis {self.code} visit {self.visit_id}>'
 
 
 class Vaccine(db.Model):
@@ -372,12 +430,13 @@ class Vaccine(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     administrator = db.relationship('User', backref='administered_vaccines')
     
     def __repr__(self):
-        return f'<Vaccine {self.vaccine_name} for {self.patient.full_name} on {self.date_administered}>'
+        return f'<Vaccine {self.vaccine_name} for patient {self.patient_id} on {self.date_administered}>'
 
 
 class Service(db.Model):
@@ -388,7 +447,7 @@ class Service(db.Model):
     
     name = db.Column(db.String(150), nullable=False)
     description = db.Column(db.Text)
-    price = db.Column(db.Decimal(10, 2), nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=False)
     category = db.Column(db.String(50))  # checkup, vaccination, consultation, etc.
     
     # Status
@@ -417,21 +476,21 @@ class Transaction(db.Model):
     
     # Services & Pricing
     services_json = db.Column(db.Text)  # JSON string of services
-    subtotal = db.Column(db.Decimal(10, 2), nullable=False)
-    discount = db.Column(db.Decimal(10, 2), default=0)
-    tax_rate = db.Column(db.Decimal(5, 4), default=0.24)  # 24% ΦΠΑ
-    tax_amount = db.Column(db.Decimal(10, 2), default=0)
-    total_amount = db.Column(db.Decimal(10, 2), nullable=False)
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False)
+    discount = db.Column(db.Numeric(10, 2), default=0)
+    tax_rate = db.Column(db.Numeric(5, 4), default=0.24)  # 24% ΦΠΑ
+    tax_amount = db.Column(db.Numeric(10, 2), default=0)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     
     # Payment Information
     payment_method = db.Column(db.Enum('cash', 'card', 'transfer', 'insurance'), 
                               nullable=False, default='cash')
     payment_status = db.Column(db.Enum('pending', 'paid', 'partial', 'cancelled'), 
                               nullable=False, default='pending')
-    paid_amount = db.Column(db.Decimal(10, 2), default=0)
+    paid_amount = db.Column(db.Numeric(10, 2), default=0)
     
     # Insurance
-    insurance_coverage = db.Column(db.Decimal(10, 2), default=0)
+    insurance_coverage = db.Column(db.Numeric(10, 2), default=0)
     insurance_claim_number = db.Column(db.String(50))
     
     # Notes
@@ -439,11 +498,28 @@ class Transaction(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     payment_date = db.Column(db.DateTime)
     
     # Relationships
     visit = db.relationship('Visit', backref='transactions')
     creator = db.relationship('User', backref='created_transactions')
+    lines = db.relationship('TransactionLine', backref='transaction', order_by='TransactionLine.position',
+                            cascade='all, delete-orphan')
+    
+    @property
+    def services(self):
+        """Υπηρεσίες σε JSON-compatible μορφή (από τα lines, ή από το services_json σε παλιές εγγραφές)"""
+        if self.lines:
+            return [line.to_dict() for line in self.lines]
+        try:
+            return json.loads(self.services_json) if self.services_json else []
+        except ValueError:
+            return []
+    
+    @property
+    def service_description(self):
+        return ', '.join(service.get('name') or '' for service in self.services if service.get('name'))
     
     @property
     def balance_due(self):
@@ -459,6 +535,54 @@ class Transaction(db.Model):
         return f'<Transaction {self.invoice_number} - €{self.total_amount}>'
 
 
+class TransactionLine(db.Model):
+    """Γραμμές συναλλαγής - μία ανά υπηρεσία (αντικαθιστά το services_json)"""
+    __tablename__ = 'transaction_lines'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'))
+    position = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Description (αντίγραφο του ονόματος της υπηρεσίας τη στιγμή της χρέωσης)
+    description = db.Column(db.String(150))
+    
+    # Pricing
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    discount = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    tax_rate = db.Column(db.Numeric(5, 4), nullable=False, default=0)
+    tax_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    line_total = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    
+    # Αντίγραφο του transactions.transaction_date για το index (service_id, transaction_date)
+    transaction_date = db.Column(db.Date, nullable=False)
+    
+    # Relationships
+    service = db.relationship('Service')
+    
+    @property
+    def net_amount(self):
+        """Ποσό χωρίς ΦΠΑ (quantity * unit_price - discount)"""
+        return self.quantity * self.unit_price - self.discount
+    
+    def to_dict(self):
+        """Μορφή ενός service του services_json"""
+        return {
+            'service_id': self.service_id,
+            'name': self.description,
+            'quantity': self.quantity,
+            'price': float(self.unit_price),
+            'discount': float(self.discount),
+            'tax_rate': float(self.tax_rate),
+            'tax_amount': float(self.tax_amount),
+            'total': float(self.line_total)
+        }
+    
+    def __repr__(self):
+        return f'<TransactionLine {self.id} transaction {self.transaction_id} service {self.service_id}>'
+
+
 class CertificateLog(db.Model):
     """Medical certificates issued"""
     __tablename__ = 'certificates'
@@ -493,7 +617,7 @@ class CertificateLog(db.Model):
     issuer = db.relationship('User', backref='issued_certificates')
     
     def __repr__(self):
-        return f'<Certificate {self.certificate_number} for {self.patient.full_name}>'
+        return f'<Certificate {self.certificate_number} for patient {self.patient_id}>'
 
 
 class ChatMessage(db.Model):
@@ -525,7 +649,129 @@ class ChatMessage(db.Model):
     related_patient = db.relationship('Patient', backref='related_messages')
     
     def __repr__(self):
-        return f'<ChatMessage {self.id} by {self.sender.username}>'
+        return f'<ChatMessage {self.id} by user {self.sender_id}>'
+
+
+class DailyCounter(db.Model):
+    """Ημερήσιοι μετρητές για dashboard (συντηρούνται από counters.py)"""
+    __tablename__ = 'daily_counters'
+    
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(50), primary_key=True)  # visits, new_patients, pending_transactions
+    dimension = db.Column(db.String(50), primary_key=True, default='')  # '', type:checkup, doctor:3
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyCounter {self.day} {self.metric} {self.dimension}={self.value}>'
+
+
+class NumberSequence(db.Model):
+    """Μετρητές αρίθμησης τιμολογίων/βεβαιώσεων (δεσμεύονται σε blocks από το sequences.py)"""
+    __tablename__ = 'number_sequences'
+    
+    name = db.Column(db.String(50), primary_key=True)  # invoice:202610, certificate:2026
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<NumberSequence {self.name}={self.next_value}>'
+
+
+class PatientAccount(db.Model):
+    """Οικονομική εικόνα ασθενούς (συντηρείται από accounts.py)"""
+    __tablename__ = 'patient_accounts'
+    
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), primary_key=True)
+    
+    # Σύνολα των μη ακυρωμένων συναλλαγών
+    total_billed = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    total_paid = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    total_insurance = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    balance = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # billed - paid - insurance
+    
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    last_transaction_date = db.Column(db.Date)
+    last_payment_date = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    patient = db.relationship('Patient', backref=db.backref('account', uselist=False))
+    
+    @property
+    def has_balance(self):
+        return self.balance > 0
+    
+    def __repr__(self):
+        return f'<PatientAccount patient {self.patient_id} balance={self.balance}>'
+
+
+class ReportRollup(db.Model):
+    """Ημερήσια rollups για τις αναφορές (συντηρούνται από reports.py)"""
+    __tablename__ = 'report_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(50), primary_key=True)  # visits, new_patients, vaccines, revenue, pending_amount
+    dimension = db.Column(db.String(80), primary_key=True, default='')  # '', type:sick, doctor:3, age:1-3, method:cash
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ReportRollup {self.day} {self.metric} {self.dimension}={self.count}/{self.amount}>'
+
+
+class RollupState(db.Model):
+    """High-water mark του incremental refresh των rollups"""
+    __tablename__ = 'rollup_state'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    high_water = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<RollupState {self.name} {self.high_water}>'
+
+
+class RollupDirtyDay(db.Model):
+    """Ημέρες rollups που άλλαξαν χωρίς νέο updated_at (διαγραφές, αλλαγή ημερομηνίας)"""
+    __tablename__ = 'rollup_dirty_days'
+    
+    source = db.Column(db.String(20), primary_key=True)  # visits, patients, vaccines, transactions
+    day = db.Column(db.Date, primary_key=True)
+    marked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RollupDirtyDay {self.source} {self.day}>'
+
+
+class Job(db.Model):
+    """Background εργασίες (PDF αναφορών/βεβαιώσεων), εκτελούνται από jobs.py"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, χρησιμοποιείται και στα URLs
+    kind = db.Column(db.String(50), nullable=False)  # report_pdf, certificate_pdf
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    dedup_key = db.Column(db.String(40), nullable=False)  # sha1(kind + user + params)
+    status = db.Column(db.Enum('queued', 'running', 'done', 'failed', name='job_status'),
+                       nullable=False, default='queued')
+    
+    # Αποτέλεσμα
+    file_path = db.Column(db.String(255))
+    filename = db.Column(db.String(150))
+    mimetype = db.Column(db.String(100))
+    error = db.Column(db.Text)
+    
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
 
 
 class StealthCalendar(db.Model):
@@ -557,13 +803,81 @@ class StealthCalendar(db.Model):
 # Database Indexes για Performance
 Index('idx_patient_amka', Patient.amka)
 Index('idx_patient_name', Patient.last_name, Patient.first_name)
+Index('idx_patient_last_name_search', Patient.last_name_search, Patient.first_name_search)
+Index('idx_patient_first_name_search', Patient.first_name_search)
+Index('idx_patient_last_name_phonetic', Patient.last_name_phonetic)
+Index('idx_patient_first_name_phonetic', Patient.first_name_phonetic)
 Index('idx_patient_phone', Patient.phone)
 Index('idx_patient_dob', Patient.date_of_birth)
+Index('idx_patient_created', Patient.created_at)
+Index('idx_patient_updated', Patient.updated_at)
+Index('idx_patient_phone_e164', PatientPhone.e164)
+Index('idx_patient_phone_reversed', PatientPhone.digits_reversed)
+Index('idx_patient_name_gram', PatientNameGram.gram, PatientNameGram.patient_id)
 Index('idx_visit_date', Visit.visit_date)
 Index('idx_visit_patient', Visit.patient_id, Visit.visit_date)
+Index('idx_visit_updated', Visit.updated_at)
+Index('idx_visit_diagnosis_code', VisitDiagnosis.code, VisitDiagnosis.visit_date)
+Index('idx_visit_diagnosis_visit', VisitDiagnosis.visit_id)
 Index('idx_transaction_date', Transaction.transaction_date)
 Index('idx_transaction_patient', Transaction.patient_id)
+Index('idx_transaction_patient_date', Transaction.patient_id, Transaction.transaction_date)
+Index('idx_transaction_updated', Transaction.updated_at)
+Index('idx_transaction_line_transaction', TransactionLine.transaction_id)
+Index('idx_transaction_line_service', TransactionLine.service_id, TransactionLine.transaction_date)
 Index('idx_vaccine_patient', Vaccine.patient_id, Vaccine.date_administered)
+Index('idx_vaccine_date', Vaccine.date_administered)
+Index('idx_vaccine_updated', Vaccine.updated_at)
+Index('idx_vaccine_coverage', Vaccine.patient_id, Vaccine.vaccine_type, Vaccine.dose_number,
+      Vaccine.date_administered, Vaccine.is_valid)
 Index('idx_certificate_patient', CertificateLog.patient_id, CertificateLog.issue_date)
 Index('idx_chat_created', ChatMessage.created_at)
-Index('idx_stealth_date', StealthCalendar.event_date, StealthCalendar.user_id)
\ No newline at end of file
+Index('idx_daily_counter_metric', DailyCounter.metric, DailyCounter.dimension, DailyCounter.day)
+Index('idx_report_rollup_metric', ReportRollup.metric, ReportRollup.day)
+Index('idx_rollup_dirty_marked', RollupDirtyDay.marked_at)
+Index('idx_patient_account_balance', PatientAccount.balance)
+Index('idx_job_dedup', Job.dedup_key, Job.status)
+Index('idx_job_status', Job.status, Job.created_at)
+Index('idx_stealth_date', StealthCalendar.event_date, StealthCalendar.user_id)
+
+# Flag για λίστες χωρίς φόρτωση του allergies Text column
+Patient.has_allergies = column_property(
+    and_(Patient.__table__.c.allergies.isnot(None), Patient.__table__.c.allergies != ''),
+    deferred=True
+)
+
+# Lightweight projections για list/search views (μόνο τα columns που εμφανίζονται)
+PATIENT_LIST_COLUMNS = (
+    Patient.id, Patient.amka, Patient.first_name, Patient.last_name, Patient.date_of_birth,
+    Patient.gender, Patient.phone, Patient.mobile, Patient.insurance, Patient.has_allergies,
+    Patient.is_active, Patient.created_at, Patient.updated_at
+)
+VISIT_LIST_COLUMNS = (
+    Visit.id, Visit.patient_id, Visit.doctor_id, Visit.visit_date, Visit.visit_type, Visit.created_at
+)
+
+
+def patient_list_options():
+    """load_only για Patient σε λίστες και αναζητήσεις"""
+    return load_only(*PATIENT_LIST_COLUMNS)
+
+
+def visit_list_options():
+    """load_only για Visit σε λίστες (χωρίς τα Text columns)"""
+    return load_only(*VISIT_LIST_COLUMNS)
+
+
+# Full-text indexes (μόνο MySQL - σε SQLite χρησιμοποιούνται FTS5 tables, βλ. fulltext.py)
+Index('ft_patient_text', Patient.first_name, Patient.last_name,
+      Patient.father_name, Patient.father_surname, Patient.mother_name, Patient.mother_surname,
+      Patient.city, Patient.notes, Patient.allergies,
+      mysql_prefix='FULLTEXT').ddl_if(dialect='mysql')
+Index('ft_visit_text', Visit.chief_complaint, Visit.assessment, Visit.plan, Visit.medications,
+      mysql_prefix='FULLTEXT').ddl_if(dialect='mysql')
+
+
+# Keep normalized search columns in sync on insert/update
+@event.listens_for(Patient, 'before_insert')
+@event.listens_for(Patient, 'before_update')
+def _patient_refresh_search_columns(mapper, connection, target):
+    target.refresh_search_columns()
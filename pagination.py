@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+pagination.py
+Keyset (cursor) pagination για μεγάλες λίστες του Dr. PLATI
+Αντί για OFFSET + COUNT(*) σε κάθε σελίδα, κάθε σελίδα ξεκινά από το
+κλειδί ταξινόμησης της προηγούμενης, ώστε να χρησιμοποιείται το index.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_, text
+from extensions import db
+from cache import TTLCache
+
+
+# Cached totals (COUNT(*)) ανά λίστα/φίλτρο
+_count_cache = TTLCache(maxsize=256, ttl=60)
+
+
+class KeysetPage:
+    """Μία σελίδα αποτελεσμάτων keyset pagination"""
+
+    def __init__(self, items, per_page, has_next, has_prev,
+                 next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values):
+    """Encode τιμές κλειδιού σε URL-safe cursor"""
+    payload = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values],
+                         ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode cursor σε τιμές για τα columns ταξινόμησης
+    Raises ValueError για μη έγκυρο cursor
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    decoded = []
+    for value, column in zip(values, columns):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif python_type is date:
+            value = date.fromisoformat(value)
+        decoded.append(value)
+    return decoded
+
+
+def keyset_filter(order_by, after=None, before=None, descending=False):
+    """
+    WHERE condition του keyset για τα columns ταξινόμησης (και για Core selects)
+    descending: η λίστα εμφανίζεται με φθίνουσα σειρά (π.χ. νεότερες πρώτα)
+    Return (condition ή None, backwards). Raises ValueError για μη έγκυρο cursor
+    """
+    key = tuple_(*order_by)
+    if before:
+        values = tuple_(*decode_cursor(before, order_by))
+        return (key > values if descending else key < values), True
+    if after:
+        values = tuple_(*decode_cursor(after, order_by))
+        return (key < values if descending else key > values), False
+    return None, False
+
+
+def keyset_paginate(query, order_by, after=None, before=None, per_page=20, total=None, descending=False):
+    """
+    Keyset pagination πάνω σε ORM query
+    order_by: NOT NULL columns με μοναδικό τελευταίο column (π.χ. id), όλα
+    αύξοντα ή όλα φθίνοντα (descending=True)
+    after/before: cursor της τρέχουσας σελίδας (next/prev)
+    Άκυρο cursor επιστρέφει την πρώτη σελίδα.
+    """
+    try:
+        condition, backwards = keyset_filter(order_by, after, before, descending)
+    except ValueError:
+        condition, backwards = None, False
+        after = before = None
+
+    if condition is not None:
+        query = query.filter(condition)
+
+    # Η προηγούμενη σελίδα διαβάζεται αντίστροφα από τον cursor και γυρίζει μετά
+    if backwards != descending:
+        query = query.order_by(*[column.desc() for column in order_by])
+    else:
+        query = query.order_by(*order_by)
+
+    # Ένα παραπάνω row για να ξέρουμε αν υπάρχει επόμενη σελίδα
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+
+    def _cursor(row):
+        return encode_cursor([getattr(row, column.key) for column in order_by])
+
+    return KeysetPage(
+        items=rows,
+        per_page=per_page,
+        has_next=has_next and bool(rows),
+        has_prev=has_prev and bool(rows),
+        next_cursor=_cursor(rows[-1]) if rows else None,
+        prev_cursor=_cursor(rows[0]) if rows else None,
+        total=total
+    )
+
+
+def cached_count(cache_key, query, ttl=None):
+    """COUNT(*) του query, cached ανά cache_key για ttl δευτερόλεπτα"""
+    return _count_cache.get_or_set(cache_key, lambda: query.order_by(None).count(), ttl)
+
+
+def approximate_count(model, query=None):
+    """
+    Προσεγγιστικό πλήθος rows από τα table statistics (MySQL information_schema)
+    Σε άλλες βάσεις γίνεται κανονικό COUNT(*)
+    """
+    if db.engine.dialect.name == 'mysql':
+        rows = db.session.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {'table': model.__tablename__}).scalar()
+        if rows is not None:
+            return int(rows)
+    return (query if query is not None else model.query).order_by(None).count()
+
+
+def list_total(cache_key, model, query, mode='cached'):
+    """
+    Total για λίστες σύμφωνα με mode: 'exact', 'cached', 'approximate' ή 'none'
+    """
+    if mode == 'none':
+        return None
+    if mode == 'exact':
+        return query.order_by(None).count()
+    if mode == 'approximate':
+        return approximate_count(model, query)
+    return cached_count(cache_key, query)
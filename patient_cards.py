@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+patient_cards.py
+Φόρτωση της καρτέλας ασθενούς (patient card) του Dr. PLATI
+Οι τελευταίες επισκέψεις, εμβόλια, συναλλαγές και βεβαιώσεις έρχονται σε
+ένα UNION ALL (ένα round trip) ως JSON objects, μαζί με το συνολικό
+πλήθος κάθε ενότητας. Η έτοιμη καρτέλα γίνεται cache με key
+(patient id, cards_version) - κάθε αλλαγή σε child record αυξάνει το
+patients.cards_version, οπότε το key αλλάζει σε όλους τους workers χωρίς
+να αλλάζει το updated_at του ασθενή (που αφορά μόνο τα δικά του στοιχεία).
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import event, func, literal, desc, union_all
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import User, Patient, Visit, Vaccine, Transaction, CertificateLog
+from cache import TTLCache
+from events import on_commit
+from pagination import keyset_filter, encode_cursor
+
+
+# Cached sections ανά (patient_id, cards_version, limit)
+_card_cache = TTLCache(maxsize=256, ttl=300)
+
+CARD_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+# ==================== SECTIONS ====================
+
+# section -> (model, ordering column, projected columns, user relationship column)
+CARD_SECTIONS = {
+    'visits': (Visit, Visit.visit_date,
+               ['id', 'visit_date', 'visit_type', 'chief_complaint', 'assessment', 'doctor_id'],
+               ('doctor', Visit.doctor_id)),
+    'vaccines': (Vaccine, Vaccine.date_administered,
+                 ['id', 'date_administered', 'vaccine_name', 'vaccine_type', 'dose_number',
+                  'dose_amount', 'adverse_reactions', 'next_dose_due'],
+                 ('administrator', Vaccine.administered_by)),
+    'transactions': (Transaction, Transaction.transaction_date,
+                     ['id', 'transaction_date', 'invoice_number', 'total_amount', 'paid_amount',
+                      'payment_status', 'payment_method'],
+                     None),
+    'certificates': (CertificateLog, CertificateLog.issue_date,
+                     ['id', 'issue_date', 'certificate_number', 'certificate_type', 'purpose'],
+                     ('issuer', CertificateLog.issued_by)),
+}
+
+
+def _json_object(pairs):
+    """json_object (SQLite/MySQL) ή json_build_object (PostgreSQL)"""
+    arguments = []
+    for key, value in pairs:
+        arguments.extend([literal(key), value])
+    if db.engine.dialect.name == 'postgresql':
+        return func.json_build_object(*arguments)
+    return func.json_object(*arguments)
+
+
+def section_select(section, patient_id, limit, after=None, before=None):
+    """
+    SELECT μίας ενότητας: (section, position, total, data JSON)
+    total είναι το πλήθος των rows του ασθενούς (window COUNT πριν το LIMIT),
+    με cursor μόνο όσων ακολουθούν τον cursor
+    after/before: keyset cursor (ordering column, id), βλ. pagination.keyset_filter
+    Raises ValueError για μη έγκυρο cursor
+    """
+    model, order_column, fields, user_relation = CARD_SECTIONS[section]
+    key = [order_column, model.id]
+    condition, backwards = keyset_filter(key, after, before, descending=True)
+    # Προηγούμενη σελίδα: αύξουσα σειρά από τον cursor (το load_sections την αντιστρέφει)
+    ordering = key if backwards else [desc(column) for column in key]
+
+    pairs = [(field, getattr(model, field)) for field in fields]
+    query = db.select(
+        literal(section).label('section'),
+        func.row_number().over(order_by=ordering).label('position'),
+        func.count().over().label('total'),
+    )
+
+    if user_relation is not None:
+        name, foreign_key = user_relation
+        user = aliased(User)
+        pairs += [(f'{name}_first_name', user.first_name), (f'{name}_last_name', user.last_name)]
+        query = query.add_columns(_json_object(pairs).label('data')).select_from(model).outerjoin(
+            user, user.id == foreign_key
+        )
+    else:
+        query = query.add_columns(_json_object(pairs).label('data')).select_from(model)
+
+    query = query.where(model.patient_id == patient_id)
+    if condition is not None:
+        query = query.where(condition)
+    return query.order_by(*ordering).limit(limit)
+
+
+def _convert(model, field, value):
+    """JSON value -> Python type του column (dates, Decimal)"""
+    if value is None or field not in model.__table__.c:
+        return value
+    try:
+        python_type = model.__table__.c[field].type.python_type
+    except NotImplementedError:
+        return value
+
+    if python_type is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if python_type is date and isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if python_type is Decimal:
+        return Decimal(str(value))
+    return value
+
+
+def _row_item(section, data):
+    """Dict ενός row (compatible με τα templates: visit.doctor.full_name κλπ.)"""
+    if isinstance(data, str):
+        data = json.loads(data)
+
+    model, _, fields, user_relation = CARD_SECTIONS[section]
+    item = {field: _convert(model, field, data.get(field)) for field in fields}
+
+    if user_relation is not None:
+        name = user_relation[0]
+        first_name = data.get(f'{name}_first_name')
+        last_name = data.get(f'{name}_last_name')
+        item[name] = {'full_name': f"{first_name or ''} {last_name or ''}".strip()} if first_name or last_name else None
+    return item
+
+
+def load_sections(patient_id, sections=None, limit=10, after=None, before=None):
+    """
+    Φόρτωση ενοτήτων σε ένα round trip (με cursor μόνο για μία ενότητα)
+    Return dict section -> {'items': [...], 'total': N}
+    """
+    sections = list(sections or CARD_SECTIONS)
+    result = {section: {'items': [], 'total': 0} for section in sections}
+
+    # ORDER BY/LIMIT ανά ενότητα μέσα σε subquery (απαιτείται από SQLite/MySQL σε UNION)
+    statement = union_all(*[
+        db.select(section_select(section, patient_id, limit, after, before).subquery())
+        for section in sections
+    ])
+
+    rows = db.session.execute(statement).all()
+    for row in sorted(rows, key=lambda r: (r.section, r.position)):
+        result[row.section]['items'].append(_row_item(row.section, row.data))
+        result[row.section]['total'] = row.total
+
+    if before:
+        for section in sections:
+            result[section]['items'].reverse()
+    return result
+
+
+def _cached(key, factory):
+    ttl = current_app.config.get('PATIENT_CARD_CACHE_TTL', 300)
+    return _card_cache.get_or_set(key, factory, ttl)
+
+
+def load_patient_card(patient, limit=CARD_PAGE_SIZE):
+    """
+    Τελευταίες εγγραφές κάθε ενότητας για την καρτέλα, cached σε (id, cards_version, limit)
+    """
+    return _cached((patient.id, patient.cards_version, limit), lambda: load_sections(patient.id, limit=limit))
+
+
+def load_section_totals(patient):
+    """Πλήθος εγγραφών ανά ενότητα (badges των tabs) σε ένα SELECT, cached"""
+    def _compute():
+        row = db.session.execute(db.select(*[
+            db.select(func.count()).select_from(model).where(model.patient_id == patient.id)
+            .scalar_subquery().label(section)
+            for section, (model, *_) in CARD_SECTIONS.items()
+        ])).one()
+        return dict(row._mapping)
+
+    return _cached((patient.id, patient.cards_version, 'totals'), _compute)
+
+
+def _section_cursor(section, item):
+    order_column = CARD_SECTIONS[section][1]
+    return encode_cursor([item[order_column.key], item['id']])
+
+
+def load_section_page(patient, section, page=1, per_page=CARD_PAGE_SIZE, after=None, before=None):
+    """
+    Μία σελίδα μίας ενότητας (lazy-loaded tabs)
+    Η πρώτη σελίδα έρχεται από το cached card, οι επόμενες με keyset pagination
+    από τον cursor της τρέχουσας σελίδας (after/before) αντί για OFFSET.
+    page χρησιμεύει μόνο για την ένδειξη "Σελίδα X από Y".
+    """
+    per_page = min(max(per_page, 1), MAX_PAGE_SIZE)
+
+    rows = None
+    if after or before:
+        try:
+            # Ένα παραπάνω row για να ξέρουμε αν υπάρχει και άλλη σελίδα προς την ίδια κατεύθυνση
+            rows = load_sections(patient.id, [section], limit=per_page + 1,
+                                 after=None if before else after, before=before)[section]['items']
+        except ValueError:
+            rows = None
+
+    if rows is None:
+        # Πρώτη σελίδα (ή άκυρο cursor)
+        data = load_patient_card(patient, per_page)[section]
+        items, total, page = data['items'], data['total'], 1
+        has_prev, has_next = False, total > per_page
+    else:
+        total = load_section_totals(patient)[section]
+        has_more = len(rows) > per_page
+        if before:
+            items = rows[-per_page:]
+            has_prev, has_next = has_more, True
+            if not has_more:
+                page = 1
+        else:
+            items = rows[:per_page]
+            has_prev, has_next = True, has_more
+
+    pages = max((total + per_page - 1) // per_page, 1)
+    return {
+        'items': items,
+        'total': total,
+        'page': min(max(page, 1), pages),
+        'per_page': per_page,
+        'pages': pages,
+        'has_prev': has_prev and bool(items),
+        'has_next': has_next and bool(items),
+        'prev_cursor': _section_cursor(section, items[0]) if items else None,
+        'next_cursor': _section_cursor(section, items[-1]) if items else None
+    }
+
+
+def serialize_item(item):
+    """JSON-friendly αντίγραφο ενός row (ISO dates, float amounts)"""
+    result = {}
+    for key, value in item.items():
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        result[key] = value
+    return result
+
+
+# ==================== INVALIDATION ====================
+
+def touch_patients(connection, patient_ids):
+    """
+    Bump patients.cards_version (αλλάζει το cache key)
+    Για set-based UPDATEs που παρακάμπτουν τα mapper events.
+    """
+    patient_ids = [pid for pid in patient_ids if pid is not None]
+    if not patient_ids:
+        return
+    table = Patient.__table__
+    # Ρητό updated_at = updated_at: αλλιώς το onupdate του column θα το άλλαζε
+    connection.execute(
+        table.update().where(table.c.id.in_(patient_ids))
+        .values(cards_version=func.coalesce(table.c.cards_version, 0) + 1, updated_at=table.c.updated_at)
+    )
+
+
+def _touch_patient(mapper, connection, target):
+    """Bump patients.cards_version όταν αλλάζει child record"""
+    touch_patients(connection, [target.patient_id])
+
+
+for _model, *_ in CARD_SECTIONS.values():
+    event.listen(_model, 'after_insert', _touch_patient)
+    event.listen(_model, 'after_update', _touch_patient)
+    event.listen(_model, 'after_delete', _touch_patient)
+
+
+@on_commit(Patient, Visit, Vaccine, Transaction, CertificateLog)
+def _evict_patient_cards(changes):
+    """Τοπικό eviction αμέσως (οι άλλοι workers βλέπουν το νέο cards_version)"""
+    evict_patient_cards(snapshot.get('id') if model is Patient else snapshot.get('patient_id')
+                        for _, model, snapshot in changes)
+
+
+def evict_patient_cards(patient_ids):
+    patient_ids = set(patient_ids)
+    _card_cache.delete_where(lambda key, value: key[0] in patient_ids)
+
+
+def clear_patient_card_cache():
+    _card_cache.clear()
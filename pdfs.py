@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+pdfs.py
+PDF αναφορών και ιατρικών βεβαιώσεων για το Dr. PLATI (reportlab)
+Η δημιουργία γίνεται ως background job (jobs.py) και όχι μέσα στο request.
+Οι βεβαιώσεις αποθηκεύονται μόνιμα (CertificateLog.file_path) αφού δεν
+αλλάζουν μετά την έκδοση τους.
+"""
+
+import os
+import shutil
+from xml.sax.saxutils import escape
+from datetime import datetime, timedelta
+from flask import current_app
+from extensions import db
+from models import Patient, User, CertificateLog
+from jobs import job_handler
+from reports import report_data, refresh_rollups_if_stale
+from exports import export_filename
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+except ImportError:  # Τα PDF απαιτούν reportlab (requirements.txt)
+    SimpleDocTemplate = None
+
+
+PDF_MIMETYPE = 'application/pdf'
+
+# Fonts με ελληνικούς χαρακτήρες (η Helvetica του reportlab δεν τους έχει)
+FONT_CANDIDATES = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+]
+
+_fonts = None
+
+
+class PdfUnavailable(RuntimeError):
+    """Λείπει το reportlab"""
+    pass
+
+
+def _register_fonts():
+    """Return (regular, bold) font names, με register του πρώτου διαθέσιμου TTF"""
+    global _fonts
+    if _fonts is None:
+        _fonts = ('Helvetica', 'Helvetica-Bold')
+        for regular, bold in FONT_CANDIDATES:
+            if os.path.exists(regular) and os.path.exists(bold):
+                pdfmetrics.registerFont(TTFont('DrPlati', regular))
+                pdfmetrics.registerFont(TTFont('DrPlati-Bold', bold))
+                _fonts = ('DrPlati', 'DrPlati-Bold')
+                break
+    return _fonts
+
+
+def _styles():
+    regular, bold = _register_fonts()
+    base = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle('DrTitle', parent=base['Title'], fontName=bold, fontSize=18),
+        'heading': ParagraphStyle('DrHeading', parent=base['Heading2'], fontName=bold, fontSize=13),
+        'body': ParagraphStyle('DrBody', parent=base['BodyText'], fontName=regular, fontSize=10, leading=14),
+        'small': ParagraphStyle('DrSmall', parent=base['BodyText'], fontName=regular, fontSize=8,
+                                textColor=colors.grey),
+        'fonts': (regular, bold)
+    }
+
+
+def _table(rows, styles, col_widths=None):
+    regular, bold = styles['fonts']
+    table = Table(rows, colWidths=col_widths, hAlign='LEFT')
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), regular),
+        ('FONTNAME', (0, 0), (-1, 0), bold),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e9ecef')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#adb5bd')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    return table
+
+
+def _build(path, story, title):
+    if SimpleDocTemplate is None:
+        raise PdfUnavailable('reportlab is not installed')
+    document = SimpleDocTemplate(path, pagesize=A4, title=title, author=current_app.config.get('APP_NAME', 'Dr. PLATI'),
+                                 leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm)
+    document.build(story)
+
+
+def _format_date(value):
+    return value.strftime('%d/%m/%Y') if value else '-'
+
+
+def _money(value):
+    return f'{value or 0:.2f} €'
+
+
+# ==================== REPORT ====================
+
+def render_report(path, stats, coverage, start=None, end=None):
+    """PDF της αναφοράς (ίδια δεδομένα με το reports.html)"""
+    if SimpleDocTemplate is None:
+        raise PdfUnavailable('reportlab is not installed')
+    styles = _styles()
+    period = f'{_format_date(start)} - {_format_date(end)}' if start or end else 'Όλη η περίοδος'
+
+    story = [
+        Paragraph('Αναφορά Δραστηριότητας', styles['title']),
+        Paragraph(f'Περίοδος: {period}', styles['body']),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Σύνοψη', styles['heading']),
+        _table([
+            ['Μέτρηση', 'Τιμή'],
+            ['Επισκέψεις', stats['total_visits']],
+            ['Μεταβολή επισκέψεων', f"{stats['visits_change']}%"],
+            ['Ενεργοί ασθενείς', stats['total_patients']],
+            ['Νέοι ασθενείς', stats['new_patients']],
+            ['Εμβόλια', stats['total_vaccines']],
+            ['Εμβολιαστική κάλυψη', f"{stats['vaccination_coverage']}%"],
+            ['Έσοδα', _money(stats['total_revenue'])],
+            ['Εκκρεμή', _money(stats['pending_amount'])],
+        ], styles, [9 * cm, 6 * cm]),
+    ]
+
+    if stats.get('revenue_by_method'):
+        story += [
+            Spacer(1, 0.4 * cm),
+            Paragraph('Έσοδα ανά τρόπο πληρωμής', styles['heading']),
+            _table([['Τρόπος', 'Ποσό']] + [[method, _money(amount)] for method, amount
+                                          in stats['revenue_by_method'].items()], styles, [9 * cm, 6 * cm])
+        ]
+
+    if stats.get('top_diagnoses'):
+        story += [
+            Spacer(1, 0.4 * cm),
+            Paragraph('Συχνότερες διαγνώσεις', styles['heading']),
+            _table([['Διάγνωση', 'Επισκέψεις']] + [[Paragraph(escape(diagnosis['name'] or '-'), styles['body']), diagnosis['count']]
+                                                  for diagnosis in stats['top_diagnoses']], styles, [12 * cm, 3 * cm])
+        ]
+
+    if coverage:
+        story += [
+            Spacer(1, 0.4 * cm),
+            Paragraph('Εμβολιαστική κάλυψη ανά ηλικία', styles['heading']),
+            _table([['Ηλικιακή ομάδα', 'Ασθενείς', 'Εμβολιασμένοι', 'Κάλυψη']] + [
+                [group['display_name'], group['total'], group['vaccinated'], f"{group['coverage']}%"]
+                for group in coverage.values()
+            ], styles, [6 * cm, 3 * cm, 3 * cm, 3 * cm])
+        ]
+
+    story += [Spacer(1, 0.6 * cm),
+              Paragraph(f"Δημιουργήθηκε {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['small'])]
+    _build(path, story, 'Αναφορά Δραστηριότητας')
+
+
+@job_handler('report_pdf')
+def report_pdf_job(params, path):
+    """params: date_from, date_to (YYYY-MM-DD ή None, end inclusive)"""
+    start = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') else None
+    end = datetime.strptime(params['date_to'], '%Y-%m-%d').date() if params.get('date_to') else None
+
+    refresh_rollups_if_stale()
+    stats, _, coverage = report_data(start, end + timedelta(days=1) if end else None)
+    render_report(path, stats, coverage, start, end)
+    return export_filename('report', start, end, extension='pdf'), PDF_MIMETYPE
+
+
+# ==================== CERTIFICATES ====================
+
+def certificate_filename(certificate):
+    return f'{certificate.certificate_number}.pdf'
+
+
+def render_certificate(path, certificate, patient, issuer):
+    """PDF ιατρικής βεβαίωσης"""
+    if SimpleDocTemplate is None:
+        raise PdfUnavailable('reportlab is not installed')
+    styles = _styles()
+
+    story = [
+        Paragraph(current_app.config.get('APP_NAME', 'Dr. PLATI'), styles['small']),
+        Paragraph('Ιατρική Βεβαίωση', styles['title']),
+        Paragraph(f'Αριθμός: {certificate.certificate_number}', styles['body']),
+        Paragraph(f'Ημερομηνία έκδοσης: {_format_date(certificate.issue_date)}', styles['body']),
+        Spacer(1, 0.6 * cm),
+        _table([
+            ['Στοιχεία ασθενούς', ''],
+            ['Ονοματεπώνυμο', f'{patient.last_name} {patient.first_name}'],
+            ['ΑΜΚΑ', patient.amka],
+            ['Ημ. γέννησης', _format_date(patient.date_of_birth)],
+        ], styles, [5 * cm, 10 * cm]),
+        Spacer(1, 0.5 * cm),
+        Paragraph(f'Τύπος: {escape(certificate.certificate_type or "")}', styles['body']),
+    ]
+    if certificate.purpose:
+        story.append(Paragraph(f'Σκοπός: {escape(certificate.purpose)}', styles['body']))
+    if certificate.valid_from or certificate.valid_until:
+        story.append(Paragraph(
+            f'Ισχύς: {_format_date(certificate.valid_from)} - {_format_date(certificate.valid_until)}', styles['body']))
+
+    for title, text in (('Ευρήματα', certificate.findings),
+                        ('Συστάσεις', certificate.recommendations),
+                        ('Περιορισμοί', certificate.limitations)):
+        if text:
+            story += [Spacer(1, 0.3 * cm), Paragraph(title, styles['heading']),
+                      Paragraph(escape(text).replace('\n', '<br/>'), styles['body'])]
+
+    story += [Spacer(1, 1.5 * cm),
+              Paragraph('Ο/Η Ιατρός', styles['body']),
+              Paragraph(f'{issuer.last_name} {issuer.first_name}' if issuer else '', styles['body'])]
+    _build(path, story, f'Βεβαίωση {certificate.certificate_number}')
+
+
+def certificate_pdf_path(certificate):
+    """Μόνιμο PDF της βεβαίωσης αν έχει ήδη δημιουργηθεί"""
+    if certificate.file_path and os.path.exists(certificate.file_path):
+        return certificate.file_path
+    return None
+
+
+@job_handler('certificate_pdf')
+def certificate_pdf_job(params, path):
+    """params: certificate_id - το PDF αντιγράφεται και στο UPLOAD_FOLDER/certificates"""
+    certificate = db.session.get(CertificateLog, params['certificate_id'])
+    if certificate is None:
+        raise ValueError('Η βεβαίωση δεν βρέθηκε.')
+
+    render_certificate(path, certificate, db.session.get(Patient, certificate.patient_id),
+                       db.session.get(User, certificate.issued_by))
+
+    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], 'certificates')
+    os.makedirs(directory, exist_ok=True)
+    stored = os.path.join(directory, certificate_filename(certificate))
+    shutil.copyfile(path, stored)
+    certificate.file_path = stored
+    return certificate_filename(certificate), PDF_MIMETYPE
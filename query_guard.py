@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+query_guard.py
+Όριο SQL queries ανά request για Dr. PLATI
+Μετρά τα statements κάθε request ώστε να εντοπίζονται N+1 lazy loads.
+Σε testing (QUERY_GUARD_RAISE) το request αποτυγχάνει, αλλιώς γράφεται warning.
+"""
+
+from functools import wraps
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from extensions import db
+
+
+class QueryBudgetExceeded(Exception):
+    """Ένα request εκτέλεσε περισσότερα SQL queries από το επιτρεπτό"""
+    pass
+
+
+def query_budget(limit):
+    """Decorator: διαφορετικό όριο queries για συγκεκριμένο endpoint"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def init_query_guard(app):
+    """
+    Ενεργοποίηση αν έχει οριστεί MAX_QUERIES_PER_REQUEST
+    QUERY_GUARD_RAISE = True κάνει το request να αποτύχει (tests)
+    """
+    limit = app.config.get('MAX_QUERIES_PER_REQUEST')
+    if not limit:
+        return
+
+    with app.app_context():
+        if not event.contains(db.engine, 'before_cursor_execute', _count_query):
+            event.listen(db.engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def _check_query_budget(response):
+        count = g.get('query_count', 0)
+        budget = g.get('query_budget', app.config.get('MAX_QUERIES_PER_REQUEST') or limit)
+        if count > budget:
+            message = f'{request.method} {request.path} executed {count} queries (limit {budget})'
+            if app.config.get('QUERY_GUARD_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(f'Query budget exceeded: {message}')
+        return response
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+realtime.py
+Server-Sent Events (SSE) για live ενημερώσεις του Dr. PLATI
+Οι committed αλλαγές (επισκέψεις, νέοι ασθενείς, chat) μπαίνουν σε ένα
+per-process event bus και στέλνονται ως μικρά events στους ανοιχτούς
+browsers, ώστε οι σελίδες να ενημερώνονται χωρίς full reload.
+
+Λειτουργεί με gunicorn gevent ή threaded (gthread) workers. Με πολλούς
+workers, το EVENT_BUS_REDIS_URL μοιράζει τα events σε όλους μέσω Redis pub/sub.
+"""
+
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from events import on_commit
+from models import Visit, Patient, ChatMessage
+
+
+REDIS_CHANNEL = 'drplati:events'
+
+
+class EventBus:
+    """
+    Per-process publish/subscribe για SSE clients
+    Κάθε subscriber έχει δικό του bounded queue - αργοί clients χάνουν events
+    (και λαμβάνουν 'resync') αντί να μπλοκάρουν τον publisher.
+    Μετά από fork (gunicorn --preload) ο worker παίρνει δικό του token και
+    history, και ξεκινά δικό του Redis relay στην πρώτη χρήση.
+    """
+
+    def __init__(self, history=200, queue_size=100):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._redis_url = None
+        self._reset()
+
+    def _reset(self):
+        # Το token ξεχωρίζει τα event ids αυτού του process (π.χ. μετά από reconnect σε άλλο worker)
+        self.token = f'{os.getpid():x}{secrets.token_hex(4)}'
+        self._sequence = 0
+        self._history.clear()
+        self._subscribers = set()
+        self._relay = None
+
+    def after_fork(self):
+        """Child process: token, history, subscribers και relay thread ανήκουν στον parent"""
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _ensure_relay(self):
+        """Ο relay thread δεν περνά στο fork: ξεκινά ξανά στην πρώτη χρήση του worker"""
+        if self._redis_url and self._relay is None:
+            with self._lock:
+                if self._relay is None:
+                    self._start_relay()
+
+    def _event_id(self, sequence):
+        return f'{self.token}-{sequence}'
+
+    def publish(self, event_type, data):
+        """Publish event (στο Redis αν υπάρχει relay, αλλιώς τοπικά)"""
+        self._ensure_relay()
+        if self._relay is not None:
+            try:
+                self._relay.publish(REDIS_CHANNEL, json.dumps({'type': event_type, 'data': data}))
+                return
+            except Exception as e:
+                logging.getLogger(__name__).warning(f'Event relay publish failed: {e}')
+        self.dispatch(event_type, data)
+
+    def dispatch(self, event_type, data):
+        """Παράδοση event στους subscribers αυτού του process"""
+        with self._lock:
+            self._sequence += 1
+            event = (self._event_id(self._sequence), event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self._resync(subscriber)
+
+    def _resync(self, subscriber):
+        """Ο client έχασε events: άδειασμα του queue και σήμα για πλήρη ανανέωση"""
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        subscriber.put_nowait((None, 'resync', {}))
+
+    def subscribe(self, last_event_id=None):
+        """
+        Νέος subscriber queue
+        Με last_event_id (header Last-Event-ID) ξαναστέλνονται τα events που χάθηκαν,
+        ή 'resync' αν δεν υπάρχουν πλέον στο history.
+        """
+        self._ensure_relay()
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if last_event_id:
+                missed = self._missed_since(last_event_id)
+                if missed is None:
+                    subscriber.put_nowait((None, 'resync', {}))
+                else:
+                    for event in missed[-self.queue_size:]:
+                        subscriber.put_nowait(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def _missed_since(self, last_event_id):
+        token, _, sequence = last_event_id.rpartition('-')
+        if token != self.token or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence >= self._sequence:
+            return []
+        if not self._history or int(self._history[0][0].rpartition('-')[2]) > sequence + 1:
+            return None
+        return [event for event in self._history if int(event[0].rpartition('-')[2]) > sequence]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def start_relay(self, redis_url):
+        """Redis pub/sub ώστε τα events να φτάνουν σε όλους τους workers"""
+        import redis  # ImportError πριν κρατηθεί το URL
+
+        self._redis_url = redis_url
+        self._ensure_relay()
+
+    def _start_relay(self):
+        import redis
+
+        client = redis.Redis.from_url(self._redis_url)
+
+        def _listen():
+            while True:
+                try:
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(REDIS_CHANNEL)
+                    for message in pubsub.listen():
+                        payload = json.loads(message['data'])
+                        self.dispatch(payload['type'], payload['data'])
+                except Exception as e:
+                    logging.getLogger(__name__).warning(f'Event relay disconnected: {e}')
+                    time.sleep(5)
+
+        threading.Thread(target=_listen, name='event-bus-relay', daemon=True).start()
+        self._relay = client
+
+
+event_bus = EventBus()
+
+# gunicorn --preload: κάθε worker με δικό του token (αλλιώς το Last-Event-ID ενός
+# worker γίνεται δεκτό από άλλον και ξαναστέλνει λάθος history)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=event_bus.after_fork)
+
+
+# ==================== COMMIT HOOKS ====================
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+@on_commit(Visit)
+def _publish_visit_changes(changes):
+    for operation, _, snapshot in changes:
+        event_type = {'insert': 'visit_created', 'update': 'visit_updated',
+                      'delete': 'visit_deleted'}[operation]
+        event_bus.publish(event_type, {
+            'id': snapshot.get('id'),
+            'patient_id': snapshot.get('patient_id'),
+            'doctor_id': snapshot.get('doctor_id'),
+            'visit_type': snapshot.get('visit_type'),
+            'visit_date': _iso(snapshot.get('visit_date'))
+        })
+
+
+@on_commit(Patient)
+def _publish_new_patients(changes):
+    for operation, _, snapshot in changes:
+        if operation == 'insert':
+            event_bus.publish('patient_created', {'id': snapshot.get('id')})
+
+
+@on_commit(ChatMessage)
+def _publish_chat_messages(changes):
+    for operation, _, snapshot in changes:
+        if operation == 'insert':
+            event_bus.publish('chat_message', {
+                'id': snapshot.get('id'),
+                'sender_id': snapshot.get('sender_id'),
+                'message_type': snapshot.get('message_type'),
+                'title': snapshot.get('title')
+            })
+
+
+# ==================== SSE STREAM ====================
+
+def format_sse(event_id, event_type, data):
+    """Ένα SSE message"""
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(last_event_id=None, heartbeat=15, retry=5000):
+    """
+    Generator για text/event-stream response
+    Δεν χρησιμοποιεί DB ή request context, οπότε η σύνδεση δεν κρατά DB connection.
+    Το subscribe γίνεται στο πρώτο iteration, ώστε ένα response που δεν στάλθηκε
+    ποτέ να μην αφήνει queue στο event_bus (το finally τρέχει μόνο αν ξεκίνησε).
+    Το heartbeat κρατά ανοιχτή τη σύνδεση από proxies και εντοπίζει κλειστούς clients.
+    """
+    subscriber = event_bus.subscribe(last_event_id)
+    try:
+        yield f'retry: {retry}\n\n'
+        while True:
+            try:
+                event = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(*event)
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+
+def init_event_bus(app):
+    """Ενεργοποίηση Redis relay αν έχει οριστεί EVENT_BUS_REDIS_URL"""
+    redis_url = app.config.get('EVENT_BUS_REDIS_URL')
+    if not redis_url:
+        return
+    try:
+        event_bus.start_relay(redis_url)
+    except ImportError:
+        app.logger.warning('redis not installed, SSE events are per-process only')
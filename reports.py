@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+reports.py
+Αναφορές και στατιστικά (reports.html) του Dr. PLATI
+Οι μετρήσεις διαβάζονται από ημερήσια rollups (report_rollups): επισκέψεις ανά
+τύπο/γιατρό/ηλικιακή ομάδα, νέοι ασθενείς, έσοδα ανά τρόπο πληρωμής, εμβόλια
+ανά τύπο/ηλικιακή ομάδα. Κάθε refresh ξαναϋπολογίζει μόνο τις ημέρες που έχουν
+εγγραφές με created_at/updated_at μετά το high-water mark, καθώς και τις ημέρες
+που σημείωσαν οι mapper events στο rollup_dirty_days (διαγραφές, αλλαγή της
+ημερομηνίας μιας εγγραφής), οπότε ένα εύρος ημερομηνιών διαβάζει O(ημέρες) rows
+αντί να σαρώνει τους raw πίνακες.
+"""
+
+import json
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import event, inspect, func, desc
+from extensions import db
+from models import Patient, Visit, Vaccine, Transaction, ReportRollup, RollupState, RollupDirtyDay
+from vaccination import vaccination_coverage
+from diagnoses import top_diagnoses
+
+
+STATE_NAME = 'reports'
+
+# Πόσο πίσω από την έναρξη του refresh μπαίνει το high-water mark, ώστε να μη
+# χάνονται εγγραφές από transactions που έκαναν commit κατά τη διάρκειά του
+SAFETY_LAG = timedelta(minutes=5)
+
+# (key, label, από έτη, έως έτη)
+AGE_GROUPS = [
+    ('0-1', 'Βρέφη (0-1)', 0, 1),
+    ('1-3', 'Νήπια (1-3)', 1, 3),
+    ('3-6', 'Προσχολική (3-6)', 3, 6),
+    ('6-12', 'Σχολική (6-12)', 6, 12),
+    ('12-18', 'Έφηβοι (12-18)', 12, 18),
+    ('18+', 'Ενήλικες (18+)', 18, None),
+]
+
+VISIT_TYPE_LABELS = {
+    'checkup': 'Έλεγχος',
+    'sick': 'Ασθένεια',
+    'followup': 'Επανεξέταση',
+    'vaccination': 'Εμβολιασμός',
+    'emergency': 'Επείγον'
+}
+
+
+def _as_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def age_group(birth_date, on_date):
+    """Key της ηλικιακής ομάδας για ηλικία σε συμπληρωμένα έτη στις on_date"""
+    if birth_date is None or on_date is None:
+        return None
+    on_date = _as_day(on_date)
+    years = on_date.year - birth_date.year - ((on_date.month, on_date.day) < (birth_date.month, birth_date.day))
+    for key, _, low, high in AGE_GROUPS:
+        if years >= low and (high is None or years < high):
+            return key
+    return None
+
+
+# ==================== SOURCES ====================
+# Κάθε source: metrics που παράγει, ημερομηνία (business date), column αλλαγών,
+# query για [start, end) και συνάρτηση που δίνει (day, metric, dimension, amount)
+
+def _visit_query():
+    return db.select(Visit.visit_date, Visit.visit_type, Visit.doctor_id, Patient.date_of_birth).join(
+        Patient, Patient.id == Visit.patient_id
+    )
+
+
+def _visit_keys(row):
+    day = _as_day(row.visit_date)
+    keys = [
+        (day, 'visits', '', 0),
+        (day, 'visits', f"type:{row.visit_type or 'checkup'}", 0),
+        (day, 'visits', f'doctor:{row.doctor_id}', 0)
+    ]
+    group = age_group(row.date_of_birth, day)
+    if group:
+        keys.append((day, 'visits', f'age:{group}', 0))
+    return keys
+
+
+def _patient_query():
+    return db.select(Patient.created_at)
+
+
+def _patient_keys(row):
+    return [(_as_day(row.created_at), 'new_patients', '', 0)]
+
+
+def _vaccine_query():
+    return db.select(Vaccine.date_administered, Vaccine.vaccine_type, Vaccine.vaccine_name,
+                     Patient.date_of_birth).join(Patient, Patient.id == Vaccine.patient_id)
+
+
+def _vaccine_keys(row):
+    day = row.date_administered
+    keys = [
+        (day, 'vaccines', '', 0),
+        (day, 'vaccines', f'type:{(row.vaccine_type or row.vaccine_name or "")[:70]}', 0)
+    ]
+    group = age_group(row.date_of_birth, day)
+    if group:
+        keys.append((day, 'vaccines', f'age:{group}', 0))
+    return keys
+
+
+def _transaction_query():
+    return db.select(Transaction.transaction_date, Transaction.payment_method, Transaction.payment_status,
+                     Transaction.total_amount, Transaction.paid_amount, Transaction.insurance_coverage)
+
+
+def _transaction_keys(row):
+    if row.payment_status == 'cancelled':
+        return []
+    day = row.transaction_date
+    total = row.total_amount or Decimal('0')
+    keys = [
+        (day, 'revenue', '', total),
+        (day, 'revenue', f'method:{row.payment_method}', total)
+    ]
+    if row.payment_status in ('pending', 'partial'):
+        keys.append((day, 'pending_amount', '',
+                     total - (row.paid_amount or 0) - (row.insurance_coverage or 0)))
+    return keys
+
+
+ROLLUP_SOURCES = {
+    'visits': (('visits',), Visit.visit_date, Visit.updated_at, _visit_query, _visit_keys),
+    'patients': (('new_patients',), Patient.created_at, Patient.created_at, _patient_query, _patient_keys),
+    'vaccines': (('vaccines',), Vaccine.date_administered, Vaccine.updated_at, _vaccine_query, _vaccine_keys),
+    'transactions': (('revenue', 'pending_amount'), Transaction.transaction_date, Transaction.updated_at,
+                     _transaction_query, _transaction_keys),
+}
+
+
+def _range_filter(column, start, end):
+    """[start, end) σε dates - για DateTime columns με datetime bounds (sargable)"""
+    if column.type.python_type is datetime:
+        start = datetime.combine(start, datetime.min.time()) if start is not None else None
+        end = datetime.combine(end, datetime.min.time()) if end is not None else None
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return conditions
+
+
+# ==================== DIRTY DAYS ====================
+# Ένα DELETE ή ένα UPDATE που μετακινεί την business date δεν αφήνει updated_at
+# μετά το mark στην παλιά ημέρα. Οι mapper events τη σημειώνουν στο
+# rollup_dirty_days, στο ίδιο transaction με την αλλαγή.
+
+def mark_dirty_days(connection, source, days):
+    """Upsert (source, day) με marked_at = τώρα (native upsert όπως στο counters.py)"""
+    marked_at = datetime.utcnow()
+    rows = [{'source': source, 'day': day, 'marked_at': marked_at} for day in set(days) if day is not None]
+    if not rows:
+        return
+
+    table = RollupDirtyDay.__table__
+    dialect = connection.dialect.name
+
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update(marked_at=statement.inserted.marked_at)
+        connection.execute(statement, rows)
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.source, table.c.day],
+            set_={'marked_at': statement.excluded.marked_at}
+        )
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            result = connection.execute(
+                table.update().where(table.c.source == row['source'], table.c.day == row['day'])
+                .values(marked_at=row['marked_at'])
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert(), [row])
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    """No-op set listener (υπάρχει μόνο για το active_history)"""
+    pass
+
+
+def _register_dirty_days(source, business_column):
+    model, key = business_column.class_, business_column.key
+
+    def _after_update(mapper, connection, target):
+        history = inspect(target).attrs[key].history
+        if history.deleted:
+            # Παλιά και νέα ημέρα: η νέα καλύπτεται και από το updated_at, αλλά όχι στο patients
+            mark_dirty_days(connection, source, [_as_day(value) for value in (*history.deleted, *history.added)])
+
+    def _after_delete(mapper, connection, target):
+        mark_dirty_days(connection, source, [_as_day(getattr(target, key))])
+
+    event.listen(model, 'after_update', _after_update)
+    event.listen(model, 'after_delete', _after_delete)
+
+    # active_history: η παλιά ημερομηνία φορτώνεται στο set, ώστε να σημειωθεί η ημέρα της
+    event.listen(business_column, 'set', _keep_history, active_history=True)
+
+
+for _source, (_, _business_column, _, _, _) in ROLLUP_SOURCES.items():
+    _register_dirty_days(_source, _business_column)
+
+
+# ==================== REFRESH ====================
+
+def _aggregate(source, start=None, end=None):
+    """Counter (day, metric, dimension) -> [count, amount] από τα raw rows του [start, end)"""
+    _, business_column, _, query_factory, key_function = ROLLUP_SOURCES[source]
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    query = query_factory().where(*_range_filter(business_column, start, end)).execution_options(yield_per=5000)
+    for row in db.session.execute(query):
+        for day, metric, dimension, amount in key_function(row):
+            if day is None:
+                continue
+            total = totals[(day, metric, dimension)]
+            total[0] += 1
+            total[1] += Decimal(str(amount or 0))
+    return totals
+
+
+def _write(source, totals, start=None, end=None):
+    """Αντικατάσταση των rollups του source στο [start, end) με τα totals"""
+    metrics = ROLLUP_SOURCES[source][0]
+    table = ReportRollup.__table__
+    db.session.execute(table.delete().where(table.c.metric.in_(metrics), *_range_filter(table.c.day, start, end)))
+    rows = [{'day': day, 'metric': metric, 'dimension': dimension, 'count': count, 'amount': amount}
+            for (day, metric, dimension), (count, amount) in totals.items()]
+    for offset in range(0, len(rows), 1000):
+        db.session.execute(table.insert(), rows[offset:offset + 1000])
+
+
+def _day_runs(days):
+    """Συνεχόμενα διαστήματα [start, end) από ένα σύνολο ημερών"""
+    runs = []
+    for day in sorted(days):
+        if runs and runs[-1][1] == day:
+            runs[-1][1] = day + timedelta(days=1)
+        else:
+            runs.append([day, day + timedelta(days=1)])
+    return runs
+
+
+def _lock_state():
+    """Row του rollup_state με FOR UPDATE (ένας worker κάνει refresh κάθε φορά)"""
+    state = db.session.execute(
+        db.select(RollupState).where(RollupState.name == STATE_NAME).with_for_update()
+    ).scalar_one_or_none()
+    if state is None:
+        state = RollupState(name=STATE_NAME)
+        db.session.add(state)
+    return state
+
+
+def rebuild_rollups():
+    """Πλήρης rebuild όλων των rollups από τους raw πίνακες (migration, διορθώσεις)"""
+    state = _lock_state()
+    started = datetime.utcnow()
+    for source in ROLLUP_SOURCES:
+        _write(source, _aggregate(source))
+    dirty = RollupDirtyDay.__table__
+    db.session.execute(dirty.delete().where(dirty.c.marked_at <= started - SAFETY_LAG))
+    state.high_water = started - SAFETY_LAG
+    state.refreshed_at = started
+    db.session.commit()
+    return db.session.execute(db.select(func.count()).select_from(ReportRollup)).scalar()
+
+
+def refresh_rollups():
+    """
+    Incremental refresh από το high-water mark
+    Για κάθε source βρίσκονται οι ημέρες με εγγραφές που άλλαξαν μετά το mark
+    και οι ημέρες του rollup_dirty_days που σημειώθηκαν μετά το mark, και
+    ξαναϋπολογίζονται μόνο αυτές.
+    Return dict source -> πλήθος ημερών που ξαναϋπολογίστηκαν.
+    """
+    state = _lock_state()
+    if state.high_water is None:
+        db.session.rollback()
+        rebuild_rollups()
+        return {source: None for source in ROLLUP_SOURCES}
+
+    started = datetime.utcnow()
+    dirty = RollupDirtyDay.__table__
+    dirty_days = defaultdict(set)
+    for row in db.session.execute(db.select(dirty.c.source, dirty.c.day).where(dirty.c.marked_at > state.high_water)):
+        dirty_days[row.source].add(row.day)
+    # Όσες σημειώθηκαν πριν το προηγούμενο mark τις είδε ήδη το προηγούμενο refresh
+    db.session.execute(dirty.delete().where(dirty.c.marked_at <= state.high_water))
+
+    refreshed = {}
+    for source, (_, business_column, changed_column, _, _) in ROLLUP_SOURCES.items():
+        changed = db.session.execute(
+            db.select(business_column).where(changed_column > state.high_water).distinct()
+        ).scalars()
+        days = {_as_day(value) for value in changed if value is not None} | dirty_days[source]
+        for start, end in _day_runs(days):
+            _write(source, _aggregate(source, start, end), start, end)
+        refreshed[source] = len(days)
+
+    state.high_water = started - SAFETY_LAG
+    state.refreshed_at = started
+    db.session.commit()
+    return refreshed
+
+
+_last_refresh = 0.0
+
+
+def refresh_rollups_if_stale():
+    """Refresh το πολύ μία φορά ανά REPORTS_REFRESH_INTERVAL δευτερόλεπτα (ανά worker)"""
+    global _last_refresh
+    interval = current_app.config.get('REPORTS_REFRESH_INTERVAL', 60)
+    if time.monotonic() - _last_refresh < interval:
+        return False
+    refresh_rollups()
+    _last_refresh = time.monotonic()
+    return True
+
+
+# ==================== READ ====================
+
+def _rollup_rows(start, end):
+    query = db.select(ReportRollup.day, ReportRollup.metric, ReportRollup.dimension,
+                      ReportRollup.count, ReportRollup.amount)
+    return db.session.execute(query.where(*_range_filter(ReportRollup.day, start, end))).all()
+
+
+def _percent_change(current, previous):
+    if not previous:
+        return None
+    return round((current - previous) * 100.0 / previous, 1)
+
+
+def _series(rows, start, end):
+    """Visits ανά ημέρα (έως 62 ημέρες) ή ανά μήνα"""
+    daily = Counter()
+    for row in rows:
+        if row.metric == 'visits' and row.dimension == '':
+            daily[row.day] += row.count
+
+    if (end - start).days <= 62:
+        days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+        return [day.strftime('%d/%m') for day in days], [daily[day] for day in days]
+
+    monthly = Counter()
+    for day, count in daily.items():
+        monthly[(day.year, day.month)] += count
+    months = []
+    year, month = start.year, start.month
+    while (year, month) < (end.year, end.month) or (year, month) == (end.year, end.month) and end.day > 1:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return [f'{month:02d}/{year}' for year, month in months], [monthly[key] for key in months]
+
+
+def vaccination_stats(today=None):
+    """Κάλυψη ανά ηλικιακή ομάδα με βάση το χρονοδιάγραμμα εμβολιασμών (vaccination.py)"""
+    return vaccination_coverage(AGE_GROUPS, today or date.today())
+
+
+def report_data(start=None, end=None):
+    """
+    Όλα τα δεδομένα του reports.html για [start, end) (dates, end exclusive)
+    Χωρίς start: από την πρώτη ημέρα με δεδομένα
+    Return (stats, chart_data, vaccination_stats)
+    """
+    end = end or date.today() + timedelta(days=1)
+    if start is None:
+        first_day = db.session.execute(db.select(func.min(ReportRollup.day))).scalar()
+        start = min(first_day or end - timedelta(days=30), end - timedelta(days=1))
+
+    # Τρέχουσα και προηγούμενη (ίσου μήκους) περίοδος σε ένα query
+    previous_start = start - (end - start)
+    rows = _rollup_rows(previous_start, end)
+    current = [row for row in rows if row.day >= start]
+
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for row in current:
+        total = totals[(row.metric, row.dimension)]
+        total[0] += row.count
+        total[1] += row.amount or 0
+    previous_visits = sum(row.count for row in rows
+                          if row.day < start and row.metric == 'visits' and row.dimension == '')
+
+    coverage = vaccination_stats()
+    covered = sum(group['vaccinated'] for group in coverage.values())
+    population = sum(group['total'] for group in coverage.values())
+
+    stats = {
+        'total_visits': totals[('visits', '')][0],
+        'visits_change': _percent_change(totals[('visits', '')][0], previous_visits),
+        'total_patients': db.session.execute(
+            db.select(func.count()).select_from(Patient).where(Patient.is_active == True)
+        ).scalar(),
+        'new_patients': totals[('new_patients', '')][0],
+        'total_vaccines': totals[('vaccines', '')][0],
+        'vaccination_coverage': round(covered * 100.0 / population, 1) if population else 0,
+        'total_revenue': float(totals[('revenue', '')][1]),
+        'pending_amount': float(totals[('pending_amount', '')][1]),
+        'revenue_by_method': {dimension[7:]: float(amount) for (metric, dimension), (_, amount) in totals.items()
+                              if metric == 'revenue' and dimension.startswith('method:')},
+        'top_diagnoses': top_diagnoses(start, end)
+    }
+
+    visits_labels, visits_data = _series(current, start, end)
+    visit_types = sorted(((dimension[5:], count) for (metric, dimension), (count, _) in totals.items()
+                          if metric == 'visits' and dimension.startswith('type:')), key=lambda item: -item[1])
+    age_groups = [(label, totals[('visits', f'age:{key}')][0]) for key, label, _, _ in AGE_GROUPS]
+
+    chart_data = {
+        'visits_labels': json.dumps(visits_labels),
+        'visits_data': json.dumps(visits_data),
+        'visit_types_labels': json.dumps([VISIT_TYPE_LABELS.get(key, key) for key, _ in visit_types],
+                                         ensure_ascii=False),
+        'visit_types_data': json.dumps([count for _, count in visit_types]),
+        'age_groups_labels': json.dumps([label for label, _ in age_groups], ensure_ascii=False),
+        'age_groups_data': json.dumps([count for _, count in age_groups])
+    }
+    return stats, chart_data, coverage
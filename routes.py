@@ -5,23 +5,64 @@ Application routes για Dr. PLATI
 Pediatric Practice Management System
 """
 
-from flask import render_template, redirect, url_for, flash, request, jsonify, session, current_app, abort
+from flask import (render_template, redirect, url_for, flash, request, jsonify, session, current_app, abort,
+                   Response, send_file)
 from flask_login import login_user, logout_user, login_required, current_user
 from extensions import db
-from models import User, Patient, Visit, Vaccine, Service, Transaction, Certificate, ChatMessage, StealthCalendar
+from models import (User, Patient, Visit, Vaccine, Transaction, CertificateLog, ChatMessage, StealthCalendar, Job,
+                    VISIT_LIST_COLUMNS, patient_list_options, visit_list_options)
 from auth import login_required, topuser_required, doctor_required, secretary_required
-from utils import (validate_amka, validate_email, validate_phone, calculate_age, format_age,
+from utils import (validate_amka, validate_email, validate_phone, calculate_age, format_age, format_ages,
                   generate_invoice_number, generate_certificate_number, format_currency,
-                  normalize_search_term, clean_form_data, EncryptionHelper)
+                  normalize_search_term, clean_form_data, month_range, request_today, EncryptionHelper)
+from search import (patient_search_filter, patient_index, find_patients_by_phone,
+                    search_cache, init_search_cache, fuzzy_patient_search)
+from fulltext import fulltext_search, SEARCH_SCOPES
+from pagination import keyset_paginate, list_total
+from stats import dashboard_stats, admin_stats
+from accounts import get_account
+from transaction_lines import build_lines, services_json, service_revenue, billed_quantity
+from diagnoses import build_diagnoses
+from billing_actions import bulk_update, BulkActionError
+from catalog import get_catalog
+from reports import report_data, refresh_rollups_if_stale
+from exports import (xlsx_response, export_filename, patients_sheet, visits_sheet, transactions_sheet,
+                     report_sheets)
+from jobs import enqueue, job_status, job_result_path, init_jobs
+from pdfs import certificate_pdf_path, certificate_filename, PDF_MIMETYPE
+from realtime import event_stream, init_event_bus
+from query_guard import init_query_guard, query_budget
+from patient_cards import CARD_SECTIONS, load_section_totals, load_section_page, serialize_item
 from datetime import datetime, date, timedelta
 from sqlalchemy import or_, desc, func, and_
+from sqlalchemy.orm import joinedload, selectinload, contains_eager, load_only, undefer
 import secrets
 import json
 
 
+def _date_range_args():
+    """date_from/date_to (YYYY-MM-DD) από το query string, Raises ValueError"""
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    return (datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None,
+            datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None)
+
+
 def register_routes(app):
     """Register all application routes"""
     
+    # Patient search result cache (το n-gram index χτίζεται στο πρώτο search κάθε worker)
+    init_search_cache(app)
+    
+    # Live updates (SSE), με Redis relay αν υπάρχουν πολλοί workers
+    init_event_bus(app)
+    
+    # Όριο queries ανά request (N+1 detection, βλ. MAX_QUERIES_PER_REQUEST)
+    init_query_guard(app)
+    
+    # Background jobs (PDF): recovery των εργασιών που έμειναν από προηγούμενο worker
+    init_jobs(app)
+    
     # ==================== MAIN ROUTES ====================
     
     @app.route('/')
@@ -82,40 +123,46 @@ def register_routes(app):
         search_query = request.args.get('search', '').strip()
         patients = []
         
-        if search_query:
+        search_filter = patient_search_filter(search_query) if search_query else None
+        if search_filter is not None:
             search_term = normalize_search_term(search_query)
-            patients = Patient.query.filter(
-                or_(
-                    func.lower(Patient.first_name).contains(search_term),
-                    func.lower(Patient.last_name).contains(search_term),
-                    Patient.amka.contains(search_query),
-                    Patient.phone.contains(search_query),
-                    Patient.mobile.contains(search_query)
-                )
-            ).filter_by(is_active=True).order_by(
-                Patient.last_name, Patient.first_name
-            ).limit(20).all()
+            patient_ids = search_cache.get('dashboard', search_term)
+            
+            if patient_ids is None:
+                patients = Patient.query.options(patient_list_options()).filter(search_filter).filter_by(
+                    is_active=True
+                ).order_by(Patient.last_name, Patient.first_name).limit(20).all()
+                patient_ids = [p.id for p in patients]
+                
+                # Greeklish ή ορθογραφικά λάθη: typo-tolerant αναζήτηση
+                if not patient_ids:
+                    patient_ids = [row.id for row in fuzzy_patient_search(search_query, limit=20)]
+                    if patient_ids:
+                        by_id = {p.id: p for p in Patient.query.options(patient_list_options()).filter(
+                            Patient.id.in_(patient_ids)).all()}
+                        patients = [by_id[pid] for pid in patient_ids if pid in by_id]
+                
+                search_cache.set('dashboard', search_term, patient_ids, patient_ids)
+            elif patient_ids:
+                # Cache hit: φόρτωση με primary key αντί για αναζήτηση
+                by_id = {p.id: p for p in Patient.query.options(patient_list_options()).filter(
+                    Patient.id.in_(patient_ids)).all()}
+                patients = [by_id[pid] for pid in patient_ids if pid in by_id]
         
-        # Statistics for dashboard
-        stats = {
-            'total_patients': Patient.query.filter_by(is_active=True).count(),
-            'visits_today': Visit.query.filter(
-                func.date(Visit.visit_date) == date.today()
-            ).count(),
-            'visits_this_month': Visit.query.filter(
-                func.year(Visit.visit_date) == date.today().year,
-                func.month(Visit.visit_date) == date.today().month
-            ).count(),
-            'pending_transactions': Transaction.query.filter_by(payment_status='pending').count()
-        }
+        # Statistics for dashboard (ένα round trip, cached για λίγα δευτερόλεπτα)
+        stats = dashboard_stats()
         
         # Recent patients
-        recent_patients = Patient.query.filter_by(is_active=True).order_by(
+        recent_patients = Patient.query.options(patient_list_options()).filter_by(is_active=True).order_by(
             desc(Patient.created_at)
         ).limit(5).all()
         
         # Recent visits
-        recent_visits = Visit.query.join(Patient).filter(
+        recent_visits = Visit.query.join(Visit.patient).options(
+            visit_list_options(),
+            contains_eager(Visit.patient).options(patient_list_options()),
+            joinedload(Visit.doctor)
+        ).filter(
             Patient.is_active == True
         ).order_by(desc(Visit.visit_date)).limit(5).all()
         
@@ -157,34 +204,36 @@ def register_routes(app):
     @app.route('/patients')
     @login_required
     def patient_list():
-        """Patient listing με pagination"""
-        page = request.args.get('page', 1, type=int)
+        """Patient listing με keyset pagination (last_name, first_name, id)"""
         per_page = 20
         
         search_query = request.args.get('search', '').strip()
         
-        query = Patient.query.filter_by(is_active=True)
+        query = Patient.query.options(patient_list_options()).filter_by(is_active=True)
         
-        if search_query:
-            search_term = normalize_search_term(search_query)
-            query = query.filter(
-                or_(
-                    func.lower(Patient.first_name).contains(search_term),
-                    func.lower(Patient.last_name).contains(search_term),
-                    Patient.amka.contains(search_query),
-                    Patient.phone.contains(search_query),
-                    Patient.mobile.contains(search_query)
-                )
-            )
+        search_filter = patient_search_filter(search_query) if search_query else None
+        if search_filter is not None:
+            query = query.filter(search_filter)
         
-        patients = query.order_by(
-            Patient.last_name, Patient.first_name
-        ).paginate(
-            page=page, per_page=per_page, error_out=False
+        total = list_total(('patients', normalize_search_term(search_query)), Patient, query,
+                           mode=current_app.config.get('LIST_TOTAL_COUNT', 'cached'))
+        
+        pagination = keyset_paginate(
+            query.options(joinedload(Patient.account)),
+            order_by=[Patient.last_name, Patient.first_name, Patient.id],
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=per_page,
+            total=total
         )
         
+        # Φίλτρα που διατηρούνται στα links σελιδοποίησης
+        page_args = {k: v for k, v in request.args.items() if k not in ('after', 'before', 'page')}
+        
         return render_template('patient_list.html', 
-                             patients=patients,
+                             patients=pagination.items,
+                             pagination=pagination,
+                             page_args=page_args,
                              search_query=search_query)
     
     @app.route('/patients/add', methods=['GET', 'POST'])
@@ -301,40 +350,38 @@ def register_routes(app):
     @login_required
     def patient_card(patient_id):
         """Patient card με όλες τις πληροφορίες"""
-        patient = Patient.query.filter_by(id=patient_id, is_active=True).first_or_404()
-        
-        # Get visits
-        visits = Visit.query.filter_by(patient_id=patient.id).order_by(
-            desc(Visit.visit_date)
-        ).limit(10).all()
+        patient = Patient.query.options(undefer('*')).filter_by(id=patient_id, is_active=True).first_or_404()
         
-        # Get vaccines
-        vaccines = Vaccine.query.filter_by(patient_id=patient.id).order_by(
-            desc(Vaccine.date_administered)
-        ).limit(10).all()
+        # Μόνο στοιχεία ασθενούς και πλήθη - οι ενότητες φορτώνονται on demand
+        return render_template('patient_card.html', 
+                             patient=patient,
+                             section_totals=load_section_totals(patient))
+    
+    @app.route('/patients/<int:patient_id>/sections/<section>')
+    @login_required
+    def patient_card_section(patient_id, section):
+        """Σελίδα μίας ενότητας της καρτέλας (HTML fragment ή JSON με format=json)"""
+        if section not in CARD_SECTIONS:
+            abort(404)
         
-        # Get transactions
-        transactions = Transaction.query.filter_by(patient_id=patient.id).order_by(
-            desc(Transaction.transaction_date)
-        ).limit(10).all()
+        patient = Patient.query.filter_by(id=patient_id, is_active=True).first_or_404()
+        data = load_section_page(patient, section,
+                                 page=request.args.get('page', 1, type=int),
+                                 per_page=request.args.get('per_page', 10, type=int),
+                                 after=request.args.get('after'),
+                                 before=request.args.get('before'))
         
-        # Get certificates
-        certificates = Certificate.query.filter_by(patient_id=patient.id).order_by(
-            desc(Certificate.issue_date)
-        ).limit(10).all()
+        if request.args.get('format') == 'json':
+            return jsonify(dict(data, items=[serialize_item(item) for item in data['items']]))
         
-        return render_template('patient_card.html', 
-                             patient=patient,
-                             visits=visits,
-                             vaccines=vaccines,
-                             transactions=transactions,
-                             certificates=certificates)
+        template = 'patient_card_billing.html' if section == 'transactions' else f'patient_card_{section}.html'
+        return render_template(template, patient=patient, section=data, **{section: data['items']})
     
     @app.route('/patients/<int:patient_id>/edit', methods=['GET', 'POST'])
     @login_required
     def patient_edit(patient_id):
         """Edit patient information"""
-        patient = Patient.query.filter_by(id=patient_id, is_active=True).first_or_404()
+        patient = Patient.query.options(undefer('*')).filter_by(id=patient_id, is_active=True).first_or_404()
         
         if request.method == 'POST':
             data = clean_form_data(request.form.to_dict())
@@ -419,6 +466,71 @@ def register_routes(app):
     
     # ==================== VISIT ROUTES ====================
     
+    def _visit_list_day():
+        """(ημέρα του date arg ή σήμερα, φίλτρα visit_date της ημέρας) - 400 για μη έγκυρη ημερομηνία"""
+        try:
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else request_today()
+        except ValueError:
+            abort(400)
+        
+        day_start = datetime.combine(day, datetime.min.time())
+        return day, (Visit.visit_date >= day_start, Visit.visit_date < day_start + timedelta(days=1))
+    
+    def _visit_list_query(in_day):
+        return Visit.query.join(Visit.patient).options(
+            visit_list_options(),
+            contains_eager(Visit.patient).options(patient_list_options()),
+            joinedload(Visit.doctor),
+            selectinload(Visit.diagnoses)
+        ).filter(*in_day)
+    
+    def _visit_type_counts(in_day):
+        """Πλήθος ανά τύπο για τις κάρτες της ημέρας (ένα GROUP BY στο idx_visit_date)"""
+        return dict(db.session.execute(
+            db.select(Visit.visit_type, func.count()).where(*in_day).group_by(Visit.visit_type)
+        ).all())
+    
+    @app.route('/visits')
+    @login_required
+    def visit_list():
+        """Επισκέψεις μίας ημέρας (date, default σήμερα) με keyset pagination και live updates (/api/events)"""
+        day, in_day = _visit_list_day()
+        
+        pagination = keyset_paginate(
+            _visit_list_query(in_day),
+            order_by=[Visit.visit_date, Visit.id],
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=50
+        )
+        type_counts = _visit_type_counts(in_day)
+        
+        return render_template('visit_list.html',
+                             visits=pagination.items,
+                             pagination=pagination,
+                             page_args={'date': day.isoformat()},
+                             today_date=day.isoformat(),
+                             total_visits_today=sum(type_counts.values()),
+                             visit_type_counts=type_counts)
+    
+    @app.route('/visits/<int:visit_id>/row')
+    @login_required
+    def visit_list_row(visit_id):
+        """
+        Live update του visit_list για ένα event επίσκεψης: το row της (html None αν
+        διαγράφηκε ή δεν είναι πλέον στην ημέρα date) και τα πλήθη της ημέρας
+        """
+        _, in_day = _visit_list_day()
+        visit = _visit_list_query(in_day).filter(Visit.id == visit_id).first()
+        type_counts = _visit_type_counts(in_day)
+        
+        return jsonify({
+            'id': visit_id,
+            'html': render_template('visit_list_row.html', visit=visit) if visit else None,
+            'type_counts': type_counts,
+            'total': sum(type_counts.values())
+        })
+    
     @app.route('/visits/add/<int:patient_id>', methods=['GET', 'POST'])
     @doctor_required
     def visit_add(patient_id):
@@ -431,6 +543,11 @@ def register_routes(app):
             try:
                 visit_date = datetime.strptime(data.get('visit_date', ''), '%Y-%m-%dT%H:%M')
                 
+                # Το Visit δεν έχει ξεχωριστό πεδίο για το ουρογεννητικό: κρατιέται στις σημειώσεις
+                notes = data.get('notes')
+                if data.get('genitourinary'):
+                    notes = '\n'.join(filter(None, [notes, f"Ουρογεννητικό: {data['genitourinary']}"]))
+                
                 visit = Visit(
                     patient_id=patient.id,
                     doctor_id=current_user.id,
@@ -449,24 +566,24 @@ def register_routes(app):
                     oxygen_saturation=int(data['oxygen_saturation']) if data.get('oxygen_saturation') else None,
                     general_appearance=data.get('general_appearance'),
                     skin=data.get('skin'),
-                    heent=data.get('heent'),
+                    head_neck=data.get('heent'),
                     cardiovascular=data.get('cardiovascular'),
                     respiratory=data.get('respiratory'),
-                    abdominal=data.get('abdominal'),
-                    genitourinary=data.get('genitourinary'),
+                    abdomen=data.get('abdominal'),
                     neurological=data.get('neurological'),
                     musculoskeletal=data.get('musculoskeletal'),
-                    diagnosis=data.get('diagnosis'),
-                    icd10_codes=data.get('icd10_codes'),
-                    treatment_plan=data.get('treatment_plan'),
+                    assessment=data.get('diagnosis'),
+                    plan=data.get('treatment_plan'),
                     medications=data.get('medications'),
-                    instructions=data.get('instructions'),
-                    follow_up_date=datetime.strptime(data['follow_up_date'], '%Y-%m-%d').date() if data.get('follow_up_date') else None,
-                    follow_up_instructions=data.get('follow_up_instructions'),
-                    notes=data.get('notes'),
-                    status='completed'
+                    recommendations=data.get('instructions'),
+                    next_visit_date=datetime.strptime(data['follow_up_date'], '%Y-%m-%d').date() if data.get('follow_up_date') else None,
+                    follow_up=data.get('follow_up_instructions'),
+                    notes=notes
                 )
                 
+                # Κωδικοί ICD-10 της φόρμας (ο πρώτος είναι η κύρια διάγνωση)
+                visit.diagnoses = build_diagnoses(data.get('icd10_codes'), data.get('diagnosis'), visit_date)
+                
                 # Update patient's current measurements
                 if data.get('weight'):
                     patient.current_weight = float(data['weight'])
@@ -492,7 +609,7 @@ def register_routes(app):
     @doctor_required
     def visit_edit(visit_id):
         """Edit visit"""
-        visit = Visit.query.get_or_404(visit_id)
+        visit = Visit.query.options(undefer('*')).filter_by(id=visit_id).first_or_404()
         
         if request.method == 'POST':
             data = clean_form_data(request.form.to_dict())
@@ -569,27 +686,53 @@ def register_routes(app):
     @app.route('/billing/<int:patient_id>')
     @login_required
     def billing(patient_id):
-        """Billing management για ασθενή"""
+        """Billing management για ασθενή (σύνολα από patient_accounts, σελιδοποιημένες συναλλαγές)"""
         patient = Patient.query.filter_by(id=patient_id, is_active=True).first_or_404()
+        page = request.args.get('page', 1, type=int)
+        
+        pagination = db.paginate(
+            Transaction.query.options(selectinload(Transaction.lines)).filter_by(patient_id=patient.id).order_by(
+                desc(Transaction.transaction_date), desc(Transaction.id)
+            ),
+            page=page, per_page=25, error_out=False
+        )
         
-        transactions = Transaction.query.filter_by(patient_id=patient.id).order_by(
-            desc(Transaction.transaction_date)
-        ).all()
+        services = get_catalog()
         
-        services = Service.query.filter_by(is_active=True).order_by(Service.name).all()
+        # Totals από το account του ασθενούς (χωρίς σάρωση των συναλλαγών)
+        account = get_account(patient.id)
+        month_start, next_month = month_range(date.today())
+        monthly_total = db.session.execute(
+            db.select(func.coalesce(func.sum(Transaction.total_amount), 0)).where(
+                Transaction.patient_id == patient.id,
+                Transaction.transaction_date >= month_start,
+                Transaction.transaction_date < next_month,
+                Transaction.payment_status != 'cancelled'
+            )
+        ).scalar()
         
-        # Calculate totals
-        total_billed = sum(t.total_amount for t in transactions)
-        total_paid = sum(t.paid_amount for t in transactions)
-        total_pending = total_billed - total_paid
+        stats = {
+            'total_billed': account.total_billed,
+            'total_paid': account.total_paid,
+            'total_insurance': account.total_insurance,
+            'total_pending': account.balance,
+            'monthly_total': monthly_total,
+            'total_transactions': account.transaction_count,
+            'last_payment_date': account.last_payment_date
+        }
+        page_args = {k: v for k, v in request.args.items() if k != 'page'}
         
         return render_template('billing.html',
                              patient=patient,
-                             transactions=transactions,
+                             account=account,
+                             transactions=pagination.items,
+                             pagination=pagination,
+                             page_args=page_args,
                              services=services,
-                             total_billed=total_billed,
-                             total_paid=total_paid,
-                             total_pending=total_pending)
+                             stats=stats,
+                             total_billed=account.total_billed,
+                             total_paid=account.total_paid,
+                             total_pending=account.balance)
     
     @app.route('/billing/add', methods=['POST'])
     @login_required
@@ -601,13 +744,17 @@ def register_routes(app):
         try:
             patient = Patient.query.get_or_404(patient_id)
             
-            # Create transaction
+            transaction_date = datetime.strptime(data['transaction_date'], '%Y-%m-%d').date()
+            lines = build_lines(data['services'], transaction_date)
+            
+            # Create transaction (μία γραμμή ανά υπηρεσία, services_json για compatibility)
             transaction = Transaction(
                 patient_id=patient.id,
                 created_by=current_user.id,
                 invoice_number=generate_invoice_number(),
-                transaction_date=datetime.strptime(data['transaction_date'], '%Y-%m-%d').date(),
-                services_json=json.dumps(data['services']),
+                transaction_date=transaction_date,
+                lines=lines,
+                services_json=services_json(lines),
                 subtotal=data['subtotal'],
                 discount=data.get('discount', 0),
                 tax_rate=data.get('tax_rate', 0.24),
@@ -623,15 +770,54 @@ def register_routes(app):
             if data['payment_status'] == 'paid':
                 transaction.payment_date = datetime.utcnow()
             
+            # Το patient_accounts ενημερώνεται στο flush, στο ίδιο transaction
             db.session.add(transaction)
             db.session.commit()
             
-            return jsonify({'success': True, 'message': 'Η συναλλαγή προστέθηκε επιτυχώς!'})
+            account = get_account(patient.id)
+            return jsonify({
+                'success': True,
+                'message': 'Η συναλλαγή προστέθηκε επιτυχώς!',
+                'balance': float(account.balance)
+            })
             
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'message': 'Σφάλμα κατά την προσθήκη της συναλλαγής.'})
     
+    @app.route('/billing/bulk_action', methods=['POST'])
+    @login_required
+    def billing_bulk_action():
+        """Μαζική ενέργεια σε επιλεγμένες συναλλαγές (ένα UPDATE, αποτέλεσμα ανά συναλλαγή)"""
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            summary = bulk_update(data.get('action'), data.get('transaction_ids'), data)
+        except BulkActionError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Bulk billing action failed: {e}')
+            return jsonify({'success': False, 'error': 'Σφάλμα κατά την ενημέρωση των συναλλαγών.'}), 500
+        
+        return jsonify(dict(summary, success=True))
+    
+    @app.route('/transaction/<int:transaction_id>/mark_paid', methods=['POST'])
+    @login_required
+    def transaction_mark_paid(transaction_id):
+        """Εξόφληση μίας συναλλαγής"""
+        try:
+            summary = bulk_update('mark_paid', [transaction_id])
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Mark paid failed: {e}')
+            return jsonify({'success': False, 'error': 'Σφάλμα κατά την ενημέρωση της συναλλαγής.'}), 500
+        
+        result = summary['results'][0]
+        if result['status'] != 'updated':
+            return jsonify({'success': False, 'error': result['reason']}), 404 if result['not_found'] else 409
+        return jsonify({'success': True, 'message': 'Η συναλλαγή σημειώθηκε ως πληρωμένη.'})
+    
     # ==================== CERTIFICATE ROUTES ====================
     
     @app.route('/certificates/new', methods=['GET', 'POST'])
@@ -649,7 +835,7 @@ def register_routes(app):
             patient = Patient.query.get_or_404(patient_id)
             
             try:
-                certificate = Certificate(
+                certificate = CertificateLog(
                     patient_id=patient.id,
                     issued_by=current_user.id,
                     certificate_type=data.get('certificate_type'),
@@ -676,6 +862,159 @@ def register_routes(app):
         
         return render_template('certificate_form.html')
     
+    @app.route('/certificates/<int:certificate_id>/pdf')
+    @login_required
+    def certificate_pdf(certificate_id):
+        """PDF βεβαίωσης: το αποθηκευμένο αρχείο ή δημιουργία σε background job"""
+        certificate = db.get_or_404(CertificateLog, certificate_id)
+        path = certificate_pdf_path(certificate)
+        if path:
+            return send_file(path, mimetype=PDF_MIMETYPE, download_name=certificate_filename(certificate))
+        
+        job = enqueue('certificate_pdf', {'certificate_id': certificate.id}, current_user.id)
+        return _job_response(job)
+    
+    # ==================== REPORT ROUTES ====================
+    
+    @app.route('/reports')
+    @doctor_required
+    @query_budget(60)
+    def reports():
+        """Αναφορές & στατιστικά από τα ημερήσια rollups"""
+        try:
+            date_from, date_to = _date_range_args()
+        except ValueError:
+            flash('Μη έγκυρη ημερομηνία.', 'warning')
+            date_from = date_to = None
+        
+        refresh_rollups_if_stale()
+        stats, chart_data, vaccination_stats = report_data(
+            date_from, date_to + timedelta(days=1) if date_to else None
+        )
+        
+        if date_from or date_to:
+            period_display = f"{date_from.strftime('%d/%m/%Y') if date_from else '...'} - {date_to.strftime('%d/%m/%Y') if date_to else '...'}"
+        else:
+            period_display = None
+        
+        return render_template('reports.html',
+                             stats=stats,
+                             chart_data=chart_data,
+                             vaccination_stats=vaccination_stats,
+                             date_from=date_from.isoformat() if date_from else None,
+                             date_to=date_to.isoformat() if date_to else None,
+                             period_display=period_display)
+    
+    @app.route('/reports/export')
+    @doctor_required
+    @query_budget(60)
+    def reports_export():
+        """Εξαγωγή αναφοράς σε Excel (σύνοψη, ημερήσια rollups, επισκέψεις περιόδου) ή PDF (background job)"""
+        export_format = request.args.get('format', 'excel')
+        if export_format not in ('excel', 'pdf'):
+            abort(400)
+        try:
+            date_from, date_to = _date_range_args()
+        except ValueError:
+            abort(400)
+        
+        if export_format == 'pdf':
+            job = enqueue('report_pdf', {
+                'date_from': date_from.isoformat() if date_from else None,
+                'date_to': date_to.isoformat() if date_to else None
+            }, current_user.id)
+            return _job_response(job)
+        
+        refresh_rollups_if_stale()
+        stats, _, _ = report_data(date_from, date_to + timedelta(days=1) if date_to else None)
+        return xlsx_response(export_filename('report', date_from, date_to),
+                             report_sheets(stats, date_from, date_to))
+    
+    # ==================== EXPORT ROUTES ====================
+    
+    @app.route('/patients/export')
+    @login_required
+    def patients_export():
+        """Εξαγωγή λίστας ασθενών σε Excel (με το ίδιο φίλτρο αναζήτησης)"""
+        search_query = request.args.get('search', '').strip()
+        search_filter = patient_search_filter(search_query) if search_query else None
+        return xlsx_response(export_filename('patients'), [patients_sheet(search_filter)])
+    
+    @app.route('/visits/export')
+    @doctor_required
+    def visits_export():
+        """Εξαγωγή επισκέψεων σε Excel (date_from, date_to, doctor_id, patient_id)"""
+        try:
+            date_from, date_to = _date_range_args()
+        except ValueError:
+            abort(400)
+        
+        sheet = visits_sheet(date_from, date_to,
+                             doctor_id=request.args.get('doctor_id', type=int),
+                             patient_id=request.args.get('patient_id', type=int))
+        return xlsx_response(export_filename('visits', date_from, date_to), [sheet])
+    
+    @app.route('/billing/export')
+    @login_required
+    def billing_export():
+        """Εξαγωγή συναλλαγών σε Excel (φίλτρα της σελίδας billing)"""
+        try:
+            date_from, date_to = _date_range_args()
+        except ValueError:
+            abort(400)
+        
+        sheet = transactions_sheet(date_from, date_to,
+                                   payment_status=request.args.get('payment_status') or None,
+                                   payment_method=request.args.get('payment_method') or None,
+                                   patient_id=request.args.get('patient_id', type=int),
+                                   search=request.args.get('search', '').strip() or None)
+        return xlsx_response(export_filename('transactions', date_from, date_to), [sheet])
+    
+    # ==================== JOB ROUTES ====================
+    
+    def _get_job_or_404(job_id):
+        job = db.get_or_404(Job, job_id)
+        if job.created_by != current_user.id and not current_user.is_topuser:
+            abort(403)
+        return job
+    
+    def _job_status_payload(job):
+        payload = job_status(job)
+        payload['status_url'] = url_for('api_job_status', job_id=job.id)
+        payload['download_url'] = url_for('job_download', job_id=job.id) if job.status == 'done' else None
+        return payload
+    
+    def _job_response(job):
+        """JSON (202) για XHR/fetch, αλλιώς η σελίδα αναμονής που κάνει polling"""
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(_job_status_payload(job)), 202
+        return redirect(url_for('job_view', job_id=job.id))
+    
+    @app.route('/jobs/<job_id>')
+    @login_required
+    def job_view(job_id):
+        """Σελίδα αναμονής μέχρι να ολοκληρωθεί η εργασία"""
+        job = _get_job_or_404(job_id)
+        return render_template('job_status.html', job=job, status=_job_status_payload(job))
+    
+    @app.route('/api/jobs/<job_id>')
+    @login_required
+    def api_job_status(job_id):
+        """Status εργασίας για polling"""
+        return jsonify(_job_status_payload(_get_job_or_404(job_id)))
+    
+    @app.route('/jobs/<job_id>/download')
+    @login_required
+    def job_download(job_id):
+        """Αρχείο ολοκληρωμένης εργασίας (409 αν δεν είναι έτοιμο, 410 αν έχει διαγραφεί)"""
+        job = _get_job_or_404(job_id)
+        if job.status != 'done':
+            abort(409)
+        path = job_result_path(job)
+        if path is None:
+            abort(410)
+        return send_file(path, mimetype=job.mimetype, download_name=job.filename)
+    
     # ==================== ADMIN ROUTES ====================
     
     @app.route('/admin')
@@ -685,13 +1024,7 @@ def register_routes(app):
         users = User.query.order_by(User.username).all()
         
         # System statistics
-        stats = {
-            'total_users': User.query.count(),
-            'total_patients': Patient.query.filter_by(is_active=True).count(),
-            'total_visits': Visit.query.count(),
-            'total_transactions': Transaction.query.count(),
-            'database_size': '---'  # Would require actual DB query
-        }
+        stats = admin_stats()
         
         return render_template('admin_panel.html', users=users, stats=stats)
     
@@ -731,7 +1064,10 @@ def register_routes(app):
     @login_required
     def chat():
         """Team communication"""
-        messages = ChatMessage.query.order_by(desc(ChatMessage.created_at)).limit(50).all()
+        messages = ChatMessage.query.options(
+            joinedload(ChatMessage.sender),
+            joinedload(ChatMessage.related_patient).options(patient_list_options())
+        ).order_by(desc(ChatMessage.created_at)).limit(50).all()
         messages.reverse()  # Show oldest first
         
         return render_template('chat.html', messages=messages)
@@ -764,46 +1100,191 @@ def register_routes(app):
     # ==================== API ROUTES ====================
     
     @app.route('/api/patients/search')
+    @app.route('/api/search_patients')
     @login_required
     def api_patient_search():
-        """API για patient search"""
+        """API για patient search (autocomplete)"""
         query = request.args.get('q', '').strip()
         
         if len(query) < 2:
             return jsonify([])
         
         search_term = normalize_search_term(query)
-        patients = Patient.query.filter(
-            or_(
-                func.lower(Patient.first_name).contains(search_term),
-                func.lower(Patient.last_name).contains(search_term),
-                Patient.amka.contains(query)
-            )
-        ).filter_by(is_active=True).limit(10).all()
+        results = search_cache.get('api', search_term)
+        if results is not None:
+            return jsonify(results)
+        
+        # In-memory n-gram index, με DB fallback όσο το index δεν είναι έτοιμο
+        matches = patient_index.search(query, limit=10)
+        if matches is not None:
+            ages = format_ages([m['date_of_birth'] for m in matches])
+            results = [{
+                'id': m['id'],
+                'name': f"{m['first_name']} {m['last_name']}",
+                'amka': m['amka'],
+                'phone': m['phone'],
+                'age': age
+            } for m, age in zip(matches, ages)]
+        else:
+            search_filter = patient_search_filter(query, include_phones=False)
+            if search_filter is None:
+                return jsonify([])
+            
+            patients = Patient.query.options(patient_list_options()).filter(search_filter).filter_by(
+                is_active=True
+            ).order_by(Patient.last_name_search, Patient.first_name_search).limit(10).all()
+            
+            results = [{
+                'id': p.id,
+                'name': p.full_name,
+                'amka': p.amka,
+                'phone': p.phone or p.mobile,
+                'age': p.age_string
+            } for p in patients]
+        
+        # Greeklish ή ορθογραφικά λάθη: typo-tolerant αναζήτηση
+        if not results:
+            rows = fuzzy_patient_search(query, limit=10)
+            results = [{
+                'id': row.id,
+                'name': f"{row.first_name} {row.last_name}",
+                'amka': row.amka,
+                'phone': row.phone or row.mobile,
+                'age': age,
+                'fuzzy': True
+            } for row, age in zip(rows, format_ages([row.date_of_birth for row in rows]))]
+        
+        search_cache.set('api', search_term, results, [r['id'] for r in results])
+        return jsonify(results)
+    
+    @app.route('/api/search/cache-stats')
+    @topuser_required
+    def api_search_cache_stats():
+        """Hit/miss counters του patient search cache"""
+        return jsonify(search_cache.stats())
+    
+    @app.route('/api/patients/caller')
+    @login_required
+    def api_patient_caller():
+        """API για "ποιος καλεί" - αναζήτηση ασθενή από αριθμό τηλεφώνου"""
+        number = request.args.get('number', '').strip()
+        
+        field_labels = {
+            'phone': 'Τηλέφωνο',
+            'mobile': 'Κινητό',
+            'father_phone': 'Πατέρας',
+            'mother_phone': 'Μητέρα',
+            'guardian_phone': 'Κηδεμόνας'
+        }
         
         results = [{
-            'id': p.id,
-            'name': p.full_name,
-            'amka': p.amka,
-            'age': p.age_string
-        } for p in patients]
+            'id': patient.id,
+            'name': patient.full_name,
+            'amka': patient.amka,
+            'age': patient.age_string,
+            'matched': field_labels.get(field, field)
+        } for patient, field in find_patients_by_phone(number)]
         
         return jsonify(results)
     
+    @app.route('/api/search')
+    @login_required
+    def api_fulltext_search():
+        """API για full-text search σε ασθενείς ή κλινικά πεδία επισκέψεων"""
+        query = request.args.get('q', '').strip()
+        scope = request.args.get('scope', 'patients')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        
+        if scope not in SEARCH_SCOPES:
+            return jsonify({'success': False, 'message': 'Μη έγκυρο πεδίο αναζήτησης.'}), 400
+        
+        # Κλινικά δεδομένα μόνο για γιατρούς
+        if scope == 'visits' and not current_user.is_doctor:
+            abort(403)
+        
+        if len(query) < 2:
+            return jsonify({'items': [], 'total': 0, 'page': page, 'per_page': per_page})
+        
+        hits, total = fulltext_search(scope, query, page=page, per_page=per_page)
+        scores = dict(hits)
+        ids = [hit_id for hit_id, _ in hits]
+        
+        if scope == 'patients':
+            patients = {p.id: p for p in Patient.query.options(patient_list_options()).filter(
+                Patient.id.in_(ids)).all()} if ids else {}
+            items = [{
+                'id': p.id,
+                'name': p.full_name,
+                'amka': p.amka,
+                'age': p.age_string,
+                'score': scores[p.id]
+            } for p in (patients[i] for i in ids if i in patients)]
+        else:
+            visits = {v.id: v for v in Visit.query.options(
+                load_only(*VISIT_LIST_COLUMNS, Visit.chief_complaint, Visit.assessment),
+                joinedload(Visit.patient).options(patient_list_options())
+            ).filter(Visit.id.in_(ids)).all()} if ids else {}
+            items = [{
+                'id': v.id,
+                'patient_id': v.patient_id,
+                'patient_name': v.patient.full_name,
+                'visit_date': v.visit_date.isoformat() if v.visit_date else None,
+                'chief_complaint': v.chief_complaint,
+                'assessment': v.assessment,
+                'score': scores[v.id]
+            } for v in (visits[i] for i in ids if i in visits)]
+        
+        return jsonify({
+            'items': items,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        })
+    
     @app.route('/api/services')
     @login_required
     def api_services():
-        """API για services"""
-        services = Service.query.filter_by(is_active=True).order_by(Service.name).all()
+        """API για services (cached κατάλογος, ETag/If-None-Match για 304)"""
+        catalog = get_catalog()
         
-        results = [{
-            'id': s.id,
-            'name': s.name,
-            'description': s.description,
-            'price': float(s.price)
-        } for s in services]
+        if catalog.etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(catalog.payload, mimetype='application/json')
         
-        return jsonify(results)
+        # Ο browser κρατά το αντίγραφο αλλά το επαληθεύει σε κάθε χρήση
+        response.set_etag(catalog.etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    
+    @app.route('/api/reports/service_revenue')
+    @doctor_required
+    def api_service_revenue():
+        """API για έσοδα ανά υπηρεσία (από τα transaction_lines)"""
+        try:
+            start = datetime.strptime(request.args['date_from'], '%Y-%m-%d').date() if request.args.get('date_from') else None
+            end = datetime.strptime(request.args['date_to'], '%Y-%m-%d').date() + timedelta(days=1) if request.args.get('date_to') else None
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Μη έγκυρη ημερομηνία.'}), 400
+        category = request.args.get('category') or None
+        
+        return jsonify({
+            'services': service_revenue(start, end, category, limit=request.args.get('limit', type=int)),
+            'billed_quantity': billed_quantity(category, start=start, end=end)
+        })
+    
+    @app.route('/api/events')
+    @login_required
+    def api_events():
+        """Server-Sent Events stream (αλλαγές επισκέψεων, νέοι ασθενείς, chat)"""
+        # Το header διαβάζεται εδώ - ο generator τρέχει χωρίς request context
+        return Response(event_stream(request.headers.get('Last-Event-ID')), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # nginx: χωρίς buffering
+        })
     
     # ==================== STEALTH ROUTES (Hidden Features) ====================
     
@@ -0,0 +1,636 @@
+# -*- coding: utf-8 -*-
+"""
+search.py
+Patient search helpers για Dr. PLATI
+"""
+
+import heapq
+import os
+import re
+import threading
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import or_, and_, event, inspect, func, case
+from extensions import db
+from models import Patient, PatientPhone, PatientNameGram, patient_list_options
+from utils import normalize_search_term, normalize_phone, phonetic_key, edit_distance
+from events import on_commit
+from cache import SearchResultCache, TTLCache
+
+
+# ==================== PHONE INDEX ====================
+
+# Patient phone columns που καταγράφονται στο patient_phones
+PHONE_FIELDS = ['phone', 'mobile', 'father_phone', 'mother_phone', 'guardian_phone']
+
+# Ελάχιστα ψηφία για suffix lookup
+MIN_PHONE_DIGITS = 4
+
+
+def _phone_rows(patient_id, values):
+    rows = []
+    for field in PHONE_FIELDS:
+        e164 = normalize_phone(values.get(field))
+        if e164:
+            rows.append({
+                'patient_id': patient_id,
+                'field': field,
+                'e164': e164,
+                'digits_reversed': e164[1:][::-1]
+            })
+    return rows
+
+
+def sync_patient_phones(connection, patient_id, values):
+    """Replace τα patient_phones rows του ασθενή (values: dict με τα phone columns)"""
+    table = PatientPhone.__table__
+    connection.execute(table.delete().where(table.c.patient_id == patient_id))
+    rows = _phone_rows(patient_id, values)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+@event.listens_for(Patient, 'after_insert')
+def _patient_phones_after_insert(mapper, connection, target):
+    sync_patient_phones(connection, target.id, {f: getattr(target, f) for f in PHONE_FIELDS})
+
+
+@event.listens_for(Patient, 'after_update')
+def _patient_phones_after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in PHONE_FIELDS):
+        sync_patient_phones(connection, target.id, {f: getattr(target, f) for f in PHONE_FIELDS})
+
+
+@event.listens_for(Patient, 'before_delete')
+def _patient_phones_before_delete(mapper, connection, target):
+    """Πριν το DELETE του ασθενή, ώστε να μην παραβιάζεται το foreign key (MySQL/InnoDB)"""
+    table = PatientPhone.__table__
+    connection.execute(table.delete().where(table.c.patient_id == target.id))
+
+
+def _reversed_suffix(number):
+    """
+    Αντεστραμμένο suffix για lookup ή None αν είναι πολύ μικρό
+    Πλήρης αριθμός (10+ ψηφία) ταιριάζει ολόκληρο το E.164, αλλιώς μόνο τα ψηφία που δόθηκαν
+    """
+    digits = re.sub(r'[^0-9]', '', str(number or ''))
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    suffix = normalize_phone(number)[1:] if len(digits) >= 10 else digits
+    return suffix[::-1]
+
+
+def phone_lookup_select(number):
+    """
+    SELECT patient_id για αριθμούς που τελειώνουν σε number
+    Suffix match ως prefix LIKE στα αντεστραμμένα ψηφία (idx_patient_phone_reversed)
+    """
+    return db.select(PatientPhone.patient_id).where(
+        PatientPhone.digits_reversed.startswith(_reversed_suffix(number) or '', autoescape=True)
+    )
+
+
+def find_patients_by_phone(number, limit=10):
+    """
+    Caller lookup: ενεργοί ασθενείς με οποιοδήποτε τηλέφωνο (παιδιού ή γονέων)
+    που ταιριάζει στο number. Returns list of (Patient, field)
+    """
+    reversed_suffix = _reversed_suffix(number)
+    if not reversed_suffix:
+        return []
+
+    return db.session.execute(
+        db.select(Patient, PatientPhone.field)
+        .options(patient_list_options())
+        .join(PatientPhone, PatientPhone.patient_id == Patient.id)
+        .where(PatientPhone.digits_reversed.startswith(reversed_suffix, autoescape=True),
+               Patient.is_active == True)
+        .order_by(Patient.last_name, Patient.first_name)
+        .limit(limit)
+    ).all()
+
+
+# ==================== SQL SEARCH ====================
+
+def patient_search_filter(search_query, include_phones=True):
+    """
+    Build SQL filter για patient search
+    Τα ονόματα ψάχνονται με prefix LIKE στα normalized search columns,
+    ώστε να χρησιμοποιούνται τα idx_patient_*_search indexes.
+    Returns None αν ο όρος είναι κενός
+    """
+    search_term = normalize_search_term(search_query)
+    if not search_term:
+        return None
+
+    conditions = []
+
+    # Κάθε λέξη πρέπει να ταιριάζει στην αρχή του ονόματος ή του επωνύμου
+    words = [w for w in search_term.split() if not w.isdigit()]
+    if words:
+        conditions.append(and_(*[
+            or_(
+                Patient.last_name_search.startswith(word, autoescape=True),
+                Patient.first_name_search.startswith(word, autoescape=True)
+            )
+            for word in words
+        ]))
+
+    # Αριθμητικοί όροι: AMKA (prefix) και τηλέφωνα
+    digits = re.sub(r'[^0-9]', '', search_query)
+    if digits:
+        conditions.append(Patient.amka.startswith(digits))
+        if include_phones and len(digits) >= MIN_PHONE_DIGITS:
+            conditions.append(Patient.id.in_(phone_lookup_select(digits)))
+
+    if not conditions:
+        return None
+
+    return or_(*conditions)
+
+
+# ==================== PHONETIC TRIGRAM INDEX ====================
+
+# Trigrams των phonetic keys με '$$' στην αρχή: κάθε γράμμα (και το πρώτο) ανήκει σε
+# 3 grams, οπότε ένα λάθος οπουδήποτε στη λέξη χαλάει το πολύ 3 από αυτά
+GRAM_PAD = '$$'
+
+
+def name_grams(*keys):
+    """Set of trigrams των phonetic keys (len(key) grams ανά key)"""
+    grams = set()
+    for key in keys:
+        if key:
+            padded = GRAM_PAD + key
+            grams.update(padded[i:i + 3] for i in range(len(key)))
+    return grams
+
+
+def sync_patient_name_grams(connection, patient_id, first_name, last_name):
+    """Replace τα patient_name_grams rows του ασθενή"""
+    table = PatientNameGram.__table__
+    connection.execute(table.delete().where(table.c.patient_id == patient_id))
+    grams = name_grams(phonetic_key(first_name), phonetic_key(last_name))
+    if grams:
+        connection.execute(table.insert(), [{'patient_id': patient_id, 'gram': gram} for gram in sorted(grams)])
+
+
+@event.listens_for(Patient, 'after_insert')
+def _patient_name_grams_after_insert(mapper, connection, target):
+    sync_patient_name_grams(connection, target.id, target.first_name, target.last_name)
+
+
+@event.listens_for(Patient, 'after_update')
+def _patient_name_grams_after_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.first_name.history.has_changes() or state.attrs.last_name.history.has_changes():
+        sync_patient_name_grams(connection, target.id, target.first_name, target.last_name)
+
+
+@event.listens_for(Patient, 'before_delete')
+def _patient_name_grams_before_delete(mapper, connection, target):
+    table = PatientNameGram.__table__
+    connection.execute(table.delete().where(table.c.patient_id == target.id))
+
+
+# ==================== FUZZY (GREEKLISH / TYPO) SEARCH ====================
+
+# Μέγιστος αριθμός υποψηφίων (οι πιο όμοιοι πρώτοι) πριν το re-rank
+FUZZY_CANDIDATE_LIMIT = 2000
+
+
+def _allowed_distance(word_key):
+    """Επιτρεπόμενα λάθη ανά λέξη (1 για μικρές λέξεις, +1 ανά 4 γράμματα)"""
+    return max(1, len(word_key) // 4)
+
+
+def _word_distance(word_key, name_key, max_distance=None):
+    """
+    Distance λέξης από όνομα, με prefix matching για autocomplete
+    Με max_distance ο υπολογισμός σταματά μόλις ξεπεραστεί (return max_distance + 1)
+    """
+    if not name_key:
+        return len(word_key)
+    return min(edit_distance(word_key, name_key, max_distance),
+               edit_distance(word_key, name_key[:len(word_key)], max_distance))
+
+
+def fuzzy_candidates_select(word_key, limit=FUZZY_CANDIDATE_LIMIT):
+    """
+    SELECT (patient_id, shared) ενεργών ασθενών με αρκετά κοινά trigrams με τη λέξη
+    Με k επιτρεπόμενα λάθη ένα όνομα (ή prefix του) που ταιριάζει έχει τουλάχιστον
+    len(grams) - 3k κοινά grams. Ταξινόμηση κατά κοινά grams, ώστε αν ξεπεραστεί
+    το limit να μένουν εκτός μόνο οι λιγότερο όμοιοι.
+    """
+    grams = name_grams(word_key)
+    threshold = max(1, len(grams) - 3 * _allowed_distance(word_key))
+    shared = func.count().label('shared')
+    return (
+        db.select(PatientNameGram.patient_id, shared)
+        .join(Patient, Patient.id == PatientNameGram.patient_id)
+        .where(PatientNameGram.gram.in_(sorted(grams)), Patient.is_active == True)
+        .group_by(PatientNameGram.patient_id)
+        .having(func.count() >= threshold)
+        .order_by(shared.desc(), PatientNameGram.patient_id)
+        .limit(limit)
+    )
+
+
+def fuzzy_patient_search(query, limit=10):
+    """
+    Typo-tolerant αναζήτηση σε ελληνικά και Greeklish ονόματα
+    1. Υποψήφιοι από το patient_name_grams (trigrams της μεγαλύτερης λέξης)
+    2. Re-rank με edit distance σε όλες τις λέξεις
+    Returns list of Patient rows (id, first_name, last_name, amka, phone, mobile, date_of_birth)
+    """
+    word_keys = [phonetic_key(word) for word in normalize_search_term(query).split()
+                 if not word.isdigit()]
+    word_keys = [key for key in word_keys if key]
+    if not word_keys:
+        return []
+
+    driver = max(word_keys, key=len)
+    candidate_ids = db.session.execute(fuzzy_candidates_select(driver)).scalars().all()
+    if len(candidate_ids) >= FUZZY_CANDIDATE_LIMIT:
+        current_app.logger.warning(f'Fuzzy search "{query}": candidates truncated at {FUZZY_CANDIDATE_LIMIT}')
+    if not candidate_ids:
+        return []
+
+    candidates = db.session.execute(
+        db.select(Patient.id, Patient.first_name, Patient.last_name, Patient.amka,
+                  Patient.phone, Patient.mobile, Patient.date_of_birth,
+                  Patient.first_name_phonetic, Patient.last_name_phonetic)
+        .where(Patient.id.in_(candidate_ids))
+    ).all()
+
+    scored = []
+    for row in candidates:
+        total = 0
+        for key in word_keys:
+            allowed = _allowed_distance(key)
+            distance = min(_word_distance(key, row.last_name_phonetic, allowed),
+                           _word_distance(key, row.first_name_phonetic, allowed))
+            if distance > allowed:
+                break
+            total += distance
+        else:
+            scored.append((total, row.last_name_phonetic or '', row.first_name_phonetic or '', row.id, row))
+
+    scored.sort(key=lambda item: item[:4])
+    return [item[4] for item in scored[:limit]]
+
+
+# ==================== IN-MEMORY N-GRAM INDEX ====================
+
+# Columns που κρατά το index (narrow projection)
+INDEX_COLUMNS = (Patient.id, Patient.first_name, Patient.last_name, Patient.amka,
+                 Patient.phone, Patient.mobile, Patient.date_of_birth)
+
+# Επικάλυψη (seconds) του delta sync, για commits άλλων workers με updated_at λίγο πριν το τελευταίο stamp
+INDEX_SYNC_OVERLAP = 5
+
+_index_version_cache = TTLCache(maxsize=1, ttl=10)
+
+
+def _index_version():
+    """Version stamp των ασθενών: (MAX(updated_at), πλήθος ενεργών)"""
+    updated_at, active = db.session.execute(
+        db.select(func.max(Patient.updated_at),
+                  func.coalesce(func.sum(case((Patient.is_active == True, 1), else_=0)), 0))
+    ).one()
+    return updated_at, int(active)
+
+
+class PatientNgramIndex:
+    """
+    Per-worker n-gram index για patient autocomplete
+    Κρατά στη μνήμη μόνο τα πεδία που χρειάζονται τα αποτελέσματα
+    (id, ονοματεπώνυμο, AMKA, τηλέφωνο, ημερομηνία γέννησης) και απαντά
+    χωρίς DB round trip με substring matches (π.χ. "opoulos" βρίσκει το
+    "Papadopoulos"). Το DB fallback (patient_search_filter) μένει prefix-only,
+    για να χρησιμοποιεί τα search indexes.
+    Οι αλλαγές του worker εφαρμόζονται από τα commit hooks (events.py), των
+    άλλων workers από το sync() με version stamp (όπως στο catalog.py).
+    Χτίζεται στο background στο πρώτο search κάθε process (και μετά από fork).
+    """
+
+    # Bigrams για queries 2 χαρακτήρων, trigrams για όλα τα υπόλοιπα
+    GRAM_SIZES = (2, 3)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}   # patient_id -> entry dict
+        self._grams = {}     # gram -> set of patient_ids
+        self._backlog = None  # αλλαγές που έγιναν όσο χτίζεται το index
+        self._building = False
+        self._syncing = False
+        self.version = None  # version stamp του τελευταίου build/sync
+        self.ready = False
+
+    def after_fork(self):
+        """Child process: το lock και το build thread του parent δεν ισχύουν πλέον"""
+        self._lock = threading.RLock()
+        self._backlog = None
+        self._building = False
+        self._syncing = False
+
+    @staticmethod
+    def _grams_for(text):
+        grams = set()
+        for size in PatientNgramIndex.GRAM_SIZES:
+            for i in range(len(text) - size + 1):
+                grams.add(text[i:i + size])
+        return grams
+
+    def _remove(self, patient_id):
+        entry = self._entries.pop(patient_id, None)
+        if not entry:
+            return
+        for gram in self._grams_for(entry['haystack']):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(patient_id)
+                if not ids:
+                    del self._grams[gram]
+
+    def _add(self, row):
+        first_name = normalize_search_term(row['first_name'])
+        last_name = normalize_search_term(row['last_name'])
+        haystack = f"{first_name} {last_name} {row['amka'] or ''}"
+        self._entries[row['id']] = {
+            'id': row['id'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'first_name_search': first_name,
+            'last_name_search': last_name,
+            # Κάθε όνομα με ένα κενό μπροστά: ' ' + word in names είναι prefix match
+            'names': f' {last_name} {first_name}',
+            'amka': row['amka'],
+            'phone': row.get('phone') or row.get('mobile'),
+            'date_of_birth': row['date_of_birth'],
+            'haystack': haystack,
+            'sort_key': (last_name, first_name)
+        }
+        for gram in self._grams_for(haystack):
+            self._grams.setdefault(gram, set()).add(row['id'])
+
+    def upsert(self, row):
+        """Add/replace patient (row: dict με τα Patient columns)"""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append(('upsert', row))
+            self._remove(row['id'])
+            if row.get('is_active', True):
+                self._add(row)
+
+    def remove(self, patient_id):
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append(('remove', patient_id))
+            self._remove(patient_id)
+
+    def build(self):
+        """Build index από narrow projection των ενεργών ασθενών"""
+        with self._lock:
+            self._backlog = []
+
+        # Χτίζεται σε ξεχωριστό instance χωρίς lock, ώστε τα searches να συνεχίζουν
+        fresh = PatientNgramIndex()
+        try:
+            # Stamp πριν το scan: αλλαγές άλλων workers κατά το build θα φανούν στο επόμενο sync
+            version = _index_version()
+            rows = db.session.execute(
+                db.select(*INDEX_COLUMNS).where(Patient.is_active == True)
+                .execution_options(yield_per=5000)
+            ).mappings()
+            for row in rows:
+                fresh._add(row)
+        except Exception:
+            with self._lock:
+                self._backlog = None
+            raise
+
+        with self._lock:
+            backlog, self._backlog = self._backlog, None
+            self._entries, self._grams = fresh._entries, fresh._grams
+            # Replay αλλαγών που έγιναν commit κατά τη διάρκεια του build
+            for operation, value in backlog:
+                if operation == 'upsert':
+                    self.upsert(value)
+                else:
+                    self.remove(value)
+            self.version = version
+            self.ready = True
+            return len(self._entries)
+
+    def start_build(self, app):
+        """Build σε background thread (ένα ανά process)"""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+
+        def _build():
+            with app.app_context():
+                try:
+                    count = self.build()
+                    app.logger.info(f'Patient search index ready ({count} patients)')
+                except Exception as e:
+                    app.logger.error(f'Patient search index build failed: {e}')
+                finally:
+                    self._building = False
+
+        threading.Thread(target=_build, name='patient-index-build', daemon=True).start()
+
+    def sync(self):
+        """
+        Αλλαγές άλλων workers: όταν αλλάξει το version stamp φορτώνονται οι ασθενείς
+        με updated_at από το προηγούμενο stamp και μετά. Αν το πλήθος των ενεργών
+        δεν συμφωνεί (διαγραφές) ξαναχτίζεται, με το τρέχον index μέχρι τότε
+        """
+        ttl = current_app.config.get('PATIENT_INDEX_VERSION_TTL', 10)
+        version = _index_version_cache.get_or_set('version', _index_version, ttl)
+        with self._lock:
+            if not self.ready or self._syncing or self._building or version == self.version:
+                return
+            since = self.version[0] if self.version else None
+            self._syncing = True
+
+        try:
+            query = db.select(*INDEX_COLUMNS, Patient.is_active)
+            if since is not None:
+                query = query.where(Patient.updated_at >= since - timedelta(seconds=INDEX_SYNC_OVERLAP))
+            rows = db.session.execute(query).mappings().all()
+
+            with self._lock:
+                for row in rows:
+                    self.upsert(row)
+                consistent = len(self._entries) == version[1]
+                if consistent:
+                    self.version = version
+        finally:
+            self._syncing = False
+
+        if not consistent:
+            self.start_build(current_app._get_current_object())
+
+    @staticmethod
+    def _rank(entry, words, digits):
+        """
+        Κάθε λέξη μέσα στο όνομα ή στο επώνυμο, ή τα ψηφία μέσα στο AMKA
+        Return 0 για prefix match (όπως το patient_search_filter), 1 για substring, None αν δεν ταιριάζει
+        words: (prefix, substring) μορφές κάθε λέξης, βλ. search
+        """
+        names, amka = entry['names'], entry['amka'] or ''
+        if words and all(prefix in names for prefix, _ in words) or digits and amka.startswith(digits):
+            return 0
+        if words and all(word in names for _, word in words) or digits and digits in amka:
+            return 1
+        return None
+
+    def _postings(self, text):
+        """Ids που περιέχουν όλα τα n-grams του text, None αν είναι πολύ μικρό για το index"""
+        if len(text) < 2:
+            return None
+        size = min(len(text), 3)
+        grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+        ids = None
+        # Ξεκινάμε από το μικρότερο posting list
+        for gram in sorted(grams, key=lambda g: len(self._grams.get(g, ()))):
+            postings = self._grams.get(gram)
+            if not postings:
+                return set()
+            ids = set(postings) if ids is None else ids & postings
+            if not ids:
+                break
+        return ids
+
+    def search(self, query, limit=10):
+        """
+        Substring search σε όνομα, επώνυμο και AMKA, πρώτα τα prefix matches
+        Returns list of entry dicts ή None αν το index δεν είναι έτοιμο
+        """
+        if not self.ready:
+            self.start_build(current_app._get_current_object())
+            return None
+        self.sync()
+
+        words = [word for word in normalize_search_term(query).split() if not word.isdigit()]
+        digits = re.sub(r'[^0-9]', '', query)
+        if not words and not digits:
+            return []
+
+        # Λέξεις του ενός χαρακτήρα ταιριάζουν μόνο ως prefix (αλλιώς ταιριάζουν σχεδόν όλοι)
+        forms = [(' ' + word, word if len(word) > 1 else ' ' + word) for word in words]
+
+        with self._lock:
+            # Υποψήφιοι από τα n-grams, επιβεβαίωση με substring στα πεδία
+            candidates = set()
+            if words:
+                name_ids = None
+                for word in words:
+                    ids = self._postings(word)
+                    if ids is not None:
+                        name_ids = ids if name_ids is None else name_ids & ids
+                candidates |= self._entries.keys() if name_ids is None else name_ids
+            if digits:
+                ids = self._postings(digits)
+                candidates |= self._entries.keys() if ids is None else ids
+
+            ranked = []
+            for pid in candidates:
+                entry = self._entries[pid]
+                rank = self._rank(entry, forms, digits)
+                if rank is not None:
+                    ranked.append((rank, entry['sort_key'], pid))
+            best = heapq.nsmallest(limit, ranked)
+            return [self._entries[pid] for _, _, pid in best]
+
+
+patient_index = PatientNgramIndex()
+
+# gunicorn --preload: το index χτίζεται ξανά (ή συνεχίζει) στον worker
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=patient_index.after_fork)
+
+
+@on_commit(Patient)
+def _update_patient_index(changes):
+    """Incremental update του patient_index μετά από commit"""
+    for operation, _, snapshot in changes:
+        if operation == 'delete':
+            patient_index.remove(snapshot['id'])
+        else:
+            patient_index.upsert(snapshot)
+
+
+# ==================== SEARCH RESULT CACHE ====================
+
+search_cache = SearchResultCache()
+
+
+def _term_matcher(snapshots):
+    """
+    Callable(term) που ελέγχει αν κάποιος από τους ασθενείς (νέες τιμές)
+    θα εμφανιζόταν στα αποτελέσματα του όρου: substring στα ονόματα,
+    ψηφία σε AMKA/τηλέφωνα ή typo-tolerant ταίριασμα στα phonetic keys
+    """
+    patients = []
+    for snapshot in snapshots:
+        phones = ' '.join(re.sub(r'[^0-9]', '', snapshot.get(field) or '') for field in PHONE_FIELDS)
+        patients.append({
+            'haystack': (f"{normalize_search_term(snapshot.get('first_name'))} "
+                         f"{normalize_search_term(snapshot.get('last_name'))} "
+                         f"{snapshot.get('amka') or ''} {phones}"),
+            'keys': (phonetic_key(snapshot.get('first_name')), phonetic_key(snapshot.get('last_name')))
+        })
+
+    def _matches(term):
+        words = term.split()
+        digits = re.sub(r'[^0-9]', '', term)
+        word_keys = [phonetic_key(word) for word in words if not word.isdigit()]
+        for patient in patients:
+            if all(word in patient['haystack'] for word in words):
+                return True
+            if digits and digits in patient['haystack']:
+                return True
+            if word_keys and all(
+                    min(_word_distance(key, patient['keys'][0], _allowed_distance(key)),
+                        _word_distance(key, patient['keys'][1], _allowed_distance(key)))
+                    <= _allowed_distance(key)
+                    for key in word_keys if key):
+                return True
+        return False
+
+    return _matches
+
+
+@on_commit(Patient)
+def _invalidate_search_cache(changes):
+    """Write-through invalidation μετά από commit σε ασθενείς (add/edit/delete)"""
+    search_cache.invalidate(
+        [snapshot['id'] for _, _, snapshot in changes],
+        _term_matcher([snapshot for _, _, snapshot in changes])
+    )
+
+
+def init_search_cache(app):
+    """
+    Configure search_cache από τα app settings
+    SEARCH_CACHE_BACKEND = 'flask-caching' χρησιμοποιεί το CACHE_TYPE/CACHE_REDIS_URL
+    (κοινό cache για όλους τους workers), αλλιώς per-process LRU
+    """
+    shared_backend = None
+    if app.config.get('SEARCH_CACHE_BACKEND') == 'flask-caching':
+        try:
+            from flask_caching import Cache
+            shared_backend = Cache(app)
+        except ImportError:
+            app.logger.warning('Flask-Caching not installed, using local search cache')
+
+    search_cache.configure(
+        maxsize=app.config.get('SEARCH_CACHE_SIZE', 512),
+        ttl=app.config.get('SEARCH_CACHE_TTL', 60),
+        shared_backend=shared_backend
+    )
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+sequences.py
+Αρίθμηση τιμολογίων και βεβαιώσεων για το Dr. PLATI
+Κάθε worker δεσμεύει ένα block αριθμών από τον πίνακα number_sequences με
+ένα atomic UPDATE (σε δικό του σύντομο transaction) και τους μοιράζει τοπικά.
+Οι αριθμοί είναι μοναδικοί χωρίς retry, αύξοντες ανά worker και με κενά μόνο
+όταν ένας worker τερματιστεί πριν εξαντλήσει το block του.
+"""
+
+import os
+import threading
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import update
+from extensions import db
+from models import NumberSequence, Transaction, CertificateLog
+
+
+DEFAULT_BLOCK_SIZE = 20
+
+# Μεγαλύτερα suffixes είναι παλιοί τυχαίοι αριθμοί (πριν τα sequences) και δεν
+# χρησιμοποιούνται για seed, ώστε η αρίθμηση να μένει στα 6 ψηφία
+SEED_SUFFIX_LIMIT = 100000
+
+
+def _insert_ignore(connection, values):
+    """INSERT που αγνοείται αν το sequence υπάρχει ήδη (άλλος worker το δημιούργησε)"""
+    table = NumberSequence.__table__
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.execute(table.insert().prefix_with('IGNORE'), [values])
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        connection.execute(insert(table).on_conflict_do_nothing(index_elements=[table.c.name]), [values])
+    else:
+        exists = connection.execute(db.select(table.c.name).where(table.c.name == values['name'])).first()
+        if exists is None:
+            connection.execute(table.insert(), [values])
+
+
+def reserve_block(name, size, seed=None):
+    """
+    Δέσμευση size αριθμών του sequence, return (first, last + 1)
+    Το UPDATE κλειδώνει το row μέχρι το commit του δικού του transaction, οπότε
+    δύο workers δεν παίρνουν ποτέ το ίδιο block. seed(connection) δίνει τον πρώτο
+    αριθμό όταν το sequence δημιουργείται (π.χ. μετά από υπάρχουσες εγγραφές).
+    """
+    table = NumberSequence.__table__
+    increment = update(table).where(table.c.name == name).values(
+        next_value=table.c.next_value + size, updated_at=datetime.utcnow()
+    )
+
+    with db.engine.begin() as connection:
+        if connection.execute(increment).rowcount == 0:
+            start = seed(connection) if seed else 1
+            _insert_ignore(connection, {'name': name, 'next_value': start, 'updated_at': datetime.utcnow()})
+            connection.execute(increment)
+        end = connection.execute(db.select(table.c.next_value).where(table.c.name == name)).scalar()
+    return end - size, end
+
+
+class SequenceAllocator:
+    """
+    Per-process allocator: μοιράζει αριθμούς από το τρέχον block κάθε sequence
+    και δεσμεύει νέο block όταν εξαντληθεί. taken(values) επιστρέφει όσους
+    αριθμούς του block υπάρχουν ήδη (παλιοί τυχαίοι αριθμοί) για να παραλειφθούν.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def next_value(self, name, size=DEFAULT_BLOCK_SIZE, seed=None, taken=None):
+        with self._lock:
+            # Μετά από fork (gunicorn preload) τα blocks ανήκουν στο parent process
+            if os.getpid() != self._pid:
+                self._blocks.clear()
+                self._pid = os.getpid()
+
+            # Ελεύθεροι αριθμοί του block σε φθίνουσα σειρά (pop από το τέλος)
+            values = self._blocks.get(name)
+            while not values:
+                first, end = reserve_block(name, size, seed)
+                used = taken(range(first, end)) if taken else set()
+                values = [value for value in range(end - 1, first - 1, -1) if value not in used]
+                self._blocks[name] = values
+            return values.pop()
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+allocator = SequenceAllocator()
+
+
+def _block_size():
+    if has_app_context():
+        return max(int(current_app.config.get('SEQUENCE_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)), 1)
+    return DEFAULT_BLOCK_SIZE
+
+
+def _seed_after_existing(column, prefix):
+    """
+    Seed: μετά τον μεγαλύτερο αριθμό με το prefix κάτω από SEED_SUFFIX_LIMIT
+    (π.χ. αν χάθηκε το row του sequence). Οι παλιοί τυχαίοι αριθμοί πάνω από το
+    όριο δεν μετακινούν την αρίθμηση - παραλείπονται από το _existing_numbers.
+    """
+    def _seed(connection):
+        numbers = connection.execute(db.select(column).where(column.like(f'{prefix}%'))).scalars()
+        suffixes = [int(number[len(prefix):]) for number in numbers if number[len(prefix):].isdigit()]
+        return max((suffix for suffix in suffixes if suffix < SEED_SUFFIX_LIMIT), default=0) + 1
+    return _seed
+
+
+def _existing_numbers(column, prefix):
+    """Taken: αριθμοί ενός block που υπάρχουν ήδη (ένα IN query στο unique index)"""
+    def _taken(values):
+        numbers = {f"{prefix}{value:06d}": value for value in values}
+        with db.engine.connect() as connection:
+            existing = connection.execute(db.select(column).where(column.in_(list(numbers)))).scalars()
+            return {numbers[number] for number in existing}
+    return _taken
+
+
+# ==================== NUMBERS ====================
+
+def next_invoice_number(today=None):
+    """Αριθμός τιμολογίου YYYYMM-NNNNNN (sequence ανά μήνα)"""
+    today = today or datetime.now()
+    prefix = f"{today.year}{today.month:02d}-"
+    value = allocator.next_value(f'invoice:{today.year}{today.month:02d}', _block_size(),
+                                 _seed_after_existing(Transaction.invoice_number, prefix),
+                                 _existing_numbers(Transaction.invoice_number, prefix))
+    return f"{prefix}{value:06d}"
+
+
+def next_certificate_number(today=None):
+    """Αριθμός βεβαίωσης CERT-YYYY-NNNNNN (sequence ανά έτος)"""
+    today = today or datetime.now()
+    prefix = f"CERT-{today.year}-"
+    value = allocator.next_value(f'certificate:{today.year}', _block_size(),
+                                 _seed_after_existing(CertificateLog.certificate_number, prefix),
+                                 _existing_numbers(CertificateLog.certificate_number, prefix))
+    return f"{prefix}{value:06d}"
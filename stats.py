@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+stats.py
+Statistics service για dashboard και admin panel του Dr. PLATI
+Όλοι οι μετρητές μιας σελίδας υπολογίζονται σε ένα SELECT με scalar
+subqueries και κρατιούνται σε κοινό (ανά worker) cache με μικρό TTL.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func, literal_column
+from extensions import db
+from models import User, Patient, Visit, Transaction
+from cache import TTLCache
+from counters import counter_sum_select
+from accounts import outstanding_balance_select
+from utils import day_range, month_range, format_file_size
+
+
+# Κοινό για όλους τους χρήστες του worker
+_stats_cache = TTLCache(maxsize=16, ttl=30)
+
+
+def _count(model, *conditions):
+    """Scalar subquery COUNT(*) για model με προαιρετικά φίλτρα"""
+    return db.select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+
+def _database_size():
+    """Scalar subquery με το μέγεθος της βάσης σε bytes (None αν δεν υποστηρίζεται)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        return literal_column(
+            "(SELECT COALESCE(SUM(data_length + index_length), 0) "
+            "FROM information_schema.TABLES WHERE table_schema = DATABASE())"
+        )
+    if dialect == 'sqlite':
+        return literal_column("(SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size())")
+    return None
+
+
+def _cached(key, factory):
+    ttl = current_app.config.get('STATS_CACHE_TTL', 30)
+    return dict(_stats_cache.get_or_set(key, factory, ttl))
+
+
+def dashboard_stats(today=None):
+    """Μετρητές του dashboard σε ένα round trip"""
+    today = today or date.today()
+
+    def _compute():
+        month_start, next_month = month_range(today)
+
+        if current_app.config.get('USE_DAILY_COUNTERS', True):
+            # Λίγα rows από τον πίνακα daily_counters
+            visits_today = counter_sum_select(
+                'visits', start=today, end=today + timedelta(days=1)
+            ).scalar_subquery()
+            visits_this_month = counter_sum_select(
+                'visits', start=month_start, end=next_month
+            ).scalar_subquery()
+            pending_transactions = counter_sum_select('pending_transactions').scalar_subquery()
+        else:
+            # Half-open ranges ώστε να χρησιμοποιείται το idx_visit_date
+            day_start, day_end = day_range(today)
+            visits_today = _count(Visit, Visit.visit_date >= day_start, Visit.visit_date < day_end)
+            visits_this_month = _count(
+                Visit,
+                Visit.visit_date >= datetime.combine(month_start, datetime.min.time()),
+                Visit.visit_date < datetime.combine(next_month, datetime.min.time())
+            )
+            pending_transactions = _count(Transaction, Transaction.payment_status == 'pending')
+
+        row = db.session.execute(db.select(
+            _count(Patient, Patient.is_active == True).label('total_patients'),
+            visits_today.label('visits_today'),
+            visits_this_month.label('visits_this_month'),
+            pending_transactions.label('pending_transactions'),
+            outstanding_balance_select().scalar_subquery().label('outstanding_balance')
+        )).one()
+        stats = {key: int(value or 0) for key, value in row._mapping.items() if key != 'outstanding_balance'}
+        stats['outstanding_balance'] = Decimal(str(row.outstanding_balance or 0))
+        return stats
+
+    return _cached(('dashboard', today), _compute)
+
+
+def admin_stats():
+    """Μετρητές του admin panel και μέγεθος βάσης σε ένα round trip"""
+    def _compute():
+        columns = [
+            _count(User).label('total_users'),
+            _count(Patient, Patient.is_active == True).label('total_patients'),
+            _count(Visit).label('total_visits'),
+            _count(Transaction).label('total_transactions')
+        ]
+        database_size = _database_size()
+        if database_size is not None:
+            columns.append(database_size.label('database_size'))
+
+        row = dict(db.session.execute(db.select(*columns)).one()._mapping)
+        size = row.pop('database_size', None)
+
+        stats = {key: int(value or 0) for key, value in row.items()}
+        stats['database_size'] = format_file_size(size) if size is not None else '---'
+        return stats
+
+    return _cached('admin', _compute)
+
+
+def clear_stats_cache():
+    """Καθαρισμός του cache (π.χ. μετά από import ή restore)"""
+    _stats_cache.clear()
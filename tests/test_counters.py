@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_counters.py
+Ημερήσιοι μετρητές (daily_counters): μετά από INSERT/UPDATE/DELETE πρέπει να
+είναι ίδιοι με ένα rebuild από τα raw δεδομένα
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import TestingConfig
+from extensions import db
+from models import User, Patient, Visit, Transaction, DailyCounter
+from counters import counter_sum, rebuild_counters
+
+
+@pytest.fixture
+def app():
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def doctors(app):
+    doctors = []
+    for username in ('doctor', 'locum'):
+        doctor = User(username=username, email=f'{username}@example.com', first_name='Νίκος', last_name='Πλατής',
+                      role='doctor', password2='second')
+        doctor.set_password('first')
+        doctors.append(doctor)
+    db.session.add_all(doctors)
+    db.session.commit()
+    return doctors
+
+
+@pytest.fixture
+def patient(app):
+    patient = Patient(first_name='Γιάννης', last_name='Παπαδόπουλος', date_of_birth=date(2020, 1, 1),
+                      gender='M', amka='01012000001')
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+def _counters():
+    return sorted(
+        (row.day, row.metric, row.dimension, row.value)
+        for row in db.session.execute(db.select(DailyCounter).where(DailyCounter.value != 0)).scalars()
+    )
+
+
+def test_counters_follow_updates_and_deletes(doctors, patient):
+    doctor, locum = doctors
+    day = datetime(2026, 3, 2, 10, 30)
+    visits = [Visit(patient_id=patient.id, doctor_id=doctor.id, visit_date=day + timedelta(hours=hour),
+                    visit_type='sick') for hour in range(3)]
+    transactions = [Transaction(patient_id=patient.id, created_by=doctor.id, invoice_number=f'INV-{index}',
+                                transaction_date=day.date(), subtotal=Decimal('40'), total_amount=Decimal('40'),
+                                payment_method='cash', payment_status='pending') for index in range(2)]
+    db.session.add_all(visits + transactions)
+    db.session.commit()
+    assert counter_sum('visits', start=day.date(), end=day.date() + timedelta(days=1)) == 3
+    assert counter_sum('pending_transactions') == 2
+
+    # Αλλαγή τύπου, γιατρού και ημέρας, διαγραφή, εξόφληση
+    visits[0].visit_type = 'followup'
+    visits[1].doctor_id = locum.id
+    visits[1].visit_date = day - timedelta(days=10)
+    db.session.delete(visits[2])
+    transactions[0].payment_status = 'paid'
+    db.session.commit()
+
+    assert counter_sum('visits', start=day.date(), end=day.date() + timedelta(days=1)) == 1
+    assert counter_sum('visits', 'type:sick') == 1
+    assert counter_sum('visits', 'type:followup') == 1
+    assert counter_sum('visits', f'doctor:{locum.id}', end=day.date()) == 1
+    assert counter_sum('pending_transactions') == 1
+
+    incremental = _counters()
+    rebuild_counters()
+    assert incremental == _counters()
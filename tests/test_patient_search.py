@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_patient_search.py
+Αναζήτηση ασθενών: in-memory n-gram index (substring matches)
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import TestingConfig
+from extensions import db
+from models import Patient
+from search import patient_index, _index_version_cache
+
+
+@pytest.fixture
+def app():
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def patients(app):
+    patients = [
+        Patient(first_name='Γιάννης', last_name='Παπαδόπουλος', date_of_birth=date(2020, 1, 1), gender='M',
+                amka='01012000001'),
+        Patient(first_name='Opoulos', last_name='Nikolaou', date_of_birth=date(2019, 5, 3), gender='M',
+                amka='03051900002'),
+        Patient(first_name='Maria', last_name='Papadopoulos', date_of_birth=date(2018, 2, 2), gender='F',
+                amka='02021800003'),
+        Patient(first_name='Ελένη', last_name='Γεωργίου', date_of_birth=date(2021, 7, 7), gender='F',
+                amka='07072100004'),
+    ]
+    db.session.add_all(patients)
+    db.session.commit()
+    return patients
+
+
+@pytest.fixture
+def index(patients):
+    _index_version_cache.delete('version')
+    patient_index.build()
+    return patient_index
+
+
+def _names(matches):
+    return [f"{match['first_name']} {match['last_name']}" for match in matches]
+
+
+def test_index_matches_substrings_of_names(index):
+    # Πρώτα τα prefix matches
+    assert _names(index.search('opoulos')) == ['Opoulos Nikolaou', 'Maria Papadopoulos']
+    assert _names(index.search('δοπουλ')) == ['Γιάννης Παπαδόπουλος']
+    assert _names(index.search('ωργ ελ')) == ['Ελένη Γεωργίου']
+
+
+def test_index_matches_substrings_of_amka(index):
+    assert _names(index.search('1800003')) == ['Maria Papadopoulos']
+    assert index.search('99999') == []
+
+
+def test_index_follows_edits_and_soft_deletes(index, patients):
+    giannis, _, maria, _ = patients
+    giannis.last_name = 'Ιωάννου'
+    maria.is_active = False
+    db.session.commit()
+
+    assert _names(index.search('opoulos')) == ['Opoulos Nikolaou']
+    assert _names(index.search('ωάνν')) == ['Γιάννης Ιωάννου']
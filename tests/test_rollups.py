@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_rollups.py
+Incremental refresh των report rollups: μετά από UPDATE, αλλαγή ημερομηνίας
+και DELETE τα rollups πρέπει να είναι ίδια με ένα πλήρες rebuild
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import TestingConfig
+from extensions import db
+from models import User, Patient, Visit, Transaction, ReportRollup
+from reports import rebuild_rollups, refresh_rollups
+
+
+@pytest.fixture
+def app():
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def records(app):
+    doctor = User(username='doctor', email='doctor@example.com', first_name='Νίκος', last_name='Πλατής',
+                  role='doctor', password2='second')
+    doctor.set_password('first')
+    patient = Patient(first_name='Γιάννης', last_name='Παπαδόπουλος', date_of_birth=date(2020, 1, 1),
+                      gender='M', amka='01012000001')
+    db.session.add_all([doctor, patient])
+    db.session.flush()
+
+    today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+    visits = [Visit(patient_id=patient.id, doctor_id=doctor.id, visit_date=today - timedelta(days=offset),
+                    visit_type=visit_type)
+              for offset, visit_type in ((0, 'checkup'), (10, 'sick'), (10, 'checkup'), (20, 'emergency'))]
+    transactions = [Transaction(patient_id=patient.id, created_by=doctor.id, invoice_number=f'INV-{offset}',
+                                transaction_date=today.date() - timedelta(days=offset), subtotal=Decimal('40'),
+                                total_amount=Decimal('40'), payment_method='cash', payment_status='paid')
+                    for offset in (0, 15)]
+    db.session.add_all(visits + transactions)
+    db.session.commit()
+    return visits, transactions
+
+
+def _rollups():
+    return sorted(
+        (row.day, row.metric, row.dimension, row.count, Decimal(row.amount))
+        for row in db.session.execute(db.select(ReportRollup)).scalars()
+    )
+
+
+def test_refresh_matches_rebuild_after_update_and_delete(records):
+    visits, transactions = records
+    rebuild_rollups()
+
+    # DELETE 10 ημέρες πίσω, μετακίνηση επίσκεψης και συναλλαγής σε παλιότερη ημέρα, UPDATE τύπου
+    db.session.delete(visits[1])
+    visits[2].visit_date -= timedelta(days=30)
+    visits[3].visit_type = 'followup'
+    transactions[1].transaction_date -= timedelta(days=40)
+    db.session.commit()
+
+    refresh_rollups()
+    refreshed = _rollups()
+    rebuild_rollups()
+    assert refreshed == _rollups()
+
+    old_day = visits[2].visit_date.date() + timedelta(days=30)
+    assert not [row for row in refreshed if row[0] == old_day and row[1] == 'visits']
+    assert not [row for row in refreshed if row[0] == transactions[1].transaction_date + timedelta(days=40)]
+
+
+def test_refresh_after_refresh_keeps_deleted_day_empty(records):
+    visits, _ = records
+    rebuild_rollups()
+    deleted_day = visits[3].visit_date.date()
+
+    db.session.delete(visits[3])
+    db.session.commit()
+    refresh_rollups()
+    refresh_rollups()
+
+    assert not db.session.execute(
+        db.select(ReportRollup).where(ReportRollup.day == deleted_day, ReportRollup.metric == 'visits')
+    ).scalars().all()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_search_cache.py
+Cache αποτελεσμάτων αναζήτησης ασθενών: invalidation από τα commit hooks
+όταν προστίθεται, αλλάζει ή διαγράφεται ασθενής
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import TestingConfig
+from extensions import db
+from models import Patient
+from search import search_cache
+from utils import normalize_search_term
+
+
+@pytest.fixture
+def app():
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        search_cache.configure(maxsize=64, ttl=60, shared_backend=None)
+        yield app
+        search_cache.clear()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def patient(app):
+    patient = Patient(first_name='Γιάννης', last_name='Παπαδόπουλος', date_of_birth=date(2020, 1, 1),
+                      gender='M', amka='01012000001')
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+def _cache(term, patients):
+    term = normalize_search_term(term)
+    search_cache.set('api', term, [{'id': patient.id} for patient in patients], [patient.id for patient in patients])
+    return term
+
+
+def test_new_matching_patient_invalidates_term(patient):
+    papa = _cache('Παπα', [patient])
+    other = _cache('Γεωργ', [])
+
+    db.session.add(Patient(first_name='Μαρία', last_name='Παπαδάκη', date_of_birth=date(2019, 1, 1),
+                           gender='F', amka='01011900002'))
+    db.session.commit()
+
+    assert search_cache.get('api', papa) is None
+    assert search_cache.get('api', other) == []
+
+
+def test_edit_invalidates_old_and_new_terms(patient):
+    old = _cache('Παπαδ', [patient])
+    new = _cache('Ιωάνν', [])
+    other = _cache('Γεωργ', [])
+
+    patient.last_name = 'Ιωάννου'
+    db.session.commit()
+
+    assert search_cache.get('api', old) is None
+    assert search_cache.get('api', new) is None
+    assert search_cache.get('api', other) == []
+
+
+def test_soft_and_hard_delete_invalidate_cached_results(patient):
+    term = _cache('Παπαδ', [patient])
+    patient.is_active = False
+    db.session.commit()
+    assert search_cache.get('api', term) is None
+
+    term = _cache('Παπαδ', [patient])
+    db.session.delete(patient)
+    db.session.commit()
+    assert search_cache.get('api', term) is None
+
+
+def test_amka_digits_invalidate_numeric_terms(patient):
+    term = _cache('0101190', [])
+    db.session.add(Patient(first_name='Μαρία', last_name='Νικολάου', date_of_birth=date(2019, 1, 1),
+                           gender='F', amka='01011900002'))
+    db.session.commit()
+    assert search_cache.get('api', term) is None
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_sequences.py
+Αρίθμηση τιμολογίων από block-reserved sequences: μοναδικοί αριθμοί όταν
+πολλοί workers (allocators) και threads δεσμεύουν ταυτόχρονα
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import TestingConfig
+from extensions import db
+import sequences
+from sequences import SequenceAllocator, next_invoice_number
+
+THREADS = 8
+NUMBERS_PER_THREAD = 30
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    # Αρχείο αντί για :memory:, ώστε όλα τα threads να βλέπουν την ίδια βάση
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'sequences.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    app.config['SEQUENCE_BLOCK_SIZE'] = 5
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _run_threads(app, target):
+    results, errors = [], []
+    barrier = threading.Barrier(THREADS)
+
+    def _worker(index):
+        with app.app_context():
+            try:
+                barrier.wait()
+                numbers = [target(index) for _ in range(NUMBERS_PER_THREAD)]
+                results.extend(numbers)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=_worker, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    return results
+
+
+def test_blocks_are_unique_across_workers(app):
+    # Ένας allocator ανά thread: όπως ξεχωριστά worker processes
+    allocators = [SequenceAllocator() for _ in range(THREADS)]
+    numbers = _run_threads(app, lambda index: allocators[index].next_value('invoice:test', 5))
+
+    assert len(numbers) == THREADS * NUMBERS_PER_THREAD
+    assert len(set(numbers)) == len(numbers)
+    assert sorted(numbers) == list(range(1, len(numbers) + 1))
+
+
+def test_invoice_numbers_are_unique_within_a_worker(app):
+    sequences.allocator.reset()
+    today = datetime(2026, 3, 2)
+    numbers = _run_threads(app, lambda index: next_invoice_number(today))
+
+    assert len(set(numbers)) == THREADS * NUMBERS_PER_THREAD
+    assert all(number.startswith('202603-') and len(number) == 13 for number in numbers)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_vaccination.py
+Εμβολιαστική κάλυψη: μέτρηση δόσεων στη βάση και ίδιο αποτέλεσμα με και
+χωρίς NumPy
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import vaccination
+from config import TestingConfig
+from extensions import db
+from models import User, Patient, Vaccine
+from reports import AGE_GROUPS
+
+TODAY = date(2026, 10, 1)
+
+
+@pytest.fixture
+def app():
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def patients(app):
+    nurse = User(username='nurse', email='nurse@example.com', first_name='Μαρία', last_name='Νικολάου',
+                 role='doctor', password2='second')
+    nurse.set_password('first')
+    # 14 μηνών: οφείλει 3 δόσεις Hexavalent/Pneumococcal και 2 Rotavirus
+    complete = Patient(first_name='Άννα', last_name='Α', date_of_birth=date(2025, 8, 1), gender='F',
+                       amka='01082500001')
+    partial = Patient(first_name='Νίκος', last_name='Β', date_of_birth=date(2025, 8, 1), gender='M',
+                      amka='01082500002')
+    db.session.add_all([nurse, complete, partial])
+    db.session.flush()
+
+    def dose(patient, vaccine_type, number):
+        return Vaccine(patient_id=patient.id, administered_by=nurse.id, vaccine_name=vaccine_type,
+                       vaccine_type=vaccine_type, dose_number=number, date_administered=date(2026, 1, 1))
+
+    db.session.add_all(
+        [dose(complete, name, number) for name in ('Hexavalent', 'Pneumococcal') for number in (1, 2, 3)]
+        + [dose(complete, 'Rotavirus', None), dose(complete, 'Rotavirus', None)]
+        # Διπλή καταχώρηση της δόσης 2 μετράει μία φορά
+        + [dose(partial, 'Hexavalent', number) for number in (1, 2, 2)]
+        + [dose(partial, name, number) for name in ('Pneumococcal', 'Rotavirus') for number in (1, 2, 3)][:5]
+    )
+    db.session.commit()
+    return complete, partial
+
+
+def test_load_doses_counts_unique_numbers_and_unnumbered_records(patients):
+    complete, partial = patients
+    types = list(vaccination.DEFAULT_SCHEDULE)
+    rows = vaccination._load_doses(TODAY, types)
+
+    counts = {row[0]: dict(zip(types, vaccination._unpack_row(row, len(types)))) for row in rows}
+    assert [row[0] for row in rows] == sorted([complete.id, partial.id])
+    assert counts[complete.id]['Rotavirus'] == 2
+    assert counts[partial.id]['Hexavalent'] == 2
+    assert counts[partial.id]['Rotavirus'] == 2
+
+
+def test_coverage_is_the_same_with_and_without_numpy(patients, monkeypatch):
+    with_numpy = vaccination.vaccination_coverage(AGE_GROUPS, TODAY)
+    assert with_numpy['1-3']['total'] == 2
+    assert with_numpy['1-3']['vaccinated'] == 1
+    assert with_numpy['1-3']['by_vaccine']['Hexavalent'] == 50.0
+
+    monkeypatch.setattr(vaccination, 'np', None)
+    assert vaccination.vaccination_coverage(AGE_GROUPS, TODAY) == with_numpy
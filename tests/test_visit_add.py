@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_visit_add.py
+Καταχώρηση επίσκεψης από τη φόρμα visit_add: πεδία του Visit και
+διαγνώσεις ICD-10 (visit_diagnoses)
+"""
+
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import TestingConfig
+from extensions import db
+from models import User, Patient, Visit, VisitDiagnosis
+from routes import register_routes
+
+
+@pytest.fixture
+def app():
+    app = Flask('drplati', template_folder=ROOT)
+    app.config.from_object(TestingConfig)
+    app.config['JOBS_EAGER'] = True
+    db.init_app(app)
+
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    register_routes(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def doctor(app):
+    user = User(username='doctor', email='doctor@example.com', first_name='Νίκος', last_name='Πλατής',
+                role='doctor', password2='second')
+    user.set_password('first')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def patient(app):
+    patient = Patient(first_name='Γιάννης', last_name='Παπαδόπουλος', date_of_birth=date(2020, 1, 1),
+                      gender='M', amka='01012000001')
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+@pytest.fixture
+def client(app, doctor):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(doctor.id)
+        session['_fresh'] = True
+    return client
+
+
+def test_visit_add_stores_visit_fields_and_diagnoses(client, patient):
+    patient_id = patient.id
+    response = client.post(f'/visits/add/{patient_id}', data={
+        'visit_date': '2026-03-02T10:30',
+        'visit_type': 'sick',
+        'chief_complaint': 'Πυρετός και ωταλγία',
+        'weight': '14.5',
+        'heent': 'Ερυθρό, διογκωμένο δεξί τύμπανο',
+        'abdominal': 'Μαλακή, ανώδυνη',
+        'genitourinary': 'Κ.Φ.',
+        'treatment_plan': 'Αμοξυκιλλίνη 10 ημέρες',
+        'instructions': 'Αντιπυρετικά επί πυρετού',
+        'follow_up_date': '2026-03-12',
+        'follow_up_instructions': 'Επανέλεγχος τυμπάνων',
+        'notes': 'Παρακολουθεί παιδικό σταθμό',
+        'diagnosis': 'Οξεία μέση ωτίτιδα (H66.9)',
+        'icd10_codes': 'H66.9, j069',
+    })
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/patients/{patient_id}')
+
+    visit = db.session.execute(db.select(Visit)).scalar_one()
+    assert visit.patient_id == patient_id
+    assert visit.head_neck == 'Ερυθρό, διογκωμένο δεξί τύμπανο'
+    assert visit.abdomen == 'Μαλακή, ανώδυνη'
+    assert visit.plan == 'Αμοξυκιλλίνη 10 ημέρες'
+    assert visit.recommendations == 'Αντιπυρετικά επί πυρετού'
+    assert visit.follow_up == 'Επανέλεγχος τυμπάνων'
+    assert visit.next_visit_date == date(2026, 3, 12)
+    assert visit.notes == 'Παρακολουθεί παιδικό σταθμό\nΟυρογεννητικό: Κ.Φ.'
+    assert visit.weight == 14.5
+
+    diagnoses = db.session.execute(
+        db.select(VisitDiagnosis).order_by(VisitDiagnosis.position)
+    ).scalars().all()
+    assert [(diagnosis.code, diagnosis.is_primary) for diagnosis in diagnoses] == [('H66.9', True), ('J06.9', False)]
+    assert diagnoses[0].description == 'Οξεία μέση ωτίτιδα'
+    assert diagnoses[1].description is None
+    assert all(diagnosis.visit_id == visit.id for diagnosis in diagnoses)
+    assert all(diagnosis.visit_date == datetime(2026, 3, 2, 10, 30) for diagnosis in diagnoses)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+transaction_lines.py
+Γραμμές συναλλαγών (transaction_lines) για το Dr. PLATI
+Κάθε υπηρεσία μιας συναλλαγής αποθηκεύεται ως row, ώστε ερωτήματα τύπου
+"έσοδα ανά υπηρεσία" ή "πόσοι εμβολιασμοί χρεώθηκαν" να γίνονται με GROUP BY
+στο idx_transaction_line_service αντί για deserialize κάθε services_json.
+"""
+
+import json
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import event, inspect, func, desc
+from extensions import db
+from models import Transaction, TransactionLine, Service
+
+
+CENT = Decimal('0.01')
+
+
+def _decimal(value, default='0'):
+    try:
+        return Decimal(str(value if value not in (None, '') else default))
+    except (InvalidOperation, ValueError):
+        return Decimal(default)
+
+
+def line_values(service, position=0, service_ids=None):
+    """
+    Dict τιμών ενός TransactionLine από ένα service του JSON
+    Δέχεται service_id/id, name/description, quantity, price/unit_price,
+    discount, tax_rate, tax_amount. service_ids: name.lower() -> id για
+    εγγραφές χωρίς service_id.
+    """
+    name = service.get('name') or service.get('description')
+    service_id = service.get('service_id') or service.get('id')
+    if not service_id and name and service_ids:
+        service_id = service_ids.get(name.strip().lower())
+
+    try:
+        quantity = max(int(service.get('quantity') or 1), 1)
+    except (TypeError, ValueError):
+        quantity = 1
+    unit_price = _decimal(service.get('price', service.get('unit_price'))).quantize(CENT)
+    discount = _decimal(service.get('discount')).quantize(CENT)
+    tax_rate = _decimal(service.get('tax_rate'))
+    net_amount = quantity * unit_price - discount
+
+    if service.get('tax_amount') not in (None, ''):
+        tax_amount = _decimal(service.get('tax_amount')).quantize(CENT)
+    else:
+        tax_amount = (net_amount * tax_rate).quantize(CENT)
+
+    return {
+        'service_id': int(service_id) if service_id else None,
+        'position': position,
+        'description': (name or '')[:150] or None,
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'discount': discount,
+        'tax_rate': tax_rate,
+        'tax_amount': tax_amount,
+        'line_total': net_amount + tax_amount
+    }
+
+
+def build_lines(services, transaction_date):
+    """TransactionLine objects από τη λίστα services του billing form"""
+    lines = []
+    for position, service in enumerate(services or []):
+        if isinstance(service, dict):
+            lines.append(TransactionLine(transaction_date=transaction_date, **line_values(service, position)))
+    return lines
+
+
+def services_json(lines):
+    """services_json (compatibility με παλιούς readers) από τα lines"""
+    return json.dumps([line.to_dict() for line in lines], ensure_ascii=False)
+
+
+# ==================== SYNC ====================
+
+@event.listens_for(Transaction, 'after_update')
+def _sync_line_dates(mapper, connection, target):
+    """Αλλαγή ημερομηνίας συναλλαγής: ενημέρωση του αντιγράφου στα lines"""
+    if not inspect(target).attrs.transaction_date.history.has_changes():
+        return
+    table = TransactionLine.__table__
+    connection.execute(
+        table.update().where(table.c.transaction_id == target.id).values(transaction_date=target.transaction_date)
+    )
+
+
+# ==================== QUERIES ====================
+
+def _line_filters(query, start=None, end=None, category=None):
+    """Κοινά φίλτρα: μη ακυρωμένες συναλλαγές, [start, end) σε transaction_date, κατηγορία"""
+    query = query.join(Transaction, Transaction.id == TransactionLine.transaction_id).where(
+        Transaction.payment_status != 'cancelled'
+    )
+    if start is not None:
+        query = query.where(TransactionLine.transaction_date >= start)
+    if end is not None:
+        query = query.where(TransactionLine.transaction_date < end)
+    if category:
+        query = query.where(Service.category == category)
+    return query
+
+
+def service_revenue_select(start=None, end=None, category=None):
+    """SELECT εσόδων ανά υπηρεσία (ποσότητα, έσοδα με/χωρίς ΦΠΑ, πλήθος συναλλαγών)"""
+    name = func.coalesce(Service.name, TransactionLine.description)
+    revenue = func.sum(TransactionLine.line_total)
+    query = db.select(
+        TransactionLine.service_id,
+        name.label('name'),
+        Service.category,
+        func.sum(TransactionLine.quantity).label('quantity'),
+        func.sum(TransactionLine.line_total - TransactionLine.tax_amount).label('net_revenue'),
+        revenue.label('revenue'),
+        func.count(func.distinct(TransactionLine.transaction_id)).label('transactions')
+    ).select_from(TransactionLine).outerjoin(Service, Service.id == TransactionLine.service_id)
+
+    return _line_filters(query, start, end, category).group_by(
+        TransactionLine.service_id, name, Service.category
+    ).order_by(desc(revenue))
+
+
+def service_revenue(start=None, end=None, category=None, limit=None):
+    """Έσοδα ανά υπηρεσία ως list of dicts (float amounts για JSON)"""
+    query = service_revenue_select(start, end, category)
+    if limit:
+        query = query.limit(limit)
+    return [{
+        'service_id': row.service_id,
+        'name': row.name,
+        'category': row.category,
+        'quantity': int(row.quantity or 0),
+        'net_revenue': float(row.net_revenue or 0),
+        'revenue': float(row.revenue or 0),
+        'transactions': row.transactions
+    } for row in db.session.execute(query)]
+
+
+def billed_quantity(category=None, service_id=None, start=None, end=None):
+    """Πλήθος χρεωμένων υπηρεσιών (π.χ. category='vaccination' για εμβολιασμούς)"""
+    query = db.select(func.coalesce(func.sum(TransactionLine.quantity), 0)).select_from(TransactionLine)
+    if category:
+        query = query.join(Service, Service.id == TransactionLine.service_id)
+    if service_id is not None:
+        query = query.where(TransactionLine.service_id == service_id)
+    return int(db.session.execute(_line_filters(query, start, end, category)).scalar())
+
+
+# ==================== BACKFILL ====================
+
+def backfill_lines(rows, service_ids):
+    """
+    Insert lines για rows (id, transaction_date, services_json) που δεν έχουν ακόμα lines
+    Return πλήθος lines
+    """
+    values = []
+    for row in rows:
+        try:
+            services = json.loads(row.services_json) if row.services_json else []
+        except ValueError:
+            continue
+        if isinstance(services, dict):
+            services = [services]
+        for position, service in enumerate(services if isinstance(services, list) else []):
+            if isinstance(service, dict):
+                values.append(dict(line_values(service, position, service_ids),
+                                   transaction_id=row.id, transaction_date=row.transaction_date))
+
+    if values:
+        db.session.execute(TransactionLine.__table__.insert(), values)
+    return len(values)
+
+
+def service_name_index():
+    """name.lower() -> service id (για JSON εγγραφές χωρίς service_id)"""
+    return {name.strip().lower(): service_id
+            for service_id, name in db.session.execute(db.select(Service.id, Service.name)) if name}
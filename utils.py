@@ -5,13 +5,21 @@ Utility functions για Dr. PLATI
 """
 
 import re
+import calendar
 import secrets
-import string
 from datetime import datetime, date, timedelta
+from functools import lru_cache
+from flask import g, has_request_context
 from cryptography.fernet import Fernet
 import base64
 import hashlib
 import json
+from unidecode import unidecode
+
+try:
+    import numpy as np
+except ImportError:  # requirements-simple.txt: batch ages χωρίς NumPy
+    np = None
 
 
 def validate_amka(amka):
@@ -84,82 +92,162 @@ def validate_phone(phone):
     return False, "Μη έγκυρο τηλέφωνο (πρέπει να είναι ελληνικό)"
 
 
-def calculate_age(birth_date):
+def normalize_phone(phone, default_country_code='30'):
     """
-    Calculate age from birth date
-    Returns dict with years, months, days
+    Normalize phone σε E.164 μορφή (π.χ. '+302101234567')
+    Αριθμοί χωρίς κωδικό χώρας θεωρούνται ελληνικοί.
+    Returns None αν δεν υπάρχουν ψηφία
     """
-    if not isinstance(birth_date, date):
+    if not phone:
         return None
     
-    today = date.today()
-    
-    years = today.year - birth_date.year
-    months = today.month - birth_date.month
-    days = today.day - birth_date.day
+    phone = str(phone).strip()
+    digits = re.sub(r'[^0-9]', '', phone)
+    if not digits:
+        return None
     
-    # Adjust for negative days
-    if days < 0:
+    if phone.startswith('+'):
+        return f"+{digits}"
+    if digits.startswith('00'):
+        return f"+{digits[2:]}"
+    if digits.startswith(default_country_code) and len(digits) == 10 + len(default_country_code):
+        return f"+{digits}"
+    return f"+{default_country_code}{digits}"
+
+
+def request_today():
+    """
+    Η σημερινή ημερομηνία, σταθερή για όλο το request
+    (ίδιο "σήμερα" για όλες τις γραμμές μιας σελίδας και κοινό cache key)
+    """
+    if has_request_context():
+        if 'today' not in g:
+            g.today = date.today()
+        return g.today
+    return date.today()
+
+
+def _add_months(day, months):
+    """day + months, με clamp στην τελευταία ημέρα του μήνα (π.χ. 31/01 + 1 -> 28/02)"""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+@lru_cache(maxsize=8192)
+def _age_parts(birth_date, today):
+    """(years, months, days, total_days) - memoized σε (birth_date, today)"""
+    months = (today.year - birth_date.year) * 12 + today.month - birth_date.month
+    anchor = _add_months(birth_date, months)
+    if anchor > today:
         months -= 1
-        # Get days in previous month
-        if today.month == 1:
-            prev_month = 12
-            prev_year = today.year - 1
-        else:
-            prev_month = today.month - 1
-            prev_year = today.year
-        
-        # Simple calculation - assume 30 days per month for simplicity
-        days += 30
-    
-    # Adjust for negative months
-    if months < 0:
-        years -= 1
-        months += 12
+        anchor = _add_months(birth_date, months)
+    return months // 12, months % 12, (today - anchor).days, (today - birth_date).days
+
+
+def calculate_age(birth_date, today=None):
+    """
+    Calculate age from birth date
+    Returns dict with years, months, days (ακριβείς ημέρες μήνα, όχι 30)
+    """
+    if not isinstance(birth_date, date):
+        return None
+    if isinstance(birth_date, datetime):
+        birth_date = birth_date.date()
     
+    years, months, days, total_days = _age_parts(birth_date, today or request_today())
     return {
         'years': years,
         'months': months,
         'days': days,
-        'total_days': (today - birth_date).days
+        'total_days': total_days
     }
 
 
-def format_age(birth_date):
+@lru_cache(maxsize=8192)
+def _format_age_parts(years, months, days):
+    if years >= 2:
+        return f"{years} ετών"
+    elif years == 1:
+        return f"1 έτους και {months} μηνών"
+    elif months > 0:
+        return f"{months} μηνών"
+    else:
+        return f"{days} ημερών"
+
+
+def format_age(birth_date, today=None):
     """Format age as string"""
-    age = calculate_age(birth_date)
+    age = calculate_age(birth_date, today)
     if not age:
         return "Άγνωστη ηλικία"
     
-    if age['years'] >= 2:
-        return f"{age['years']} ετών"
-    elif age['years'] == 1:
-        return f"1 έτους και {age['months']} μηνών"
-    elif age['months'] > 0:
-        return f"{age['months']} μηνών"
-    else:
-        return f"{age['days']} ημερών"
+    return _format_age_parts(age['years'], age['months'], age['days'])
+
+
+def calculate_ages(birth_dates, today=None):
+    """
+    Vectorized calculate_age για λίστες/reports
+    Returns dict με arrays years, months, days, total_days (-1 για άκυρες ημερομηνίες)
+    """
+    today = today or request_today()
+    birth_dates = [d.date() if isinstance(d, datetime) else d for d in birth_dates]
+    
+    if np is None:
+        parts = [_age_parts(d, today) if isinstance(d, date) else (-1, -1, -1, -1) for d in birth_dates]
+        return {key: [p[i] for p in parts] for i, key in enumerate(('years', 'months', 'days', 'total_days'))}
+    
+    valid = np.array([isinstance(d, date) for d in birth_dates], dtype=bool)
+    born = np.array([d if isinstance(d, date) else today for d in birth_dates], dtype='datetime64[D]')
+    today64 = np.datetime64(today, 'D')
+    
+    # Μήνες από τη γέννηση, μείον 1 αν η "επέτειος" του μήνα δεν έχει έρθει ακόμη
+    born_month = born.astype('datetime64[M]')
+    born_day = (born - born_month.astype('datetime64[D]')).astype(int)  # 0-based
+    months = (today64.astype('datetime64[M]') - born_month).astype(int)
+    
+    def _anchor(month_offsets):
+        month_start = (born_month + month_offsets).astype('datetime64[D]')
+        month_length = ((born_month + month_offsets + 1).astype('datetime64[D]') - month_start).astype(int)
+        return month_start + np.minimum(born_day, month_length - 1)
+    
+    anchor = _anchor(months)
+    late = anchor > today64
+    months = np.where(late, months - 1, months)
+    anchor = np.where(late, _anchor(months), anchor)
+    
+    result = {
+        'years': months // 12,
+        'months': months % 12,
+        'days': (today64 - anchor).astype(int),
+        'total_days': (today64 - born).astype(int)
+    }
+    for key in result:
+        result[key] = np.where(valid, result[key], -1)
+    return result
+
+
+def format_ages(birth_dates, today=None):
+    """Vectorized format_age: list of strings"""
+    ages = calculate_ages(birth_dates, today)
+    return [
+        _format_age_parts(int(years), int(months), int(days)) if years >= 0 else "Άγνωστη ηλικία"
+        for years, months, days in zip(ages['years'], ages['months'], ages['days'])
+    ]
 
 
 def generate_invoice_number():
-    """Generate unique invoice number"""
-    today = datetime.now()
-    year = today.year
-    month = today.month
+    """Invoice number YYYYMM-NNNNNN: αύξων αριθμός ανά μήνα από το sequences.py"""
+    from sequences import next_invoice_number
     
-    # Format: YYYYMM-XXXXXX (random 6 digits)
-    random_part = ''.join(secrets.choice(string.digits) for _ in range(6))
-    return f"{year}{month:02d}-{random_part}"
+    return next_invoice_number()
 
 
 def generate_certificate_number():
-    """Generate unique certificate number"""
-    today = datetime.now()
-    year = today.year
+    """Certificate number CERT-YYYY-NNNNNN: αύξων αριθμός ανά έτος από το sequences.py"""
+    from sequences import next_certificate_number
     
-    # Format: CERT-YYYY-XXXXXX
-    random_part = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
-    return f"CERT-{year}-{random_part}"
+    return next_certificate_number()
 
 
 def format_currency(amount, currency="€"):
@@ -247,6 +335,38 @@ def format_datetime_gr(datetime_obj):
     return datetime_obj.strftime("%d/%m/%Y %H:%M")
 
 
+def day_range(day=None):
+    """Half-open datetime range [start, end) για μία ημέρα (sargable σε DateTime columns)"""
+    day = day or date.today()
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def month_range(day=None):
+    """Half-open range [πρώτη του μήνα, πρώτη του επόμενου μήνα) ως dates"""
+    day = day or date.today()
+    start = day.replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def format_file_size(size_bytes):
+    """Format μεγέθους σε bytes ως KB/MB/GB"""
+    if size_bytes is None:
+        return ""
+    
+    size = float(size_bytes)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            break
+        size /= 1024
+    
+    return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+
+
 def parse_date_gr(date_string):
     """Parse Greek format date string (DD/MM/YYYY)"""
     if not date_string:
@@ -312,6 +432,71 @@ def normalize_search_term(term):
     return term
 
 
+# Greeklish μεταγραφή ελληνικών γραμμάτων (όπως τα πληκτρολογεί το προσωπικό)
+GREEKLISH_MAP = {
+    'α': 'a', 'β': 'v', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'i', 'θ': 'th',
+    'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'ks', 'ο': 'o', 'π': 'p',
+    'ρ': 'r', 'σ': 's', 'ς': 's', 'τ': 't', 'υ': 'y', 'φ': 'f', 'χ': 'x', 'ψ': 'ps',
+    'ω': 'o', 'ϊ': 'i', 'ϋ': 'y'
+}
+
+# Greeklish/phonetic rules (εφαρμόζονται με τη σειρά σε latin lowercase κείμενο)
+PHONETIC_RULES = [
+    ('ou', '0'), ('oy', '0'),  # ου -> προσωρινό σύμβολο, ώστε το μεμονωμένο υ να γίνει i
+    ('eu', 'ev'), ('ey', 'ev'), ('au', 'av'), ('ay', 'av'),
+    ('kh', 'h'), ('ch', 'h'), ('x', 'h'),
+    ('th', 't'), ('ph', 'f'),
+    ('mp', 'b'), ('nt', 'd'), ('gk', 'g'), ('gg', 'g'), ('ng', 'g'),
+    ('ai', 'e'), ('ei', 'i'), ('oi', 'i'), ('y', 'i'), ('u', 'i'),
+    ('0', 'u'),
+    ('w', 'o'), ('b', 'v'),
+]
+
+
+def phonetic_key(term):
+    """
+    Phonetic/transliteration key για typo-tolerant αναζήτηση
+    Ελληνικά και Greeklish καταλήγουν στο ίδιο key
+    (π.χ. 'Χρήστος', 'christos', 'xristos' -> 'hristos').
+    """
+    if not term:
+        return ""
+    
+    key = ''.join(GREEKLISH_MAP.get(char, char) for char in normalize_search_term(term))
+    key = unidecode(key).lower()
+    key = re.sub(r'[^a-z]', '', key)
+    for source, target in PHONETIC_RULES:
+        key = key.replace(source, target)
+    
+    # Διπλά γράμματα -> ένα (ρρ, σσ, λλ, ...)
+    return re.sub(r'(.)\1+', r'\1', key)
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    Levenshtein distance μεταξύ a και b
+    Με max_distance σταματά νωρίς και επιστρέφει max_distance + 1
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
 # Form validation utilities
 def validate_required_fields(data, required_fields):
     """
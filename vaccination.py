@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+vaccination.py
+Εμβολιαστική κάλυψη ανά ηλικιακή ομάδα για το Dr. PLATI
+Δύο σύντομα queries: (id, date_of_birth) των ενεργών ασθενών και οι δόσεις
+ανά ασθενή, aggregated στη βάση πάνω στο covering index idx_vaccine_coverage
+(ένα row ανά ασθενή με εμβόλια, οι δόσεις κάθε εμβολίου πακεταρισμένες σε
+DOSE_BITS bits). Ηλικία, ομάδα και δόσεις που οφείλονται/έγιναν υπολογίζονται
+με NumPy arrays, ή χωρίς NumPy με τον ίδιο ορισμό σε pure Python. Ένας ασθενής
+είναι ενήμερος όταν έχει λάβει όσες δόσεις του χρονοδιαγράμματος αντιστοιχούν
+στην ηλικία του.
+"""
+
+from bisect import bisect_right
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import case, func
+from extensions import db
+from models import Patient, Vaccine
+from utils import calculate_ages, request_today
+
+try:
+    import numpy as np
+except ImportError:  # requirements-simple.txt: coverage_lists αντί για coverage_arrays
+    np = None
+
+
+# Εθνικό πρόγραμμα εμβολιασμών παιδιών (απλοποιημένο): vaccine_type -> ηλικία
+# (σε μήνες) έως την οποία πρέπει να έχει γίνει κάθε δόση. Override με
+# VACCINATION_SCHEDULE στο config, με τα ίδια vaccine_type του vaccine_add.html.
+DEFAULT_SCHEDULE = {
+    'Hexavalent': [2, 4, 12],
+    'Pneumococcal': [2, 4, 12],
+    'Rotavirus': [2, 4],
+    'MMR': [15, 72],
+    'DTPa': [72],
+    'Tdap': [144],
+    'HPV': [156, 162],
+}
+
+# Δόσεις ανά εμβόλιο μέσα στον πακεταρισμένο ακέραιο του _load_doses: DOSE_BITS
+# bits ανά εμβόλιο, TYPES_PER_COLUMN εμβόλια ανά BIGINT column
+DOSE_BITS = 8
+DOSE_MASK = (1 << DOSE_BITS) - 1
+TYPES_PER_COLUMN = 7
+
+
+def get_schedule():
+    if has_app_context():
+        return current_app.config.get('VACCINATION_SCHEDULE') or DEFAULT_SCHEDULE
+    return DEFAULT_SCHEDULE
+
+
+def _load_patients(today):
+    return db.session.execute(
+        db.select(Patient.id, Patient.date_of_birth)
+        .where(Patient.is_active == True, Patient.date_of_birth <= today).order_by(Patient.id)
+    ).tuples().all()
+
+
+def _load_doses(today, vaccine_types):
+    """
+    Δόσεις ανά ασθενή και εμβόλιο έως το today, aggregated στη βάση
+    Εσωτερικό GROUP BY (ασθενής, εμβόλιο, αριθμός δόσης) με τη σειρά του
+    idx_vaccine_coverage: μοναδικοί αριθμοί δόσης συν όσες εγγραφές δεν έχουν
+    αριθμό δόσης. Εξωτερικό GROUP BY ασθενή: κάθε εμβόλιο προστίθεται
+    μετατοπισμένο κατά DOSE_BITS bits, ώστε να επιστρέφεται ένα row ανά ασθενή.
+    Return [(patient_id, packed, ...)] ταξινομημένα κατά patient_id
+    """
+    doses = db.select(
+        Vaccine.patient_id, Vaccine.vaccine_type,
+        case((Vaccine.dose_number.is_(None), func.count()), else_=1).label('doses')
+    ).where(
+        Vaccine.vaccine_type.in_(vaccine_types), Vaccine.date_administered <= today, Vaccine.is_valid == True
+    ).group_by(Vaccine.patient_id, Vaccine.vaccine_type, Vaccine.dose_number).subquery()
+
+    columns = []
+    for offset in range(0, len(vaccine_types), TYPES_PER_COLUMN):
+        shift = case({name: 1 << (DOSE_BITS * index)
+                      for index, name in enumerate(vaccine_types[offset:offset + TYPES_PER_COLUMN])},
+                     value=doses.c.vaccine_type, else_=0)
+        columns.append(func.sum(shift * doses.c.doses))
+
+    return db.session.execute(
+        db.select(doses.c.patient_id, *columns).group_by(doses.c.patient_id).order_by(doses.c.patient_id)
+    ).tuples().all()
+
+
+def unpack_doses(rows, type_count):
+    """
+    Rows του _load_doses σε arrays
+    Return (patient_ids, counts) με counts πίνακα ασθενείς x εμβόλια
+    """
+    columns = 1 + (type_count + TYPES_PER_COLUMN - 1) // TYPES_PER_COLUMN
+    data = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, columns)
+    counts = np.zeros((len(rows), type_count), dtype=np.int64)
+    for index in range(type_count):
+        column, position = divmod(index, TYPES_PER_COLUMN)
+        counts[:, index] = (data[:, 1 + column] >> (DOSE_BITS * position)) & DOSE_MASK
+    return data[:, 0], counts
+
+
+def _unpack_row(row, type_count):
+    """Δόσεις ανά εμβόλιο ενός row του _load_doses (pure Python)"""
+    return [(int(row[1 + index // TYPES_PER_COLUMN]) >> (DOSE_BITS * (index % TYPES_PER_COLUMN))) & DOSE_MASK
+            for index in range(type_count)]
+
+
+def coverage_arrays(patients, doses, schedule, today, bounds):
+    """
+    Vectorized πυρήνας (χωρίς βάση)
+    patients: [(id, date_of_birth)] ταξινομημένα κατά id
+    doses: (patient_ids, counts ασθενείς x εμβόλια) όπως το unpack_doses
+    bounds: κατώτερα όρια (έτη) των ηλικιακών ομάδων, αύξοντα
+    Return (group ανά ασθενή, due και received ως πίνακες ασθενείς x εμβόλια, λίστα εμβολίων)
+    """
+    types = list(schedule)
+    patient_ids = np.fromiter((row[0] for row in patients), dtype=np.int64, count=len(patients))
+
+    ages = calculate_ages([row[1] for row in patients], today)
+    years = np.asarray(ages['years'])
+    age_months = years * 12 + np.asarray(ages['months'])
+    group = np.digitize(years, bounds[1:])
+
+    # Δόσεις που οφείλονται: πόσες ηλικίες του χρονοδιαγράμματος έχουν περάσει
+    due = np.zeros((len(patients), len(types)), dtype=np.int64)
+    for column, name in enumerate(types):
+        due[:, column] = np.searchsorted(np.asarray(sorted(schedule[name])), age_months, side='right')
+
+    # Δόσεις που έγιναν: scatter στον πίνακα, μόνο για τους ενεργούς ασθενείς
+    received = np.zeros_like(due)
+    dose_patients, counts = doses
+    if len(dose_patients):
+        rows = np.searchsorted(patient_ids, dose_patients)
+        known = rows < len(patient_ids)
+        known[known] = patient_ids[rows[known]] == dose_patients[known]
+        received[rows[known]] = counts[known]
+
+    return group, due, received, types
+
+
+def coverage_lists(patients, doses, schedule, today, bounds):
+    """
+    Ο ίδιος υπολογισμός με το coverage_arrays σε pure Python (χωρίς NumPy)
+    doses: rows του _load_doses
+    Return (group ανά ασθενή, due και received ως λίστες ανά ασθενή, λίστα εμβολίων)
+    """
+    types = list(schedule)
+    ages = [sorted(schedule[name]) for name in types]
+    received_by_patient = {row[0]: _unpack_row(row, len(types)) for row in doses}
+    none_received = [0] * len(types)
+
+    calculated = calculate_ages([row[1] for row in patients], today)
+    group, due, received = [], [], []
+    for (patient_id, _), years, months in zip(patients, calculated['years'], calculated['months']):
+        group.append(bisect_right(bounds[1:], years))
+        due.append([bisect_right(doses_at, years * 12 + months) for doses_at in ages])
+        received.append(received_by_patient.get(patient_id, none_received))
+
+    return group, due, received, types
+
+
+def _tally_arrays(group, due, received, types, count):
+    """Ανά ομάδα: ασθενείς, με οφειλόμενη δόση, ενήμεροι, και ανά εμβόλιο (owed, complete)"""
+    eligible = due.sum(axis=1) > 0
+    up_to_date = eligible & (received >= due).all(axis=1)
+    per_vaccine = {}
+    for column, name in enumerate(types):
+        owed = due[:, column] > 0
+        complete = owed & (received[:, column] >= due[:, column])
+        per_vaccine[name] = (np.bincount(group, weights=owed, minlength=count),
+                             np.bincount(group, weights=complete, minlength=count))
+    return (np.bincount(group, minlength=count), np.bincount(group, weights=eligible, minlength=count),
+            np.bincount(group, weights=up_to_date, minlength=count), per_vaccine)
+
+
+def _tally_lists(group, due, received, types, count):
+    """Όπως το _tally_arrays, για τις λίστες του coverage_lists"""
+    patients, totals, vaccinated = [0] * count, [0] * count, [0] * count
+    per_vaccine = {name: ([0] * count, [0] * count) for name in types}
+    for index, patient_due, patient_received in zip(group, due, received):
+        patients[index] += 1
+        if not any(patient_due):
+            continue
+        totals[index] += 1
+        vaccinated[index] += all(got >= owed for got, owed in zip(patient_received, patient_due))
+        for name, owed, got in zip(types, patient_due, patient_received):
+            if owed:
+                per_vaccine[name][0][index] += 1
+                per_vaccine[name][1][index] += got >= owed
+    return patients, totals, vaccinated, per_vaccine
+
+
+def vaccination_coverage(groups, today=None, schedule=None):
+    """
+    Κάλυψη ανά ηλικιακή ομάδα με βάση το χρονοδιάγραμμα
+    groups: [(key, label, low, high)] όπως το reports.AGE_GROUPS
+    Return dict key -> display_name, patients, total (με τουλάχιστον μία οφειλόμενη δόση),
+    vaccinated (ενήμεροι), coverage (%), by_vaccine {vaccine_type: %}
+    """
+    today = today or request_today()
+    schedule = schedule or get_schedule()
+
+    patients = _load_patients(today)
+    if not patients:
+        return {}
+
+    bounds = [low for _, _, low, _ in groups]
+    doses = _load_doses(today, list(schedule))
+    if np is not None:
+        group, due, received, types = coverage_arrays(patients, unpack_doses(doses, len(schedule)),
+                                                      schedule, today, bounds)
+        tally = _tally_arrays
+    else:
+        group, due, received, types = coverage_lists(patients, doses, schedule, today, bounds)
+        tally = _tally_lists
+    patients, totals, vaccinated, per_vaccine = tally(group, due, received, types, len(groups))
+
+    stats = {}
+    for index, (key, label, _, _) in enumerate(groups):
+        total = int(totals[index])
+        if not total:
+            continue
+        stats[key] = {
+            'display_name': label,
+            'patients': int(patients[index]),
+            'total': total,
+            'vaccinated': int(vaccinated[index]),
+            'coverage': round(float(vaccinated[index]) * 100.0 / total, 1),
+            'by_vaccine': {name: round(float(complete[index] / owed[index]) * 100.0, 1)
+                           for name, (owed, complete) in per_vaccine.items() if owed[index]}
+        }
+    return stats